@@ -0,0 +1,185 @@
+import numpy as np
+import pandas as pd
+from analytics import get_day_numbers
+from profiling import instrument_functions
+
+# ---- allocation optimizer settings ----
+ALLOCATION_MODES = {  # mode -> label
+    "subsets": "Strategy subsets (in / out)",
+    "weights": "Contract weights (0 to 3x per strategy)",
+}
+ALLOCATION_RANKS = {  # rank metric -> label (score column)
+    "return_DD": "P/L / max DD",
+    "MAR": "MAR (CAGR % / max DD %)",
+}
+DEFAULT_CANDIDATES = 4096
+WEIGHT_LEVELS = np.array([0, 1, 2, 3], dtype=np.int8)  # contract multipliers of the weights mode
+SEARCH_ROUNDS = 4  # round 0: random candidates, then mutations of the best ones found so far
+PARENTS = 32  # best candidates mutated in every later round
+CHUNK_CANDIDATES = 512  # candidates scored together: bounds memory to a few [days x 512] arrays
+FRONTIER_SIZE = 20  # best candidates of the P/L vs DD frontier listed
+
+
+# ==== score thousands of candidate allocations with batched matrix products =====
+# A candidate is a row of weights over the selected strategies (0 / 1 for subsets, contract multipliers for weights).
+# The daily P/L of a chunk of candidates is one [days x strategies] @ [strategies x candidates] product; cumulative
+# P/L, running max and max DD come from cumulative ops along the days of the whole [days x candidates] array, with
+# the same definitions as the realized curve (analytics.add_PL_metrics). Subsets are enumerated when there are few
+# strategies; otherwise random candidates are refined by mutating the best ones over a few rounds. All candidates
+# share the days of the current filters: days a strategy did not trade count as 0 P/L (as in correlation.py).
+def optimize_allocation(
+    strategy_daily_PL,  # risk_metrics.get_strategy_daily_PL format (the strategies of the current filters)
+    starting_fund,
+    mode="subsets",
+    n_candidates=DEFAULT_CANDIDATES,
+    rank_by="return_DD",
+    seed=0,
+    progress=None,  # progress(fraction, message) after every chunk of candidates (jobs.Job.report)
+):  # Return candidates, their scores and the ranked frontier. None without data
+    if mode not in ALLOCATION_MODES:
+        raise ValueError(f"mode must be one of {list(ALLOCATION_MODES)}, not '{mode}'.")
+    if rank_by not in ALLOCATION_RANKS:
+        raise ValueError(f"rank_by must be one of {list(ALLOCATION_RANKS)}, not '{rank_by}'.")
+    PL = np.asarray(strategy_daily_PL["PL"], dtype=np.float64)
+    strategies = pd.Index(strategy_daily_PL["strategies"])
+    if not PL.size:
+        return None
+    days = get_day_numbers(strategy_daily_PL["dates"])
+    years = (days[-1] - days[0] + 1) / 365.25  # calendar days, both ends included
+    rng = np.random.default_rng(seed)
+    n_strategies = len(strategies)
+
+    current = np.ones((1, n_strategies), dtype=np.int8)  # the current selection, always scored first
+    if mode == "subsets" and 2**n_strategies - 1 <= n_candidates:  # every subset
+        rounds = [_get_all_subsets(n_strategies)]
+    else:
+        first = max(n_candidates // 2, 1)
+        rounds = [first] + [(n_candidates - first) // (SEARCH_ROUNDS - 1)] * (SEARCH_ROUNDS - 1)
+    n_total = sum(len(size) if isinstance(size, np.ndarray) else size for size in rounds) + 1
+    seen = {current.tobytes()}
+    weights, scores = [current], [_score_weights(PL, current, starting_fund, years)]
+    n_done = 1
+    for round_number, size in enumerate(rounds):
+        if isinstance(size, np.ndarray):  # enumerated
+            batch = size
+        elif round_number == 0:
+            batch = _get_random_weights(rng, size, n_strategies, mode)
+        else:
+            score = _get_rank_score(pd.concat(scores, ignore_index=True), rank_by)
+            parents = np.concatenate(weights)[np.argsort(-score, kind="stable")[:PARENTS]]
+            batch = _mutate_weights(rng, parents, size, mode)
+        batch = _drop_seen(batch, seen)
+        for start in range(0, len(batch), CHUNK_CANDIDATES):
+            chunk = batch[start : start + CHUNK_CANDIDATES]
+            weights.append(chunk)
+            scores.append(_score_weights(PL, chunk, starting_fund, years))
+            n_done += len(chunk)
+            if progress is not None:
+                progress(min(n_done / n_total, 1.0), f"{n_done:,} candidates scored")
+    weights = np.concatenate(weights)
+    df_scores = pd.concat(scores, ignore_index=True)
+    return {
+        "mode": mode,
+        "rank_by": rank_by,
+        "strategies": strategies,
+        "weights": weights,  # [candidates x strategies], candidate 0: current selection
+        "scores": df_scores,  # one row per candidate
+        "frontier": get_frontier(df_scores, weights, strategies, rank_by),
+    }
+
+
+def _score_weights(PL, weights, starting_fund, years):  # [candidates x metric] dataframe
+    cum_PL = np.cumsum(PL @ weights.T.astype(np.float64), axis=0)  # [days x candidates]
+    max_DD = (np.maximum.accumulate(cum_PL, axis=0) - cum_PL).max(axis=0)
+    total_PL = cum_PL[-1]
+    growth = (starting_fund + total_PL) / starting_fund
+    CAGR = np.where(growth > 0, (np.maximum(growth, 0) ** (1 / years) - 1) * 100, -100.0)  # as risk_metrics
+    max_DD_pct = max_DD / starting_fund * 100
+    return pd.DataFrame(
+        {
+            "P/L": total_PL,
+            "Max DD": max_DD,
+            "Max DD %": max_DD_pct,
+            "CAGR %": CAGR,
+            ALLOCATION_RANKS["return_DD"]: _get_ratio(total_PL, max_DD),
+            ALLOCATION_RANKS["MAR"]: _get_ratio(CAGR, max_DD_pct),
+        }
+    )
+
+
+def _get_ratio(gain, DD):  # gain / DD. No DD: inf for a gain, NaN otherwise
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(DD > 0, gain / DD, np.where(gain > 0, np.inf, np.nan))
+
+
+def _get_rank_score(df_scores, rank_by):  # higher is better, NaN last
+    return np.nan_to_num(df_scores[ALLOCATION_RANKS[rank_by]].to_numpy(), nan=-np.inf)
+
+
+def get_frontier(df_scores, weights, strategies, rank_by):  # P/L vs max DD frontier, best rank_by first
+    # a candidate is on the frontier when no candidate with a smaller (or equal) max DD has a higher P/L
+    order = np.lexsort((-df_scores["P/L"].to_numpy(), df_scores["Max DD"].to_numpy()))
+    PL_sorted = df_scores["P/L"].to_numpy()[order]
+    best_before = np.r_[-np.inf, np.maximum.accumulate(PL_sorted)[:-1]]
+    on_frontier = order[PL_sorted > best_before]
+    score = _get_rank_score(df_scores.iloc[on_frontier], rank_by)
+    candidates = on_frontier[np.argsort(-score, kind="stable")[:FRONTIER_SIZE]]
+    df_frontier = df_scores.iloc[candidates].copy()
+    df_frontier.insert(0, "Strategies", [describe_weights(weights[i], strategies) for i in candidates])
+    df_frontier.insert(1, "Count", (weights[candidates] > 0).sum(axis=1))
+    df_frontier.index = pd.Index(candidates, name="Candidate")
+    return df_frontier
+
+
+def describe_weights(weights, strategies):  # "A, B x2, C" (strategies with a weight > 0)
+    weighted = [(strategy, weight) for strategy, weight in zip(strategies, weights) if weight]
+    return ", ".join(str(strategy) if weight == 1 else f"{strategy} x{weight}" for strategy, weight in weighted)
+
+
+def get_allocation_strategies(allocation, candidate):  # strategies of a candidate (weight > 0): a strategy filter
+    return list(allocation["strategies"][allocation["weights"][candidate] > 0])
+
+
+# ---- candidate generation (int8 weight rows, never all zero) ----
+def _get_all_subsets(n_strategies):  # every non empty subset, as bit patterns of 1 .. 2^n - 1
+    return ((np.arange(1, 2**n_strategies)[:, None] >> np.arange(n_strategies)) & 1).astype(np.int8)
+
+
+def _get_random_weights(rng, size, n_strategies, mode):
+    if mode == "subsets":  # inclusion rate drawn per candidate: small and large subsets both get tried
+        rate = rng.uniform(0.1, 0.9, size=(size, 1))
+        weights = (rng.random((size, n_strategies)) < rate).astype(np.int8)
+    else:
+        weights = rng.choice(WEIGHT_LEVELS, size=(size, n_strategies))
+    return _fill_empty(rng, weights)
+
+
+def _mutate_weights(rng, parents, size, mode):  # copies of the parents with 1 or 2 strategies changed
+    children = parents[rng.integers(len(parents), size=size)].copy()
+    for _ in range(2):
+        rows = np.flatnonzero(rng.random(size) < 0.75)
+        columns = rng.integers(children.shape[1], size=len(rows))
+        if mode == "subsets":
+            children[rows, columns] = 1 - children[rows, columns]
+        else:
+            children[rows, columns] = rng.choice(WEIGHT_LEVELS, size=len(rows))
+    return _fill_empty(rng, children)
+
+
+def _fill_empty(rng, weights):  # one strategy at weight 1 in the all zero rows
+    empty = np.flatnonzero(~weights.any(axis=1))
+    weights[empty, rng.integers(weights.shape[1], size=len(empty))] = 1
+    return weights
+
+
+def _drop_seen(batch, seen):  # rows not scored yet (first occurrence), seen updated
+    keep = []
+    for row, weights in enumerate(batch):
+        key = weights.tobytes()
+        if key not in seen:
+            seen.add(key)
+            keep.append(row)
+    return batch[keep]
+
+
+instrument_functions(globals())  # wall time / calls / memory per function when profiling is on
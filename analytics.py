@@ -0,0 +1,240 @@
+import numpy as np
+import pandas as pd
+from trade_schema import ACCOUNT_COLUMN, DATE_COLUMNS, DATE_FORMATS, TRADE_COUNT_COLUMN
+from trade_schema import CATEGORY_COLUMNS, CATEGORY_MAX_RATIO, FLOAT32_COLUMNS, FLOAT32_MAX_VALUE
+from profiling import instrument_functions
+
+# Analytics core: parsing, filtering and P/L metrics without any streamlit call, so it can be imported by the
+# dashboard (utility.py re-exports it) and by headless tools (report.py, benchmarks) alike.
+
+
+def data_prep(dataframe):  # for OO live trade log
+    # convert to datatime & removed hour and time. Fixed format parsing is much faster than inference.
+    for col in DATE_COLUMNS:
+        dataframe[col] = parse_dates(dataframe[col], detect_date_format(dataframe[col])).dt.normalize()
+    compact_trade_log(dataframe)
+    # make sure it's in ascending order
+    dataframe = dataframe.sort_values(by="Date Opened", ascending=True).reset_index()
+
+
+def compact_trade_log(dataframe):  # compact dtypes in place (see trade_schema). Return dataframe
+    # Strategy names repeat on every row: a categorical holds each name once plus one small int code per row.
+    # Dates stay datetime64 (8 bytes, vectorized compares) instead of python date objects (~50 bytes each).
+    for col in dataframe.columns:
+        values = dataframe[col]
+        if col in DATE_COLUMNS:
+            if not pd.api.types.is_datetime64_any_dtype(values):
+                dataframe[col] = pd.to_datetime(values).dt.normalize()
+        elif col in FLOAT32_COLUMNS:
+            if values.dtype == np.float64 and not (values.abs() >= FLOAT32_MAX_VALUE).any():
+                dataframe[col] = values.astype(np.float32)
+        elif values.dtype == object or pd.api.types.is_string_dtype(values.dtype):
+            if col in CATEGORY_COLUMNS or values.nunique() <= CATEGORY_MAX_RATIO * len(values.index):
+                dataframe[col] = values.astype("category")
+            else:  # mostly distinct text (i.e. Legs): one arrow buffer instead of a python string per row
+                dataframe[col] = values.astype("string[pyarrow]")
+        elif isinstance(values.dtype, pd.CategoricalDtype):  # concat of categoricals: drop categories left unused
+            dataframe[col] = values.cat.remove_unused_categories()
+    return dataframe
+
+
+def detect_date_format(values, sample_size=1000):  # first format in DATE_FORMATS that parses a sample. None: infer
+    sample = pd.Series(values).dropna().astype(str).head(sample_size)
+    for date_format in DATE_FORMATS:
+        try:
+            pd.to_datetime(sample, format=date_format)
+            return date_format
+        except (ValueError, TypeError):
+            continue
+    return None
+
+
+def parse_dates(values, date_format=None):  # parse each distinct value once (logs repeat the same dates a lot)
+    codes, uniques = pd.factorize(values)
+    parsed = pd.to_datetime(uniques, format=date_format).take(codes, allow_fill=True, fill_value=pd.NaT)
+    return pd.Series(parsed, index=values.index, name=values.name)
+
+
+def get_trade_number(dataframe):  # pre-aggregated rows (streamed data) carry their own trade count
+    if TRADE_COUNT_COLUMN in dataframe.columns:
+        return int(dataframe[TRADE_COUNT_COLUMN].sum())
+    return len(dataframe.index)
+
+
+def get_simple_stat(dataframe):  # return entry number, data range,
+    trade_number = get_trade_number(dataframe)
+    start_date = _to_date(dataframe["Date Opened"].min())
+    end_date = _to_date(dataframe["Date Opened"].max())
+    strategy_number = len(dataframe["Strategy"].unique())
+    strategy_list = dataframe["Strategy"].unique()
+    return trade_number, start_date, end_date, strategy_number, strategy_list
+
+
+def _to_date(value):  # datetime64 value -> python date (date pickers / sliders), NaT (no rows) -> None
+    return None if pd.isna(value) else pd.Timestamp(value).date()
+
+
+def get_account_list(dataframe):  # sorted account names of multi-account data, None for a single account import
+    if ACCOUNT_COLUMN not in dataframe.columns:
+        return None
+    return sorted(dataframe[ACCOUNT_COLUMN].unique())
+
+
+# filtered trades (selections of the filter form). selected_accounts None: no account filter
+def apply_trade_filter(dataframe, selected_strat_list, selected_date, selected_accounts=None):
+    mask = (
+        (dataframe["Date Opened"] >= pd.Timestamp(selected_date[0]))
+        & (dataframe["Date Opened"] <= pd.Timestamp(selected_date[1]))
+        & dataframe["Strategy"].isin(selected_strat_list)
+    )
+    if selected_accounts is not None and ACCOUNT_COLUMN in dataframe.columns:
+        mask &= dataframe[ACCOUNT_COLUMN].isin(selected_accounts)
+    df_filtered = dataframe[mask]
+    return df_filtered
+
+
+# ==== shared P/L & DD engine (vectorized). Return df_PL. No Fund / DD pct columns if starting_fund is None =====
+def compute_PL_metrics(dataframe, starting_fund=None):
+    return add_PL_metrics(get_daily_PL(dataframe), starting_fund)
+
+
+def get_daily_PL(dataframe):  # P/L and trade count per Date Closed (sorted by date)
+    if TRADE_COUNT_COLUMN in dataframe.columns:  # pre-aggregated rows: daily count is the sum of trade counts
+        df_PL = dataframe.groupby("Date Closed").agg(sum=("P/L", "sum"), count=(TRADE_COUNT_COLUMN, "sum"))
+        df_PL = df_PL.reset_index()
+    else:
+        df_PL = dataframe.groupby("Date Closed")["P/L"].agg(["sum", "count"]).reset_index()
+    return df_PL.rename(columns={"sum": "Daily_PL", "count": "Daily_count"})
+
+
+def add_PL_metrics(df_PL, starting_fund=None, PL_state=None):  # cum P/L and DD columns from daily P/L
+    # PL_state: state of the day before df_PL starts (see get_PL_state), to continue an existing curve
+    daily_PL = df_PL["Daily_PL"].to_numpy(dtype=np.float64)
+    if PL_state is None:
+        cum_PL = np.cumsum(daily_PL)  # cumulative PL
+        running_max = np.maximum.accumulate(cum_PL)
+    else:  # same summation order as a full recompute, so values match exactly
+        cum_PL = np.cumsum(np.concatenate(([PL_state["cum_PL"]], daily_PL)))[1:]
+        running_max = np.maximum(np.maximum.accumulate(cum_PL), PL_state["max_cum_PL"])
+    DD = running_max - cum_PL  # DD in amount
+    df_PL["cum_PL"] = cum_PL
+    if starting_fund is not None:
+        df_PL["Fund"] = cum_PL + starting_fund
+    df_PL["DD"] = DD
+    if starting_fund is not None:
+        # DD based on starting fund to remove sequence return risk
+        df_PL["DD_pct_startingfund"] = DD / starting_fund * 100
+    last_peak_day = None if PL_state is None else PL_state["last_peak_day"]
+    df_PL["DD_duration"] = get_DD_duration(df_PL["Date Closed"], DD, last_peak_day)
+    return df_PL
+
+
+def get_DD_duration(dates, DD, last_peak_day=None):  # DD duration in calendar days: days since the last DD == 0 day
+    days = get_day_numbers(dates)
+    at_peak = DD == 0
+    # carry forward the day number of the most recent peak (DD == 0) day
+    last_peak = np.maximum.accumulate(np.where(at_peak, days, np.iinfo(np.int64).min))
+    if last_peak_day is not None:
+        last_peak = np.maximum(last_peak, last_peak_day)
+    return np.where(at_peak, 0, days - last_peak).astype(np.int64)
+
+
+def get_day_numbers(dates):  # dates -> int64 days since epoch
+    return pd.to_datetime(pd.Series(dates)).to_numpy().astype("datetime64[D]").astype(np.int64)
+
+
+def get_PL_state(df_PL, position=None):  # state after row position - 1 (default: last row). None if no rows before
+    position = len(df_PL.index) if position is None else position
+    if position == 0:
+        return None
+    row = df_PL.iloc[position - 1]
+    # the last peak day is where the running max was set, so its cum_PL is the running max (O(log n) lookup)
+    last_peak_day = int(get_day_numbers([row["Date Closed"]])[0]) - int(row["DD_duration"])
+    peak_position = int(df_PL["Date Closed"].searchsorted(np.datetime64(last_peak_day, "D")))
+    return {
+        "cum_PL": float(row["cum_PL"]),
+        "max_cum_PL": float(df_PL["cum_PL"].iat[peak_position]),
+        "last_peak_day": last_peak_day,
+    }
+
+
+def update_PL_metrics(df_PL, new_trades, starting_fund=None):  # incremental compute_PL_metrics for appended trades
+    # Only days from the first new close date onward are recomputed, continuing from the stored state before them.
+    # For daily exports that is the last day or two, so the cost follows the new trades, not the history.
+    df_new = get_daily_PL(new_trades)
+    if df_new.empty:
+        return df_PL
+    position = int(df_PL["Date Closed"].searchsorted(df_new["Date Closed"].iat[0]))
+    PL_state = get_PL_state(df_PL, position)
+    df_tail = pd.concat([df_PL.iloc[position:][df_new.columns], df_new], ignore_index=True)
+    df_tail = df_tail.groupby("Date Closed", as_index=False).sum()  # merge days present in both
+    df_tail = add_PL_metrics(df_tail, starting_fund, PL_state)
+    return pd.concat([df_PL.iloc[:position], df_tail], ignore_index=True)
+
+
+# ==== the same P/L & DD columns for every strategy in one grouped pass =====
+# Long form: one row per strategy and close date it traded, sorted by strategy then date. Cumulative P/L, running max
+# and last peak day are grouped cumulative ops over all rows at once, so the cost follows the number of rows, not
+# strategies x days. The columns of every strategy match add_PL_metrics of that strategy alone (the grouped cumsum
+# is compensated, so cum_PL may differ in the last bits).
+def compute_strategy_PL_metrics(dataframe, starting_fund=None):  # trade level data -> long form table
+    return add_strategy_PL_metrics(get_strategy_daily_PL_long(dataframe), starting_fund)
+
+
+def get_strategy_daily_PL_long(dataframe):  # Strategy, Date Closed, Daily_PL, Daily_count (sorted)
+    count = (TRADE_COUNT_COLUMN, "sum") if TRADE_COUNT_COLUMN in dataframe.columns else ("P/L", "count")
+    df_long = dataframe.groupby(["Strategy", "Date Closed"], observed=True).agg(
+        Daily_PL=("P/L", "sum"), Daily_count=count
+    )
+    return df_long.reset_index()
+
+
+def convert_strategy_daily_PL_long(strategy_daily_PL):  # risk_metrics.get_strategy_daily_PL format -> long form
+    # only the days each strategy traded, like a groupby of its trades
+    strat_idx, date_idx = np.nonzero(np.asarray(strategy_daily_PL["count"]).T > 0)  # strategy major order
+    return pd.DataFrame(
+        {
+            "Strategy": pd.Index(strategy_daily_PL["strategies"])[strat_idx],
+            "Date Closed": pd.Index(strategy_daily_PL["dates"])[date_idx],
+            "Daily_PL": np.asarray(strategy_daily_PL["PL"])[date_idx, strat_idx],
+            "Daily_count": np.asarray(strategy_daily_PL["count"])[date_idx, strat_idx],
+        }
+    )
+
+
+def add_strategy_PL_metrics(df_long, starting_fund=None):  # add_PL_metrics per strategy (long form, sorted)
+    groups = pd.factorize(df_long["Strategy"])[0]
+    cum_PL = df_long["Daily_PL"].astype(np.float64).groupby(groups).cumsum().to_numpy()
+    running_max = pd.Series(cum_PL).groupby(groups).cummax().to_numpy()
+    DD = running_max - cum_PL
+    df_long["cum_PL"] = cum_PL
+    if starting_fund is not None:
+        df_long["Fund"] = cum_PL + starting_fund
+    df_long["DD"] = DD
+    if starting_fund is not None:
+        df_long["DD_pct_startingfund"] = DD / starting_fund * 100
+    # days since the strategy's last peak: the first row of every strategy is a peak, so nothing leaks across groups
+    days = get_day_numbers(df_long["Date Closed"])
+    at_peak = DD == 0
+    peak_days = pd.Series(np.where(at_peak, days, np.iinfo(np.int64).min)).groupby(groups).cummax().to_numpy()
+    df_long["DD_duration"] = np.where(at_peak, 0, days - peak_days).astype(np.int64)
+    return df_long
+
+
+def get_strategy_DD_summary(df_long):  # per strategy: total P/L, max DD (and % of starting fund), longest DD
+    columns = {"P/L": ("Daily_PL", "sum"), "Max DD": ("DD", "max"), "Max DD days": ("DD_duration", "max")}
+    if "DD_pct_startingfund" in df_long.columns:
+        columns["Max DD %"] = ("DD_pct_startingfund", "max")
+    return df_long.groupby("Strategy", observed=True, sort=False).agg(**columns)
+
+
+# convert to PL type dataframe without starting fund (no Fund, no DD pct columns). Return df_PL
+def convert_to_PL_no_starting_fund(dataframe):
+    return compute_PL_metrics(dataframe)
+
+
+def get_PL_per_strategy(dataframe):  # trade level data -> Strategy, P/L (sum)
+    return pd.pivot_table(dataframe, values="P/L", index="Strategy", aggfunc="sum", observed=True).reset_index()
+
+
+instrument_functions(globals())  # wall time / calls / memory per function when profiling is on
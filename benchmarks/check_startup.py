@@ -0,0 +1,79 @@
+# Cold start check: import time of the app modules against the budget (startup.IMPORT_BUDGET_SECONDS), no deferred
+# chart module loaded at start up, and the time of the first script run (Import tab, no data: the first paint).
+# Every measurement runs in a fresh interpreter, like a new server process (best of --repeat). Exit code 1 when over
+# budget or a deferred module was loaded. The same checks run with the tests (tests/test_startup.py). Run from the
+# repository root:
+#   python -m benchmarks.check_startup
+#   TRADE_LOG_IMPORT_BUDGET=1.0 python -m benchmarks.check_startup --repeat 5    # slower machine
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+# ---- check settings ----
+APP_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+DEFAULT_REPEAT = 3
+# child process: streamlit is imported first (a server has it loaded before any session), then one script run
+CHILD_CODE = """
+import json, logging, sys, time
+import streamlit
+from streamlit.testing.v1 import AppTest
+
+logging.disable(logging.WARNING)
+app = AppTest.from_file(sys.argv[1], default_timeout=120)
+start = time.perf_counter()
+app.run()
+first_run = time.perf_counter() - start
+import startup  # the module of the script run (already in sys.modules)
+
+exceptions = [exception.value for exception in app.exception]
+print(json.dumps({**startup.get_startup_report(), "first_run": first_run, "exceptions": exceptions}))
+"""
+
+
+def measure_cold_start(app_path=APP_PATH):  # startup report of one fresh interpreter + first run seconds
+    completed = subprocess.run(
+        [sys.executable, "-c", CHILD_CODE, app_path],
+        cwd=os.path.dirname(app_path),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def check_startup(repeat=DEFAULT_REPEAT):  # Return the best measurements and a list of failures (text)
+    runs = [measure_cold_start() for _ in range(repeat)]
+    best = {
+        "seconds": min(run["seconds"] for run in runs),
+        "first_run": min(run["first_run"] for run in runs),
+        "modules": runs[0]["modules"],
+        "budget": runs[0]["budget"],
+        "deferred_loaded": sorted({name for run in runs for name in run["deferred_loaded"]}),
+        "exceptions": [exception for run in runs for exception in run["exceptions"]],
+    }
+    failures = []
+    if best["seconds"] > best["budget"]:
+        failures.append(f"imports took {best['seconds']:.3f} s, budget {best['budget']:g} s")
+    if best["deferred_loaded"]:
+        failures.append(f"deferred modules loaded at start up: {', '.join(best['deferred_loaded'])}")
+    failures.extend(f"first run raised: {exception}" for exception in best["exceptions"])
+    return best, failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the cold start import time of the dashboard.")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT, help="fresh interpreters (best one counts)")
+    args = parser.parse_args()
+
+    best, failures = check_startup(args.repeat)
+    print(f"imports     {best['seconds'] * 1000:8.1f} ms  ({best['modules']} modules, budget {best['budget']:g} s)")
+    print(f"first run   {best['first_run'] * 1000:8.1f} ms  (Import tab, no data)")
+    for failure in failures:
+        print(f"FAILED {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,221 @@
+# Time and memory profile every dashboard stage on synthetic trade logs of growing size, write the results as json,
+# and compare them with the stored baseline (exit code 1 on regression). Run from the repository root:
+#   python -m benchmarks.run_benchmarks                          # default sizes, compare with baseline.json
+#   python -m benchmarks.run_benchmarks --sizes 1000000 10000000 --repeat 1
+#   python -m benchmarks.run_benchmarks --save-baseline          # after an intended change, on the reference machine
+# Figure stages build the figure and hand it to streamlit (bare mode, no server), so json serialization is included.
+# Peak memory is measured with tracemalloc in a separate run: numpy / pandas buffers are traced, pyarrow's are not.
+import argparse
+import io
+import json
+import logging
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import plotly
+import streamlit as st
+from benchmarks.synthetic_log import get_trade_log_bytes
+from monte_carlo import run_monte_carlo
+from exposure import build_exposure
+from allocation import optimize_allocation
+from risk_metrics import get_strategy_daily_PL
+from utility import (
+    apply_trade_filter,
+    compute_strategy_PL_metrics,
+    convert_to_PL,
+    data_prep,
+    get_PL_per_strategy,
+    get_simple_stat,
+    show_daily_PL_cum_PL_curve,
+    show_daily_PL_distribution_daily_trades,
+    show_open_date_per_strategy,
+    show_PL_DD_plot,
+    show_PL_per_strategy_bar_chart,
+)
+
+# ---- benchmark settings ----
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(BENCHMARK_DIR, "baseline.json")
+RESULTS_DIR = os.path.join(BENCHMARK_DIR, "results")
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+STARTING_FUND = 50000
+TIME_TOLERANCE = 0.5  # slower than baseline by more than 50% = regression (timings are noisy on shared machines)
+MEMORY_TOLERANCE = 0.2
+MIN_TIME_DELTA = 0.01  # seconds. Ignore differences below timer / scheduler noise
+MIN_MEMORY_DELTA_MB = 1.0
+
+
+# ==== stages =====
+# name -> (setup, run). setup(data) returns the argument of run and is not measured, run(arg) is measured.
+# data holds the outputs of earlier stages, filled once per size by prepare_data.
+STAGES = {
+    "read_csv": (lambda data: data["file_bytes"], lambda file_bytes: pd.read_csv(io.BytesIO(file_bytes))),
+    "data_prep": (lambda data: data["raw"].copy(), data_prep),  # data_prep changes its argument: fresh copy per run
+    "filter": (lambda data: data, lambda data: apply_trade_filter(data["df"], *data["selection"])),
+    "convert_to_PL": (lambda data: data["df"], lambda df: convert_to_PL(df, STARTING_FUND, id="benchmark")),
+    "get_simple_stat": (lambda data: data["df"], get_simple_stat),
+    "fig_daily_cum_PL": (lambda data: data["df_PL"], show_daily_PL_cum_PL_curve),
+    "fig_PL_DD": (lambda data: data["df_PL"], lambda df_PL: show_PL_DD_plot(df_PL, STARTING_FUND)),
+    "fig_PL_per_strategy": (
+        lambda data: data["df"],
+        lambda df: show_PL_per_strategy_bar_chart(get_PL_per_strategy(df)),
+    ),
+    "fig_open_date_per_strategy": (lambda data: data["df"], show_open_date_per_strategy),
+    "fig_PL_distribution": (
+        lambda data: data["df_PL"],
+        lambda df_PL: show_daily_PL_distribution_daily_trades(df_PL, STARTING_FUND),
+    ),
+    "monte_carlo_10k": (  # 10k bootstrap paths over the daily P/L, in process (no pool start up)
+        lambda data: data["df_PL"],
+        lambda df_PL: run_monte_carlo(df_PL["Daily_PL"], df_PL["Date Closed"], 10_000, parallel=False),
+    ),
+    "exposure_sweep": (lambda data: data["df"], build_exposure),  # open positions / capital at risk, all series
+    "strategy_drawdowns": (lambda data: data["df"], lambda df: compute_strategy_PL_metrics(df, STARTING_FUND)),
+    "allocation_4k": (  # 4096 weighted candidates scored in batched matrix products
+        lambda data: get_strategy_daily_PL(data["df"]),
+        lambda strategy_daily_PL: optimize_allocation(strategy_daily_PL, STARTING_FUND, "weights", 4096),
+    ),
+}
+
+
+def prepare_data(n_trades, n_strategies, n_days, seed):  # inputs of every stage for one size
+    data = {"file_bytes": get_trade_log_bytes(n_trades, n_strategies, n_days, seed)}
+    data["raw"] = pd.read_csv(io.BytesIO(data["file_bytes"]))
+    df = data["raw"].copy()
+    data_prep(df)
+    data["df"] = df
+    # typical filter: every other strategy, middle half of the date range
+    strategies = df["Strategy"].unique()
+    dates = np.sort(df["Date Opened"].unique())
+    data["selection"] = (strategies[::2], (dates[len(dates) // 4], dates[len(dates) * 3 // 4]))
+    data["df_PL"] = convert_to_PL(df, STARTING_FUND, id="benchmark")[0]
+    return data
+
+
+def measure_stage(setup, run, data, repeat, memory=True):  # best and median wall time, tracemalloc peak
+    times = []
+    for _ in range(repeat):
+        arg = setup(data)
+        start = time.perf_counter()
+        run(arg)
+        times.append(time.perf_counter() - start)
+    result = {"seconds": min(times), "seconds_median": float(np.median(times))}
+    if memory:
+        arg = setup(data)
+        tracemalloc.start()
+        try:
+            run(arg)
+            result["peak_MB"] = tracemalloc.get_traced_memory()[1] / 1024**2
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def run_benchmarks(sizes, n_strategies=10, n_days=750, seed=0, repeat=3, memory=True, stages=None):
+    results = []
+    for n_trades in sizes:
+        data = prepare_data(n_trades, n_strategies, n_days, seed)
+        for name in stages or STAGES:
+            setup, run = STAGES[name]
+            result = {"n_trades": n_trades, "stage": name, **measure_stage(setup, run, data, repeat, memory)}
+            results.append(result)
+            print(_format_result(result), flush=True)
+    return {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "processor": platform.processor() or platform.machine(),
+            "versions": {
+                "numpy": np.__version__,
+                "pandas": pd.__version__,
+                "plotly": plotly.__version__,
+                "streamlit": st.__version__,
+            },
+            "config": {"n_strategies": n_strategies, "n_days": n_days, "seed": seed},  # synthetic log settings
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def _format_result(result):
+    memory_text = f"{result['peak_MB']:10.1f} MB" if "peak_MB" in result else ""
+    return f"{result['n_trades']:>10,}  {result['stage']:<28}{result['seconds'] * 1000:12.2f} ms{memory_text}"
+
+
+# ==== baseline comparison =====
+def compare_results(report, baseline, time_tolerance=TIME_TOLERANCE, memory_tolerance=MEMORY_TOLERANCE):
+    # Return a list of regressions (text). Stages or sizes missing from the baseline are skipped.
+    if report["meta"]["config"] != baseline["meta"]["config"]:
+        print("warning: benchmark config differs from the baseline, comparison may not be meaningful")
+    baseline_results = {(item["n_trades"], item["stage"]): item for item in baseline["results"]}
+    regressions = []
+    for result in report["results"]:
+        base = baseline_results.get((result["n_trades"], result["stage"]))
+        if base is None:
+            continue
+        label = f"{result['stage']} @ {result['n_trades']:,} trades"
+        seconds, base_seconds = result["seconds"], base["seconds"]
+        if seconds > base_seconds * (1 + time_tolerance) and seconds - base_seconds > MIN_TIME_DELTA:
+            regressions.append(f"{label}: {base_seconds * 1000:.2f} ms -> {seconds * 1000:.2f} ms")
+        if "peak_MB" in result and "peak_MB" in base:
+            peak, base_peak = result["peak_MB"], base["peak_MB"]
+            if peak > base_peak * (1 + memory_tolerance) and peak - base_peak > MIN_MEMORY_DELTA_MB:
+                regressions.append(f"{label}: peak {base_peak:.1f} MB -> {peak:.1f} MB")
+    return regressions
+
+
+def write_report(report, path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(report, f, indent=1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the dashboard stages on synthetic trade logs.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="trade counts (1k to 10M)")
+    parser.add_argument("--strategies", type=int, default=10)
+    parser.add_argument("--days", type=int, default=750, help="trading days covered by the open dates")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3, help="timed runs per stage (best one is reported)")
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), help="run only these stages")
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc run (faster)")
+    parser.add_argument("--output", help="results json (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="baseline json to compare with")
+    parser.add_argument("--save-baseline", action="store_true", help="write the results as the new baseline")
+    parser.add_argument("--time-tolerance", type=float, default=TIME_TOLERANCE)
+    parser.add_argument("--memory-tolerance", type=float, default=MEMORY_TOLERANCE)
+    args = parser.parse_args()
+
+    logging.disable(logging.WARNING)  # streamlit logs "missing ScriptRunContext" for every element in bare mode
+    report = run_benchmarks(
+        args.sizes, args.strategies, args.days, args.seed, args.repeat, not args.no_memory, args.stages
+    )
+    output = args.output or os.path.join(RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}.json")
+    write_report(report, output)
+    print(f"results written to {output}")
+
+    if args.save_baseline:
+        write_report(report, args.baseline)
+        print(f"baseline written to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"no baseline at {args.baseline}, nothing to compare")
+        return 0
+    with open(args.baseline) as f:
+        regressions = compare_results(report, json.load(f), args.time_tolerance, args.memory_tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    print(f"{len(regressions)} regression(s) against {args.baseline}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
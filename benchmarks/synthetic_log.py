@@ -0,0 +1,171 @@
+# Deterministic synthetic Option Omega trade log, same columns and formats as data/Demo_trade_log.csv.
+# The same arguments (and seed) always give the same file, so benchmark runs are comparable.
+#   python -m benchmarks.synthetic_log --trades 1000000 --strategies 20 --days 750 --output data/synthetic.csv
+import argparse
+import io
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+
+COLUMNS = [
+    "Strategy",
+    "Date Opened",
+    "Time Opened",
+    "Opening Price",
+    "Legs",
+    "Initial Premium",
+    "No. of Contracts",
+    "P/L",
+    "Closing Price",
+    "Date Closed",
+    "Time Closed",
+    "Avg. Closing Cost",
+    "Reason For Close",
+]
+START_DATE = "2022-01-03"
+OPEN_TIMES = ["9:32:00", "9:45:00", "10:30:00", "11:15:00", "12:00:00", "13:30:00", "15:00:00", "15:45:00"]
+CLOSE_TIMES = ["16:00:00", "15:30:00", "15:40:00", "15:48:00", "13:00:00"]
+CLOSE_TIME_WEIGHTS = [0.65, 0.1, 0.1, 0.1, 0.05]
+REASONS = ["Expired", "Exited at Specified Time", "Below Short/Long Ratio", "Below Delta", "Above Delta", "Put Tested"]
+REASON_WEIGHTS = [0.65, 0.12, 0.08, 0.08, 0.04, 0.03]
+HOLD_DAYS = [0, 1, 2, 3, 5, 7]  # trading days between open and close
+HOLD_WEIGHTS = [0.66, 0.04, 0.03, 0.02, 0.15, 0.1]
+# leg templates: (put_call, side, strike offset in widths from the at-the-money strike), in OO leg order
+STRUCTURES = {
+    "RIC": [("C", "BTO", 1), ("P", "BTO", -1), ("C", "STO", 2), ("P", "STO", -2)],
+    "IC": [("C", "BTO", 3), ("P", "BTO", -3), ("C", "STO", 2), ("P", "STO", -2)],
+    "PCS": [("P", "BTO", -2), ("P", "STO", -1)],
+    "CCS": [("C", "BTO", 2), ("C", "STO", 1)],
+    "ORB": [("C", "BTO", 0), ("C", "STO", 1)],
+    "Long Put": [("P", "BTO", -1)],
+}
+
+
+def generate_trade_log(n_trades, n_strategies=10, n_days=750, seed=0, start_date=START_DATE):  # -> pyarrow table
+    # n_days: trading days (business days) covered by the open dates. Newest trades first, like an OO export.
+    rng = np.random.default_rng(seed)
+    days = pd.bdate_range(start_date, periods=n_days + max(HOLD_DAYS))  # extra days for trades still held at the end
+    date_text = pa.array([f"{day.month}/{day.day}/{day.year}" for day in days])
+    month_text = pa.array([f"{day:%b}" for day in days])
+    day_text = pa.array([str(day.day) for day in days])
+    underlying = 4000 * np.exp(np.cumsum(rng.normal(0.0003, 0.01, len(days))))  # daily index price (random walk)
+
+    # ---- strategies: a leg structure, a trade frequency and a P/L distribution each ----
+    structure_names = list(STRUCTURES)
+    strat_structure = rng.integers(len(structure_names), size=n_strategies)
+    strategy_names = [f"Strategy {i + 1:02d} - {structure_names[s]}" for i, s in enumerate(strat_structure)]
+    strat_weight = rng.pareto(1.5, n_strategies) + 0.2
+    strat_mean = rng.normal(15, 25, n_strategies)
+    strat_std = rng.uniform(100, 400, n_strategies)
+
+    # ---- one row per trade ----
+    strat = rng.choice(n_strategies, size=n_trades, p=strat_weight / strat_weight.sum())
+    open_day = rng.integers(n_days, size=n_trades)
+    open_time = rng.integers(len(OPEN_TIMES), size=n_trades)
+    order = np.lexsort((-open_time, -open_day))  # newest first
+    strat, open_day, open_time = strat[order], open_day[order], open_time[order]
+    close_day = open_day + rng.choice(HOLD_DAYS, size=n_trades, p=HOLD_WEIGHTS)
+    contracts = rng.choice([1, 1, 1, 2, 3, 5], size=n_trades)
+    PL = np.round(rng.normal(strat_mean[strat], strat_std[strat]) * contracts * 2) / 2  # OO P/L is in 0.5 steps
+    opening_price = np.round(underlying[open_day], 2)
+    closing_price = np.round(underlying[close_day] * (1 + rng.normal(0, 0.002, n_trades)), 2)
+
+    legs, premium = _generate_legs(
+        rng, strat_structure[strat], contracts, opening_price, close_day, month_text, day_text
+    )
+    close_time = rng.choice(len(CLOSE_TIMES), n_trades, p=CLOSE_TIME_WEIGHTS)
+    # same day trades close at or after they open: close times before the open are drawn again (16:00 always fits)
+    open_seconds, close_seconds = _get_seconds(OPEN_TIMES)[open_time], _get_seconds(CLOSE_TIMES)
+    redraw = (close_day == open_day) & (close_seconds[close_time] < open_seconds)
+    while redraw.any():
+        close_time[redraw] = rng.choice(len(CLOSE_TIMES), int(redraw.sum()), p=CLOSE_TIME_WEIGHTS)
+        redraw &= close_seconds[close_time] < open_seconds
+    reason = rng.choice(len(REASONS), n_trades, p=REASON_WEIGHTS)
+    columns = {
+        "Strategy": pa.array(strategy_names).take(pa.array(strat)),
+        "Date Opened": date_text.take(pa.array(open_day)),
+        "Time Opened": pa.array(OPEN_TIMES).take(pa.array(open_time)),
+        "Opening Price": pa.array(opening_price),
+        "Legs": legs,
+        "Initial Premium": pa.array(premium),
+        "No. of Contracts": pa.array(contracts),
+        "P/L": pa.array(PL),
+        "Closing Price": pa.array(closing_price),
+        "Date Closed": date_text.take(pa.array(close_day)),
+        "Time Closed": pa.array(CLOSE_TIMES).take(pa.array(close_time)),
+        "Avg. Closing Cost": pa.array(np.round(premium * rng.uniform(0, 1.6, n_trades)).astype(np.int64)),
+        "Reason For Close": pa.array(REASONS).take(pa.array(reason)),
+    }
+    return pa.table({name: columns[name] for name in COLUMNS})
+
+
+def _get_seconds(times):  # "H:MM:SS" texts -> seconds since midnight
+    return np.array([sum(int(part) * unit for part, unit in zip(time.split(":"), (3600, 60, 1))) for time in times])
+
+
+def _generate_legs(rng, structure, contracts, opening_price, expiry_day, month_text, day_text):
+    # Legs strings built with pyarrow string kernels, one structure at a time (same leg count within a structure).
+    # Return Legs array (trade order) and the initial premium (per contract, negative = debit, like OO).
+    n_trades = len(structure)
+    width = rng.choice([5, 10, 15, 20, 25], size=n_trades)
+    atm_strike = np.round(opening_price / 5).astype(np.int64) * 5
+    premium = np.zeros(n_trades)
+    parts, positions = [], []
+    for code, name in enumerate(STRUCTURES):
+        rows = np.flatnonzero(structure == code)
+        if len(rows) == 0:
+            continue
+        common = [
+            pc.cast(pa.array(contracts[rows]), pa.string()),
+            month_text.take(pa.array(expiry_day[rows])),
+            day_text.take(pa.array(expiry_day[rows])),
+        ]
+        leg_text = []
+        for put_call, side, offset in STRUCTURES[name]:
+            cents = rng.integers(5, 1200, size=len(rows))  # leg price in cents
+            premium[rows] += np.where(side == "STO", cents, -cents)
+            price_text = pc.binary_join_element_wise(
+                pc.cast(pa.array(cents // 100), pa.string()),
+                pc.utf8_lpad(pc.cast(pa.array(cents % 100), pa.string()), 2, "0"),
+                ".",
+            )
+            strike_text = pc.cast(pa.array(atm_strike[rows] + offset * width[rows]), pa.string())
+            leg_text.append(pc.binary_join_element_wise(*common, strike_text, put_call, side, price_text, " "))
+        parts.append(pc.binary_join_element_wise(*leg_text, " | ") if len(leg_text) > 1 else leg_text[0])
+        positions.append(rows)
+    order = np.concatenate(positions)
+    legs = pa.concat_arrays(parts).take(pa.array(np.argsort(order)))
+    return legs, np.round(premium).astype(np.int64)
+
+
+def write_trade_log(table, output):  # csv path or binary file object. Unquoted, like the OO export
+    if isinstance(output, str):
+        with open(output, "wb") as f:
+            return write_trade_log(table, f)
+    output.write((",".join(table.column_names) + "\n").encode())
+    pa_csv.write_csv(table, output, pa_csv.WriteOptions(include_header=False, quoting_style="none"))
+
+
+def get_trade_log_bytes(n_trades, n_strategies=10, n_days=750, seed=0):  # csv file content, as uploaded
+    buffer = io.BytesIO()
+    write_trade_log(generate_trade_log(n_trades, n_strategies, n_days, seed), buffer)
+    return buffer.getvalue()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic Option Omega trade log (Demo csv schema).")
+    parser.add_argument("--trades", type=int, default=100_000, help="number of trades (rows)")
+    parser.add_argument("--strategies", type=int, default=10, help="number of strategies")
+    parser.add_argument("--days", type=int, default=750, help="trading days covered by the open dates")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default="synthetic_trade_log.csv")
+    args = parser.parse_args()
+    write_trade_log(generate_trade_log(args.trades, args.strategies, args.days, args.seed), args.output)
+    print(f"wrote {args.trades:,} trades to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
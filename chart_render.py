@@ -0,0 +1,54 @@
+import numpy as np
+import plotly.graph_objects as go
+
+# ---- render settings ----
+WEBGL_POINT_THRESHOLD = 1500  # traces with more points are drawn with WebGL instead of SVG
+MAX_PLOT_POINTS = 2000  # long series are downsampled to about this many points
+RENDER_MODES = ["auto", "full"]  # auto: WebGL + downsampling above the thresholds. full: every point as SVG
+POSITIVE_COLOR = "#5eb6af"
+NEGATIVE_COLOR = "#f99898"
+
+
+def downsample_min_max(y, max_points=MAX_PLOT_POINTS):  # indices of points to keep (sorted)
+    # Min/max bucketing: split the series into max_points / 2 buckets and keep the lowest and highest point of each,
+    # plus the first and last point. Every peak and trough (i.e. max drawdown) is kept exactly.
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n <= max_points:
+        return np.arange(n)
+    n_buckets = max(max_points // 2, 1)
+    bucket_size = -(-n // n_buckets)  # ceil
+    padded = np.full(n_buckets * bucket_size, np.nan)
+    padded[:n] = y
+    buckets = padded.reshape(n_buckets, bucket_size)
+    valid = ~np.all(np.isnan(buckets), axis=1)  # last bucket can be all padding
+    offsets = np.arange(n_buckets)[valid] * bucket_size
+    lows = offsets + np.nanargmin(buckets[valid], axis=1)
+    highs = offsets + np.nanargmax(buckets[valid], axis=1)
+    return np.unique(np.concatenate(([0, n - 1], lows, highs)))
+
+
+def downsample_series(x, y, render_mode="auto", max_points=MAX_PLOT_POINTS):  # return x, y to plot
+    x, y = np.asarray(x), np.asarray(y)
+    if render_mode == "full" or len(y) <= max_points:
+        return x, y
+    keep = downsample_min_max(y, max_points)
+    return x[keep], y[keep]
+
+
+def get_scatter_class(n_points, render_mode="auto"):  # go.Scattergl for long traces, go.Scatter otherwise
+    if render_mode == "auto" and n_points > WEBGL_POINT_THRESHOLD:
+        return go.Scattergl
+    return go.Scatter
+
+
+def get_bar_colors(values):  # red for negative, green otherwise (vectorized)
+    return np.where(np.asarray(values) < 0, NEGATIVE_COLOR, POSITIVE_COLOR)
+
+
+def get_figure_payload_bytes(fig):  # size of the figure json sent to the browser
+    return len(fig.to_json())
+
+
+def get_trace_point_count(fig):  # total points over all traces of a figure
+    return int(sum(len(trace.x) if trace.x is not None else 0 for trace in fig.data))
@@ -0,0 +1,75 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from profiling import instrument_functions
+
+# ---- correlation cache settings ----
+MAX_CACHED_CORRELATIONS = 32  # [strategies x strategies] matrices: 300 strategies = ~0.7 MB per matrix
+TOP_PAIRS = 10  # most redundant pairs listed under the heatmap
+
+_correlation_cache = OrderedDict()  # (dataset key, filter key) -> result, least recently used first. All sessions.
+_correlation_lock = threading.Lock()
+
+
+# ==== strategy x strategy statistics from the [days x strategies] daily P/L matrix =====
+# Every pair comes out of one matrix product over the days, so 300 strategies is a [300 x days] @ [days x 300]
+# product instead of 45k pairwise merges. Days a strategy did not trade count as 0 P/L (its contribution to the
+# portfolio that day). Co-drawdown overlap: days both strategies are below their own P/L high / days either is.
+def build_strategy_correlation(strategy_daily_PL):  # input: risk_metrics.get_strategy_daily_PL format
+    strategies = strategy_daily_PL["strategies"]
+    PL = np.asarray(strategy_daily_PL["PL"], dtype=np.float64)
+    n_days = len(PL)
+    centered = PL - PL.mean(axis=0) if n_days else PL
+    covariance = centered.T @ centered / max(n_days - 1, 1)
+    std = np.sqrt(np.diag(covariance))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        correlation = covariance / np.outer(std, std)
+    correlation[np.outer(std, std) == 0] = np.nan  # strategies with constant P/L have no correlation
+    # co-drawdown: [days x strategies] in-DD flags, overlap counts of every pair in one product
+    cum_PL = np.cumsum(PL, axis=0)
+    in_DD = (np.maximum.accumulate(cum_PL, axis=0) - cum_PL > 0).astype(np.float64)
+    both_in_DD = in_DD.T @ in_DD
+    DD_days = np.diag(both_in_DD)
+    either_in_DD = DD_days[:, None] + DD_days[None, :] - both_in_DD
+    with np.errstate(divide="ignore", invalid="ignore"):
+        co_DD = np.where(either_in_DD > 0, both_in_DD / either_in_DD * 100, np.nan)
+    return {
+        "strategies": strategies,
+        "correlation": correlation,
+        "covariance": covariance,
+        "co_DD": co_DD,  # % of drawdown days shared
+        "pairs": get_top_pairs(strategies, correlation, co_DD),
+    }
+
+
+def get_top_pairs(strategies, correlation, co_DD, n_pairs=TOP_PAIRS):  # most correlated pairs (upper triangle)
+    first, second = np.triu_indices(len(strategies), k=1)
+    pair_correlation = correlation[first, second]
+    order = np.argsort(-np.nan_to_num(pair_correlation, nan=-np.inf), kind="stable")[:n_pairs]
+    return pd.DataFrame(
+        {
+            "Strategy": strategies[first[order]],
+            "Other strategy": strategies[second[order]],
+            "Correlation": pair_correlation[order],
+            "Co-DD %": co_DD[first[order], second[order]],
+        }
+    )
+
+
+def get_strategy_correlation(strategy_daily_PL, key):  # cached build_strategy_correlation. key: dataset + filters
+    with _correlation_lock:
+        result = _correlation_cache.get(key)
+        if result is not None:
+            _correlation_cache.move_to_end(key)
+            return result
+    result = build_strategy_correlation(strategy_daily_PL)
+    with _correlation_lock:
+        _correlation_cache[key] = result
+        while len(_correlation_cache) > MAX_CACHED_CORRELATIONS:
+            _correlation_cache.popitem(last=False)
+    return result
+
+
+instrument_functions(globals())  # wall time / calls / memory per function when profiling is on
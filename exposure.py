@@ -0,0 +1,138 @@
+import numpy as np
+import pandas as pd
+from trade_schema import TRADE_COUNT_COLUMN
+from risk_metrics import PORTFOLIO_NAME
+from profiling import instrument_functions
+
+# ---- exposure settings ----
+EXPOSURE_COLUMNS = [
+    "Strategy",
+    "Date Opened",
+    "Time Opened",
+    "Date Closed",
+    "Time Closed",
+    "Initial Premium",
+    "No. of Contracts",
+]
+MISSING_CLOSE_TIME = pd.Timedelta(days=1) - pd.Timedelta(seconds=1)  # close time unknown: held until end of day
+
+
+# ==== event sweep line: open / close events sorted once, running sums give the state after every event =====
+# Every trade adds +1 position and +capital at its open time and the opposite at its close time. Sorting the 2n
+# events by (time, close before open) and taking cumulative sums gives the number of open positions and the
+# capital committed after each event, in O(n log n) for any number of days. Per strategy it is the same sweep on
+# events sorted by (strategy, time), with the cumulative sums restarted at every strategy boundary.
+# Capital at risk is |Initial Premium| x contracts (premium paid or received per trade): margin is not in the log.
+# Trades not closed yet (no close date) stay open until the end of the data. A trade is open from its open time
+# (included) to its close time (excluded), so a trade closed at its open time is never counted.
+def has_exposure_columns(dataframe):  # trade level data with open / close times (not large file mode)
+    return TRADE_COUNT_COLUMN not in dataframe.columns and all(col in dataframe.columns for col in EXPOSURE_COLUMNS)
+
+
+def build_exposure(dataframe):
+    open_time = get_event_times(dataframe["Date Opened"], dataframe["Time Opened"], pd.Timedelta(0))
+    close_time = get_event_times(dataframe["Date Closed"], dataframe["Time Closed"], MISSING_CLOSE_TIME)
+    capital = (
+        dataframe["Initial Premium"].abs().to_numpy(dtype=np.float64, na_value=0)
+        * dataframe["No. of Contracts"].to_numpy(dtype=np.float64, na_value=0)
+    )
+    strat_codes, strategies = pd.factorize(dataframe["Strategy"], sort=True)
+    valid = ~np.isnat(open_time) & (strat_codes >= 0)
+    open_time, close_time, capital, strat_codes = open_time[valid], close_time[valid], capital[valid], strat_codes[valid]
+    still_open = np.isnat(close_time)
+    if still_open.any():
+        close_time[still_open] = np.concatenate([open_time, close_time[~still_open]]).max()
+    # a close before the open (bad export row) would leave -1 position / -capital behind: the trade closes at its open
+    close_time = np.maximum(close_time, open_time)
+    n_trades = len(open_time)
+
+    # ---- 2n events: opens then closes ----
+    times = np.concatenate([open_time, close_time])
+    is_open = np.repeat([1, 0], n_trades)  # 0 sorts first: a close frees its position before an open at that time
+    position_delta = np.where(is_open == 1, 1, -1)
+    capital_delta = np.concatenate([capital, -capital])
+    codes = np.concatenate([strat_codes, strat_codes])
+    order = np.lexsort((is_open, times))
+    portfolio = _sweep(times[order], position_delta[order], capital_delta[order], np.full(2 * n_trades, -1))
+    order = np.lexsort((is_open, times, codes))
+    per_strategy = _sweep(times[order], position_delta[order], capital_delta[order], codes[order])
+    return {
+        "strategies": pd.Index(strategies),
+        "portfolio": portfolio.drop(columns="group"),
+        "per_strategy": per_strategy.drop(columns="group"),  # events sorted by strategy then time
+        # events of strategy i: per_strategy rows bounds[i]:bounds[i + 1]
+        "bounds": np.searchsorted(per_strategy["group"].to_numpy(), np.arange(len(strategies) + 1)),
+        "peaks": _get_peaks(pd.concat([portfolio, per_strategy], ignore_index=True), strategies),
+        "daily_peaks": _get_daily_peaks(portfolio),
+    }
+
+
+def get_event_times(dates, times, missing_time):  # date + time of day columns -> datetime64[ns] array
+    time_codes, time_values = pd.factorize(times)  # a log has few distinct times: parse each once
+    time_of_day = pd.to_timedelta(pd.Index(time_values).astype(str), errors="coerce").fillna(missing_time)
+    time_of_day = np.append(time_of_day.to_numpy(dtype="timedelta64[ns]"), np.timedelta64(missing_time))[time_codes]
+    return pd.to_datetime(dates).to_numpy(dtype="datetime64[ns]") + time_of_day
+
+
+def _sweep(times, position_delta, capital_delta, group):  # running state after every event (input sorted by group)
+    is_start = np.r_[True, group[1:] != group[:-1]] if len(group) else np.zeros(0, dtype=bool)
+    positions = _group_cumsum(position_delta, is_start)
+    capital = _group_cumsum(capital_delta, is_start)
+    # events at the same time (and group) are one step: keep the state after the last of them
+    is_last = np.r_[(times[1:] != times[:-1]) | is_start[1:], True] if len(times) else is_start
+    return pd.DataFrame(
+        {
+            "time": times[is_last],
+            "positions": positions[is_last],
+            "capital": np.round(capital[is_last], 6),  # cumulative sum rounding noise
+            "group": group[is_last],
+        }
+    )
+
+
+def _group_cumsum(values, is_start):  # cumulative sum restarted at every group start
+    total = np.cumsum(values)
+    starts = np.flatnonzero(is_start)
+    # subtract the total reached before each group's first value from every value of the group
+    return total - np.repeat(total[starts] - values[starts], np.diff(np.r_[starts, len(values)]))
+
+
+def _get_peaks(events, strategies):  # peak positions / capital (and first time reached) per series
+    groups = events["group"].to_numpy()
+    columns = {}
+    for metric, label in (("positions", "Peak positions"), ("capital", "Peak capital")):
+        # sorted by (group, -value, time): the first row of each group is its peak
+        order = np.lexsort((events["time"].to_numpy(), -events[metric].to_numpy(), groups))
+        first = order[np.r_[True, groups[order][1:] != groups[order][:-1]]] if len(order) else order
+        peaks = pd.DataFrame(
+            {label: events[metric].to_numpy()[first], f"{label} time": events["time"].to_numpy()[first]},
+            index=groups[first],
+        )
+        columns.update({col: peaks[col] for col in peaks.columns})
+    df_peaks = pd.DataFrame(columns).reindex(np.arange(-1, len(strategies)))  # group -1: portfolio
+    df_peaks.index = pd.Index([PORTFOLIO_NAME, *strategies], name="Series")
+    return df_peaks
+
+
+def _get_daily_peaks(portfolio):  # highest portfolio state of every day with events (reduceat, no loop per day)
+    days = portfolio["time"].to_numpy().astype("datetime64[D]")
+    if not len(days):
+        return pd.DataFrame({"Date": days, "positions": [], "capital": []})
+    starts = np.flatnonzero(np.r_[True, days[1:] != days[:-1]])
+    return pd.DataFrame(
+        {
+            "Date": days[starts].astype("datetime64[ns]"),
+            "positions": np.maximum.reduceat(portfolio["positions"].to_numpy(), starts),
+            "capital": np.maximum.reduceat(portfolio["capital"].to_numpy(), starts),
+        }
+    )
+
+
+def get_exposure_series(exposure, series=PORTFOLIO_NAME):  # time, positions, capital of the portfolio or a strategy
+    if series == PORTFOLIO_NAME:
+        return exposure["portfolio"]
+    position = exposure["strategies"].get_loc(series)
+    return exposure["per_strategy"].iloc[exposure["bounds"][position] : exposure["bounds"][position + 1]]
+
+
+instrument_functions(globals())  # wall time / calls / memory per function when profiling is on
@@ -0,0 +1,47 @@
+import threading
+from collections import OrderedDict
+
+from profiling import instrument_functions
+
+# ---- figure cache settings ----
+MAX_CACHED_FIGURES = 64  # built plotly figures. Long series are downsampled (chart_render), so most are < 1 MB
+
+_figure_cache = OrderedDict()  # (figure name, key) -> figure, least recently used first. All sessions.
+_figure_lock = threading.Lock()
+_figure_stats = {"hits": 0, "misses": 0}
+
+
+# ==== built figures keyed by what feeds them (dataset, filters, starting fund, render mode) =====
+# Switching tabs or applying the same filters again serves the figure built the first time. Cached figures are
+# shared by sessions and must not be changed after build (st.plotly_chart only reads them).
+def get_cached_figure(name, key, build):  # build() on a miss. key None: always build, nothing cached
+    if key is None:
+        return build()
+    cache_key = (name, key)
+    with _figure_lock:
+        fig = _figure_cache.get(cache_key)
+        if fig is not None:
+            _figure_cache.move_to_end(cache_key)
+            _figure_stats["hits"] += 1
+            return fig
+        _figure_stats["misses"] += 1
+    fig = build()
+    with _figure_lock:
+        _figure_cache[cache_key] = fig
+        while len(_figure_cache) > MAX_CACHED_FIGURES:
+            _figure_cache.popitem(last=False)
+    return fig
+
+
+def get_figure_cache_stats():  # hits, misses, cached figures
+    with _figure_lock:
+        return {**_figure_stats, "figures": len(_figure_cache)}
+
+
+def clear_figure_cache():
+    with _figure_lock:
+        _figure_cache.clear()
+        _figure_stats.update(hits=0, misses=0)
+
+
+instrument_functions(globals())  # wall time / calls / memory per function when profiling is on
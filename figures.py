@@ -0,0 +1,580 @@
+import numpy as np
+import plotly.express as px
+import plotly.graph_objects as go
+from plotly.subplots import make_subplots
+from chart_render import downsample_series, get_scatter_class, get_bar_colors
+from legs import BREAKDOWN_COLUMNS
+from profiling import instrument_functions
+
+# Figure builders: plotly figures only, no streamlit call. The dashboard shows them with utility.show_* (render mode
+# from the Import tab), report.py writes them as static html.
+
+# ---- figure settings ----
+MAX_DD_PANELS = 24  # small multiples of get_strategy_DD_figure: the deepest draw downs only
+
+
+def get_daily_PL_cum_PL_figure(dataframe, render_mode="auto"):  # need to use PL type dataframe
+    x_cum_PL, y_cum_PL = downsample_series(dataframe["Date Closed"], dataframe["cum_PL"], render_mode)
+    x_daily_PL, y_daily_PL = downsample_series(dataframe["Date Closed"], dataframe["Daily_PL"], render_mode)
+    fig = make_subplots(
+        rows=2,
+        cols=1,
+        row_heights=[0.3, 0.25],
+        shared_xaxes=True,
+        vertical_spacing=0.05,
+    )
+    ######  PL curve  ######
+    fig.add_trace(
+        get_scatter_class(len(y_cum_PL), render_mode)(
+            x=x_cum_PL,
+            y=y_cum_PL,
+            name="Cumulative P/L",
+            line_color="#e1aa00",
+            mode="lines+markers",
+            marker=dict(
+                symbol="circle",
+                size=4,
+                color="#e1aa00",  # opacity=1,
+                line=dict(
+                    # color="#1A1A1A",  # Set the outline color
+                    width=0.2,
+                ),
+            ),
+        ),
+        row=1,
+        col=1,
+    )
+
+    ######  Daily PL bar chart ######
+    bar_colors = get_bar_colors(y_daily_PL)  # Create a color list
+
+    fig.add_trace(
+        go.Bar(
+            x=x_daily_PL,
+            y=y_daily_PL,
+            name="Daily P/L",
+            opacity=0.8,
+            marker_color=bar_colors,
+        ),
+        row=2,
+        col=1,
+    )
+
+    fig.update_yaxes(
+        title_text="Cumulative P/L",
+        row=1,
+        col=1,
+    )
+    fig.update_yaxes(
+        title_text="Daily P/L",
+        row=2,
+        col=1,
+    )
+
+    fig.update_layout(
+        height=500,
+        width=800,
+        title_text="Daily and Cumulative P/L",
+        # xaxis_title="Date",
+        template="plotly_dark",
+        legend=dict(
+            orientation="h",
+            yanchor="middle",
+            y=1.05,
+            xanchor="center",
+            x=0.5,
+        ),
+    )
+    return fig
+
+
+def get_PL_DD_figure(dataframe, starting_fund, render_mode="auto"):  # PL type dataframe. Starting fund used for PL %
+    PL_pct = dataframe["cum_PL"] / starting_fund * 100
+    x_PL_pct, y_PL_pct = downsample_series(dataframe["Date Closed"], PL_pct, render_mode)
+    x_DD_pct, y_DD_pct = downsample_series(dataframe["Date Closed"], dataframe["DD_pct_startingfund"], render_mode)
+    x_DD_days, y_DD_days = downsample_series(dataframe["Date Closed"], dataframe["DD_duration"], render_mode)
+    fig = make_subplots(
+        rows=3,
+        cols=1,
+        row_heights=[0.15, 0.15, 0.15],
+        shared_xaxes=True,
+        vertical_spacing=0.06,
+    )
+    ######  Live PL % ######
+    fig.add_trace(
+        get_scatter_class(len(y_PL_pct), render_mode)(
+            x=x_PL_pct,
+            y=y_PL_pct,
+            name="PL %",
+            line_color="#e1aa00",
+            mode="lines+markers",
+            marker=dict(
+                symbol="circle",
+                size=4,
+                color="#e1aa00",  # opacity=1,
+                line=dict(
+                    # color="#1A1A1A",  # Set the outline color
+                    width=0.2,
+                ),
+            ),
+        ),
+        row=1,
+        col=1,
+    )
+    ######  DD % based on starting fund ######
+    fig.add_trace(
+        get_scatter_class(len(y_DD_pct), render_mode)(
+            x=x_DD_pct,
+            y=y_DD_pct,
+            name="DD / starting fund",
+            fill="tozeroy",
+            fillcolor="rgba(255, 0, 0, 0.15)",  # Red fill. last value is opacity
+            line_color="red",
+        ),
+        row=2,
+        col=1,
+    )
+    ######  DD duration ######
+    fig.add_trace(
+        get_scatter_class(len(y_DD_days), render_mode)(
+            x=x_DD_days,
+            y=y_DD_days,
+            name="DD Duration (days)",
+            fill="tozeroy",
+            fillcolor="rgba(0, 176, 160, 0.15)",  # last value is opacity
+            line_color="#00b0a0",  # same green used on OO website
+        ),
+        row=3,
+        col=1,
+    )
+    # ######  DD amount ######
+    # fig.add_trace(
+    #     go.Scatter(
+    #         x=dataframe["Date Closed"],
+    #         y=dataframe["DD"],
+    #         name="DD amount",
+    #     ),
+    #     row=4,
+    #     col=1,
+    # )
+
+    fig.update_yaxes(title_text="P/L %", row=1, col=1)
+    fig.update_yaxes(title_text="DD %", row=2, col=1)
+    fig.update_yaxes(title_text="DD days", row=3, col=1)
+    # fig.update_yaxes(title_text="DD $", row=4, col=1)
+
+    # fig.update_xaxes(showline=True, linecolor="#525252", linewidth=0.5, mirror=True)
+    # fig.update_yaxes(showline=True, linecolor="#525252", linewidth=0.5, mirror=True)
+
+    fig.update_layout(
+        height=500,
+        width=500,
+        title_text="P/L & Draw Down Graphs",
+        # xaxis_title="Date",
+        template="plotly_dark",
+        legend=dict(
+            orientation="h",
+            yanchor="middle",
+            y=1.08,
+            xanchor="center",
+            x=0.5,
+        ),
+    )
+    return fig
+
+
+def get_monte_carlo_figure(simulation, df_PL, starting_fund):  # run_monte_carlo result + realized PL dataframe
+    # percentile bands of the simulated paths (% of starting fund), realized path drawn on top
+    percentiles = simulation["percentiles"]
+    dates = simulation["dates"]
+    fig = make_subplots(
+        rows=2,
+        cols=1,
+        row_heights=[0.2, 0.15],
+        shared_xaxes=True,
+        vertical_spacing=0.06,
+    )
+    for row, bands, realized, color in (
+        (1, simulation["PL_bands"], df_PL["cum_PL"], "225, 170, 0"),
+        (2, simulation["DD_bands"], df_PL["DD"], "255, 0, 0"),
+    ):
+        bands = bands / starting_fund * 100
+        # outer pairs of percentiles as filled bands (i.e. 5-95, 25-75), middle percentile as the median line
+        for i in range(len(percentiles) // 2):
+            fig.add_trace(
+                go.Scatter(x=dates, y=bands[-1 - i], line=dict(width=0), showlegend=False, hoverinfo="skip"),
+                row=row,
+                col=1,
+            )
+            fig.add_trace(
+                go.Scatter(
+                    x=dates,
+                    y=bands[i],
+                    name=f"{percentiles[i]}-{percentiles[-1 - i]}th pct",
+                    fill="tonexty",
+                    fillcolor=f"rgba({color}, {0.12 * (i + 1)})",
+                    line=dict(width=0),
+                    showlegend=row == 1,
+                ),
+                row=row,
+                col=1,
+            )
+        fig.add_trace(
+            go.Scatter(
+                x=dates,
+                y=bands[len(percentiles) // 2],
+                name="Median",
+                line=dict(color=f"rgb({color})", dash="dot", width=1),
+                showlegend=row == 1,
+            ),
+            row=row,
+            col=1,
+        )
+        fig.add_trace(
+            go.Scatter(
+                x=df_PL["Date Closed"],
+                y=realized / starting_fund * 100,
+                name="Realized",
+                line_color="#00b0a0",
+                showlegend=row == 1,
+            ),
+            row=row,
+            col=1,
+        )
+
+    fig.update_yaxes(title_text="P/L %", row=1, col=1)
+    fig.update_yaxes(title_text="DD %", row=2, col=1)
+    fig.update_layout(
+        height=500,
+        width=500,
+        title_text=f"Monte Carlo: {simulation['n_paths']:,} paths",
+        template="plotly_dark",
+        legend=dict(
+            orientation="h",
+            yanchor="middle",
+            y=1.08,
+            xanchor="center",
+            x=0.5,
+        ),
+    )
+    return fig
+
+
+def get_PL_per_strategy_figure(dataframe):  # need P/L per strategy (get_PL_per_strategy or get_cube_strategy_PL)
+    pivot_table = dataframe.sort_values(by="P/L")
+    fig = go.Figure()
+    ## bar chart: PL per strategy ##
+    fig.add_trace(
+        go.Bar(
+            y=pivot_table["Strategy"],
+            x=pivot_table["P/L"],
+            # x=pivot_table["P/L"] / starting_fund * 100, # convert to percentage of starting fund
+            orientation="h",
+            # name='xxx',
+            # opacity=1,
+        )
+    )
+    fig.update_layout(
+        title="PL per Strategy",
+        # yaxis_title='Strategy',
+        # xaxis_title="PL per Strategy",
+        width=800,
+        height=170 + 25 * len(pivot_table),  # adjust height based on # of strategies
+        template="plotly_dark",
+        # legend=dict(orientation="h", yanchor="bottom", y=1.05, xanchor="center", x=0.5),
+    )
+    return fig
+
+
+def get_open_date_figure(dataframe, render_mode="auto"):  # trade level data (or get_cube_open_dates)
+    df_points = dataframe[["Date Opened", "Strategy"]]
+    if render_mode == "auto":  # trades on the same day and strategy draw the same marker: send it once
+        df_points = df_points.drop_duplicates()
+    fig = go.Figure()
+
+    fig.add_trace(
+        get_scatter_class(len(df_points.index), render_mode)(
+            x=df_points["Date Opened"],
+            y=df_points["Strategy"],
+            mode="markers",
+            # name="",
+            marker=dict(
+                color="#776538",
+                size=8,
+                symbol="circle",
+                line=dict(
+                    width=1.5,
+                    color="#e1aa00",
+                ),
+            ),
+        )
+    )
+
+    fig.update_layout(
+        title="Trade open date per strategy",
+        xaxis_title="Date Opened",
+        # yaxis_title="",
+        width=800,
+        height=170 + 25 * len(dataframe["Strategy"].unique()),  # adjusted by strategy number
+        template="plotly_dark",
+        # legend=dict(orientation="h", yanchor="bottom", y=1.05, xanchor="center", x=0.5),
+    )
+    return fig
+
+
+def get_PL_distribution_figures(dataframe, starting_fund):  # PL type dataframe. Return daily PL, daily trades figures
+    bar_color = "#636efa"
+    # --- daily PL distribution ---
+    fig_dailyPL = px.histogram(
+        dataframe,
+        x=dataframe["Daily_PL"] / starting_fund * 100,  # PL as a percentage of starting fund
+        nbins=80,
+        title="Daily PL Distribution",
+        color_discrete_sequence=[bar_color] * len(dataframe),  # use single color for all bars
+        opacity=0.8,
+    )
+    fig_dailyPL.update_layout(
+        width=500,
+        height=360,
+        xaxis_title_text="Daily PL (% of starting fund)",
+        yaxis_title_text="Count",
+        bargap=0.1,  # gap between bars of adjacent location coordinates
+        template="plotly_dark",
+        # xaxis=dict(
+        #     tickmode="linear",
+        #     tick0=0,
+        #     # dtick = 200
+        # ),
+    )
+    # --- daily trade number distribution ---
+    fig_dailytrades = px.histogram(
+        dataframe,
+        x="Daily_count",
+        nbins=20,
+        title="Daily Trade # Distribution",
+        color_discrete_sequence=[bar_color] * len(dataframe),  # use single color for all bars
+        opacity=0.8,
+    )
+
+    fig_dailytrades.update_layout(
+        width=500,
+        height=360,
+        xaxis_title_text="Daily (Closed) Trade Number",
+        yaxis_title_text="Count",
+        bargap=0.1,  # gap between bars of adjacent location coordinates
+        template="plotly_dark",
+        # xaxis = dict(
+        #     tickmode = 'linear',
+        #     tick0 = 0,
+        #     dtick = 100
+        # )
+    )
+    return fig_dailyPL, fig_dailytrades
+
+
+def get_rolling_metric_figure(rolling, metric, per_strategy=False, render_mode="auto"):  # get_rolling_metrics result
+    labels = rolling["labels"]
+    # portfolio only, or every strategy (portfolio is column 0)
+    columns = range(1, len(rolling["series"])) if per_strategy else [0]
+    fig = go.Figure()
+    for column in columns:
+        x, y = downsample_series(rolling["dates"], rolling[metric][:, column], render_mode)
+        fig.add_trace(get_scatter_class(len(y), render_mode)(x=x, y=y, name=rolling["series"][column], mode="lines"))
+    fig.update_layout(
+        title=f"Rolling {labels[metric]}",
+        yaxis_title=labels[metric],
+        width=800,
+        height=360,
+        showlegend=per_strategy,
+        template="plotly_dark",
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="center", x=0.5),
+    )
+    return fig
+
+
+def get_exposure_figure(df_exposure, title, render_mode="auto"):  # exposure.get_exposure_series result
+    # step lines: the state holds from one event to the next. Downsampling keeps every peak (min / max per bucket)
+    x_positions, y_positions = downsample_series(df_exposure["time"], df_exposure["positions"], render_mode)
+    x_capital, y_capital = downsample_series(df_exposure["time"], df_exposure["capital"], render_mode)
+    fig = make_subplots(rows=2, cols=1, shared_xaxes=True, vertical_spacing=0.06)
+    fig.add_trace(
+        get_scatter_class(len(y_positions), render_mode)(
+            x=x_positions, y=y_positions, name="Open positions", line_color="#636efa", line_shape="hv"
+        ),
+        row=1,
+        col=1,
+    )
+    fig.add_trace(
+        get_scatter_class(len(y_capital), render_mode)(
+            x=x_capital,
+            y=y_capital,
+            name="Capital at risk",
+            line_color="#e1aa00",
+            line_shape="hv",
+            fill="tozeroy",
+            fillcolor="rgba(225, 170, 0, 0.15)",  # last value is opacity
+        ),
+        row=2,
+        col=1,
+    )
+    fig.update_layout(
+        title=title,
+        width=800,
+        height=480,
+        template="plotly_dark",
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="center", x=0.5),
+    )
+    fig.update_yaxes(title_text="Positions", row=1, col=1)
+    fig.update_yaxes(title_text="Capital", row=2, col=1)
+    return fig
+
+
+def get_strategy_DD_figure(df_long, metric="DD", max_panels=MAX_DD_PANELS, render_mode="auto"):
+    # small multiples of the long form table of analytics.add_strategy_PL_metrics: one DD panel per strategy, the
+    # max_panels deepest first. Shared axes, so panels compare at a glance.
+    strategies = df_long["Strategy"].to_numpy()
+    starts = np.flatnonzero(np.r_[True, strategies[1:] != strategies[:-1]]) if len(strategies) else np.zeros(0, int)
+    bounds = np.r_[starts, len(strategies)]  # rows of panel i: bounds[i]:bounds[i + 1]
+    depth = np.maximum.reduceat(df_long[metric].to_numpy(), starts) if len(starts) else np.zeros(0)
+    panels = np.argsort(-depth, kind="stable")[:max_panels]
+    n_cols = min(3, max(len(panels), 1))
+    n_rows = max(-(-len(panels) // n_cols), 1)
+    fig = make_subplots(
+        rows=n_rows,
+        cols=n_cols,
+        shared_xaxes="all",
+        shared_yaxes="all",
+        vertical_spacing=min(0.08, 0.3 / n_rows),
+        horizontal_spacing=0.04,
+        subplot_titles=[str(df_long["Strategy"].iat[starts[panel]]) for panel in panels],
+    )
+    for position, panel in enumerate(panels):
+        df_strat = df_long.iloc[bounds[panel] : bounds[panel + 1]]
+        x, y = downsample_series(df_strat["Date Closed"], df_strat[metric], render_mode)
+        fig.add_trace(
+            get_scatter_class(len(y), render_mode)(
+                x=x,
+                y=y,
+                name=str(df_strat["Strategy"].iat[0]),
+                fill="tozeroy",
+                fillcolor="rgba(255, 0, 0, 0.15)",  # Red fill. last value is opacity
+                line_color="red",
+                line_width=1,
+            ),
+            row=position // n_cols + 1,
+            col=position % n_cols + 1,
+        )
+    fig.update_annotations(font_size=11)
+    fig.update_layout(
+        title="Draw Down per Strategy" + (" (% of starting fund)" if metric == "DD_pct_startingfund" else " ($)"),
+        width=800,
+        height=120 + 160 * n_rows,
+        showlegend=False,
+        template="plotly_dark",
+    )
+    return fig
+
+
+def get_allocation_figure(allocation, render_mode="auto"):  # need allocation.optimize_allocation result
+    # every candidate as a point (max DD, P/L), the frontier on top, the current selection as a star
+    df_scores = allocation["scores"]
+    df_frontier = allocation["frontier"].sort_values("Max DD")
+    fig = go.Figure()
+    fig.add_trace(
+        get_scatter_class(len(df_scores.index), render_mode)(
+            x=df_scores["Max DD"],
+            y=df_scores["P/L"],
+            name="Candidates",
+            mode="markers",
+            marker=dict(size=4, color="#636efa", opacity=0.35),
+        )
+    )
+    fig.add_trace(
+        go.Scatter(
+            x=df_frontier["Max DD"],
+            y=df_frontier["P/L"],
+            name="Frontier",
+            mode="lines+markers",
+            line_color="#e1aa00",
+            marker=dict(size=7),
+            text=df_frontier["Strategies"],
+            hovertemplate="%{text}<br>Max DD %{x:,.0f}<br>P/L %{y:,.0f}<extra></extra>",
+        )
+    )
+    fig.add_trace(
+        go.Scatter(
+            x=df_scores["Max DD"].iloc[:1],
+            y=df_scores["P/L"].iloc[:1],
+            name="Current selection",
+            mode="markers",
+            marker=dict(size=14, symbol="star", color="#00b0a0"),
+        )
+    )
+    fig.update_layout(
+        title=f"Allocation Candidates ({len(df_scores.index):,})",
+        xaxis_title="Max DD",
+        yaxis_title="P/L",
+        width=800,
+        height=440,
+        template="plotly_dark",
+        legend=dict(orientation="h", yanchor="bottom", y=1.02, xanchor="center", x=0.5),
+    )
+    return fig
+
+
+def get_leg_breakdown_figure(df_breakdown, by):  # need legs.get_leg_breakdown result, grouped by column "by"
+    group_labels = df_breakdown[by].astype(str)
+    fig = make_subplots(rows=1, cols=2, shared_yaxes=True, horizontal_spacing=0.03, subplot_titles=("P/L", "Trades"))
+    fig.add_trace(
+        go.Bar(
+            y=group_labels,
+            x=df_breakdown["P/L"],
+            orientation="h",
+            name="P/L",
+            marker_color=get_bar_colors(df_breakdown["P/L"]),
+            customdata=df_breakdown["win_rate"],
+            hovertemplate="%{y}: %{x:,.0f} (win rate %{customdata:.1f}%)<extra></extra>",
+        ),
+        row=1,
+        col=1,
+    )
+    fig.add_trace(
+        go.Bar(y=group_labels, x=df_breakdown["trades"], orientation="h", name="Trades", marker_color="#636efa"),
+        row=1,
+        col=2,
+    )
+    fig.update_yaxes(type="category")
+    fig.update_layout(
+        title=f"P/L by {BREAKDOWN_COLUMNS[by].lower()}",
+        width=800,
+        height=170 + 25 * len(df_breakdown),  # adjust height based on # of groups
+        showlegend=False,
+        template="plotly_dark",
+    )
+    return fig
+
+
+def get_correlation_heatmap_figure(matrix, strategies, title, zmin=-1, zmax=1):  # strategy x strategy heatmap
+    fig = go.Figure(
+        go.Heatmap(
+            z=matrix,
+            x=strategies,
+            y=strategies,
+            zmin=zmin,
+            zmax=zmax,
+            colorscale="RdBu_r",
+            hovertemplate="%{y} / %{x}: %{z:.2f}<extra></extra>",
+        )
+    )
+    fig.update_layout(
+        title=title,
+        width=800,
+        height=min(250 + 25 * len(strategies), 900),  # adjust height based on # of strategies (capped)
+        template="plotly_dark",
+    )
+    fig.update_xaxes(showticklabels=len(strategies) <= 40)  # labels of hundreds of strategies overlap: hover only
+    fig.update_yaxes(showticklabels=len(strategies) <= 40, autorange="reversed")
+    return fig
+
+
+instrument_functions(globals())  # wall time / calls / memory per function when profiling is on
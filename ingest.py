@@ -0,0 +1,306 @@
+import hashlib
+import io
+import os
+import pickle
+import threading
+import weakref
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from trade_schema import ACCOUNT_COLUMN, DATE_COLUMNS, PL_COLUMNS, TRADE_COUNT_COLUMN, TRADE_KEY_COLUMNS
+from analytics import compact_trade_log, data_prep, detect_date_format, parse_dates
+from legs import build_leg_table, get_trade_structure
+from process_pools import map_process_pool
+from profiling import instrument_functions
+
+# ---- cache settings ----
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "trade_logs")  # None: memory only
+CACHE_VERSION = 3  # bump when data_prep output changes, so old disk entries are ignored
+MAX_MEMORY_CACHE_BYTES = 512 * 1024**2  # in-memory cap for parsed frames
+STREAM_CHUNK_ROWS = 200_000  # rows per chunk in streaming mode (bounds peak memory)
+STREAM_FOLD_EVERY = 8  # merge partial aggregates after this many chunks
+HASH_BLOCK_BYTES = 8 * 1024**2
+PARSE_WORKERS = os.cpu_count() or 1  # processes parsing files of a multi-file import
+# spawned workers import this module fresh: forking the multi-threaded streamlit server is not safe
+PARSE_START_METHOD = "spawn"
+
+# cache key (file hash + mode) -> prepped dataframe, least recently used first.
+# Shared by all sessions of the server process.
+_frame_cache = OrderedDict()
+_frame_cache_bytes = {}  # cache key -> frame size in bytes
+_cache_lock = threading.Lock()  # streamlit runs every session in its own thread
+# dataset key -> frame, while any session (or the LRU above) still holds it. Sessions loading the same data get the
+# same frame even after the LRU evicted it, so identical datasets are held once per process.
+_shared_frames = weakref.WeakValueDictionary()
+_shared_frame_bytes = {}  # dataset key -> frame size in bytes (entries of dead frames are dropped by the report)
+
+
+def get_file_hash(file_bytes):  # content hash used as the cache key
+    return hashlib.sha256(file_bytes).hexdigest()
+
+
+def read_trade_log(file_bytes):  # parse + prep a csv trade log (no cache)
+    df = pd.read_csv(io.BytesIO(file_bytes))
+    data_prep(df)
+    return df
+
+
+def stream_trade_log(source, chunksize=STREAM_CHUNK_ROWS, progress=None):  # streaming mode (path or file object)
+    # Read only the P/L columns chunk by chunk and fold every chunk into one row per
+    # (Strategy, Date Opened, Date Closed) with summed P/L and a trade count. Peak memory depends on the chunk
+    # size and on the number of strategy-days, not on the file size. Return a data_prep-like dataframe.
+    # progress(fraction, message) is called after every chunk (jobs.Job.report). The fraction is unknown (None).
+    reader = pd.read_csv(source, usecols=PL_COLUMNS, dtype={"Strategy": str, "P/L": "float64"}, chunksize=chunksize)
+    date_formats = {}
+    partials = []
+    rows = 0
+    for chunk in reader:
+        for col in DATE_COLUMNS:
+            if col not in date_formats:  # detected once on the first chunk, then reused
+                date_formats[col] = detect_date_format(chunk[col])
+            chunk[col] = parse_dates(chunk[col], date_formats[col])
+        partials.append(_aggregate_trades(chunk))
+        if len(partials) >= STREAM_FOLD_EVERY:
+            partials = [_fold_aggregates(partials)]
+        rows += len(chunk.index)
+        if progress is not None:
+            progress(None, f"{rows:,} rows read")
+    if partials:
+        df = _fold_aggregates(partials).reset_index()
+    else:  # empty file
+        df = pd.DataFrame(columns=[*PL_COLUMNS, TRADE_COUNT_COLUMN])
+    df[TRADE_COUNT_COLUMN] = df[TRADE_COUNT_COLUMN].astype("int64")
+    compact_trade_log(df)  # same dtypes as data_prep
+    return df.sort_values(by="Date Opened", kind="stable").reset_index(drop=True)
+
+
+def _aggregate_trades(chunk):
+    return chunk.groupby(["Strategy", "Date Opened", "Date Closed"], sort=False).agg(
+        **{"P/L": ("P/L", "sum"), TRADE_COUNT_COLUMN: ("P/L", "size")}
+    )
+
+
+def _fold_aggregates(partials):
+    return pd.concat(partials).groupby(level=[0, 1, 2], sort=False).sum()
+
+
+def get_trade_keys(dataframe):  # one uint64 hash per trade from TRADE_KEY_COLUMNS (and the account if any)
+    if TRADE_COUNT_COLUMN in dataframe.columns:
+        raise ValueError("Aggregated (large file mode) data has no trade level keys to append by.")
+    key_columns = [ACCOUNT_COLUMN, *TRADE_KEY_COLUMNS] if ACCOUNT_COLUMN in dataframe.columns else TRADE_KEY_COLUMNS
+    return pd.util.hash_pandas_object(dataframe[key_columns], index=False).to_numpy()
+
+
+def append_trade_log(dataframe, new_dataframe, trade_keys=None):  # add trades of a newer export that are not loaded yet
+    # trade_keys: sorted keys of dataframe returned by the previous call (hashed from scratch if None).
+    # Lookups are a binary search per new trade, so a refresh costs O(new trades * log(total trades)).
+    # Return merged dataframe, new trades only, sorted keys of the merged dataframe.
+    if trade_keys is None:
+        trade_keys = np.sort(get_trade_keys(dataframe))
+    new_keys = get_trade_keys(new_dataframe)
+    already_loaded = np.zeros(len(new_keys), dtype=bool)
+    if len(trade_keys):
+        position = np.minimum(np.searchsorted(trade_keys, new_keys), len(trade_keys) - 1)
+        already_loaded = trade_keys[position] == new_keys
+    is_new = ~already_loaded & ~pd.Series(new_keys).duplicated().to_numpy()  # also drop repeats inside the export
+    new_trades = new_dataframe[is_new]
+    if new_trades.empty:
+        return dataframe, new_trades, trade_keys
+    merged = compact_trade_log(pd.concat([dataframe, new_trades], ignore_index=True))
+    new_keys = np.sort(new_keys[is_new])
+    trade_keys = np.insert(trade_keys, np.searchsorted(trade_keys, new_keys), new_keys)
+    return merged, new_trades, trade_keys
+
+
+def load_trade_log(file_bytes, streaming=False, progress=None):  # cached read / stream_trade_log. Return df, file_hash
+    file_hash = get_file_hash(file_bytes)
+    parse = lambda: parse_trade_log(file_bytes, streaming, progress)
+    return load_cached(file_hash, _get_mode(streaming), parse), file_hash
+
+
+def parse_trade_log(file_bytes, streaming=False, progress=None):  # read_trade_log or stream_trade_log (no cache)
+    if streaming:
+        return stream_trade_log(io.BytesIO(file_bytes), progress=progress)
+    if progress is not None:
+        progress(None, "Parsing the csv file")
+    return read_trade_log(file_bytes)
+
+
+def _get_mode(streaming):  # cache key suffix of a parsed file
+    return "stream" if streaming else "full"
+
+
+# ==== multi-file, multi-account import =====
+def load_trade_logs(files, streaming=False, progress=None):  # files: [(account, file_bytes)]. Return df, dataset hash
+    # Files are parsed in parallel by a process pool (one file per task), then every row is tagged with its account
+    # and all files are merged into one dataset (see merge_trade_logs). Only the merged dataset is cached: daily
+    # exports all change, and caching each file too would double the (slow) cache writes.
+    sources = sorted(f"{account}:{get_file_hash(file_bytes)}" for account, file_bytes in files)
+    dataset_hash = get_file_hash("|".join(sources).encode())
+    files_bytes, accounts = [file_bytes for _, file_bytes in files], [account for account, _ in files]
+    parse = lambda: merge_trade_logs(parse_trade_logs(files_bytes, streaming, progress), accounts)
+    return load_cached(dataset_hash, f"{_get_mode(streaming)}-accounts", parse), dataset_hash
+
+
+def parse_trade_logs(files_bytes, streaming=False, progress=None):  # parse_trade_log of every file, in parallel
+    # Same order as files_bytes. progress(fraction, message) after every parsed file (jobs.Job.report)
+    if len(files_bytes) <= 1 or PARSE_WORKERS <= 1:  # nothing to run in parallel: skip the pool and its start up
+        buffers = (file_bytes for file_bytes in files_bytes)
+        parse = lambda file_bytes: parse_trade_log(file_bytes, streaming)
+    else:
+        pool_args = ("parse", PARSE_WORKERS, PARSE_START_METHOD)  # started on the first multi-file import, reused
+        buffers = map_process_pool(*pool_args, _parse_to_arrow, files_bytes, [streaming] * len(files_bytes))
+        parse = _from_arrow
+    frames = []
+    for buffer in buffers:
+        frames.append(parse(buffer))
+        if progress is not None:
+            progress(len(frames) / len(files_bytes), f"{len(frames)} of {len(files_bytes)} files parsed")
+    return frames
+
+
+def _parse_to_arrow(file_bytes, streaming):  # runs in a pool worker. Arrow IPC is ~5x cheaper to send than a pickle
+    table = pa.Table.from_pandas(parse_trade_log(file_bytes, streaming), preserve_index=False)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+def _from_arrow(buffer):  # back to the data_prep dataframe (arrow keeps categoricals, text columns are compacted again)
+    return compact_trade_log(pa.ipc.open_stream(buffer).read_all().to_pandas())
+
+
+def merge_trade_logs(frames, accounts):  # one dataset with an account column, sorted by open date, index 0..n-1
+    # Trades found in several exports of the same account (overlapping date ranges) are kept once.
+    # Aggregated (large file mode) rows have no trade identity and are all kept.
+    tagged = [df.assign(**{ACCOUNT_COLUMN: account}) for df, account in zip(frames, accounts)]
+    merged = pd.concat(tagged, ignore_index=True)
+    merged.insert(0, ACCOUNT_COLUMN, merged.pop(ACCOUNT_COLUMN))
+    if TRADE_COUNT_COLUMN not in merged.columns:
+        merged = merged[~pd.Series(get_trade_keys(merged)).duplicated().to_numpy()]
+    merged = merged.sort_values(by="Date Opened", kind="stable").reset_index(drop=True)
+    return compact_trade_log(merged)  # categoricals with different categories concat to plain text
+
+
+def load_trade_log_file(path, streaming=False):  # cached read of a csv file on disk (i.e. demo data)
+    if streaming:  # hash and parse straight from disk, the file is never held in memory as a whole
+        file_hash = get_path_hash(path)
+        return load_cached(file_hash, "stream", lambda: stream_trade_log(path)), file_hash
+    with open(path, "rb") as f:
+        return load_trade_log(f.read())
+
+
+def get_path_hash(path):  # same as get_file_hash, computed block by block
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_BYTES), b""):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+def load_cached(file_hash, mode, parse):  # memory -> disk -> parse(). Also used for tables derived from a dataset
+    key = f"{file_hash}-{mode}"
+    df = _shared_frames.get(key)  # still held by a session: no reload, even if the LRU evicted it
+    if df is None:
+        df = _get_cached_frame(key)
+    if df is None:
+        df = _read_disk_cache(key)
+        if df is None:
+            df = parse()
+            _write_disk_cache(key, df)
+        _put_cached_frame(key, df)
+    return share_dataset(key, df)
+
+
+def load_leg_tables(dataframe, df_hash):  # leg table + trade structure, cached alongside the dataset (memory + disk)
+    legs = load_cached(df_hash, "legs", lambda: build_leg_table(dataframe))
+    df_structure = load_cached(df_hash, "leg_structure", lambda: get_trade_structure(legs, dataframe))
+    return legs, df_structure
+
+
+def clear_trade_log_cache(disk=False):  # drop in-memory entries (and disk entries if disk=True)
+    with _cache_lock:
+        _frame_cache.clear()
+        _frame_cache_bytes.clear()
+    if disk and CACHE_DIR is not None and os.path.isdir(CACHE_DIR):
+        for name in os.listdir(CACHE_DIR):
+            if name.endswith(".pkl"):
+                os.remove(os.path.join(CACHE_DIR, name))
+
+
+# ==== in-memory LRU =====
+def _get_cached_frame(key):
+    with _cache_lock:
+        df = _frame_cache.get(key)
+        if df is not None:
+            _frame_cache.move_to_end(key)  # mark as most recently used
+        return df
+
+
+def _put_cached_frame(key, df):
+    size = int(df.memory_usage(deep=True).sum())
+    with _cache_lock:
+        _frame_cache[key] = df
+        _frame_cache_bytes[key] = size
+        _frame_cache.move_to_end(key)
+        # evict least recently used frames, but always keep the one just added
+        while len(_frame_cache) > 1 and sum(_frame_cache_bytes.values()) > MAX_MEMORY_CACHE_BYTES:
+            old_key, _ = _frame_cache.popitem(last=False)
+            del _frame_cache_bytes[old_key]
+
+
+# ==== datasets shared by all sessions =====
+def share_dataset(key, df):  # the frame already held under key (loaded by another session), else df, now shared
+    with _cache_lock:
+        shared = _shared_frames.get(key)
+        if shared is not None:
+            return shared
+        _shared_frames[key] = df
+        _shared_frame_bytes[key] = int(df.memory_usage(deep=True).sum())  # once per dataset
+    return df
+
+
+def get_shared_datasets():  # dataset key -> (frame, size in bytes) of every frame still held in this process
+    with _cache_lock:
+        frames = dict(_shared_frames.items())
+        for key in set(_shared_frame_bytes) - set(frames):
+            _shared_frame_bytes.pop(key, None)
+    return {key: (df, _shared_frame_bytes.get(key, 0)) for key, df in frames.items()}
+
+
+# ==== on-disk cache (survives server restarts) =====
+def _disk_cache_path(key):
+    return os.path.join(CACHE_DIR, f"{key}.v{CACHE_VERSION}.pkl")
+
+
+def _read_disk_cache(key):
+    if CACHE_DIR is None:
+        return None
+    try:
+        with open(_disk_cache_path(key), "rb") as f:
+            return pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, pickle.UnpicklingError, EOFError, AttributeError):  # unreadable entry: parse again
+        return None
+
+
+def _write_disk_cache(key, df):
+    if CACHE_DIR is None:
+        return
+    path = _disk_cache_path(key)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)  # atomic, so readers never see a half written file
+    except OSError:  # read-only or full disk: memory cache still works
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+instrument_functions(globals())  # wall time / calls / memory per function when profiling is on
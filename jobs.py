@@ -0,0 +1,145 @@
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import CancelledError, ThreadPoolExecutor, TimeoutError
+
+from profiling import instrument_functions
+
+# ---- background job settings ----
+# Threads, not processes: jobs return large dataframes / arrays that the script run uses as they are, and the heavy
+# parts (pandas, numpy, the parse and simulation process pools) release the GIL.
+JOB_WORKERS = 4  # even on one core: a long simulation does not hold up quick jobs queued behind it
+MAX_FINISHED_JOBS = 16  # finished jobs kept for sessions asking for the same result later (LRU)
+JOB_WAIT_SECONDS = 0.3  # the script run waits this long before showing progress: quick jobs never flicker
+JOB_POLL_SECONDS = 0.5  # progress refresh of a running job on the page
+
+_jobs = OrderedDict()  # job key -> Job. Running and queued jobs, then finished ones (least recently used first)
+_watchers = {}  # (watcher, slot) -> job key: the job a session waits for in one place of the page
+_jobs_lock = threading.Lock()
+_job_pool = None  # thread pool, started with the first job and reused
+
+
+class JobCancelled(Exception):  # raised by Job.report inside a job nobody waits for any more
+    pass
+
+
+class Job:  # one background computation. func(job.report) runs in the pool, job.report(progress, message) from it
+    def __init__(self, key, func):
+        self.key = key
+        self.func = func
+        self.progress = None  # 0..1, None while unknown
+        self.message = "Queued"
+        self.started = None
+        self.cancel_event = threading.Event()
+        self.future = None
+
+    def run(self):
+        self.started = time.time()
+        self.report(None, "Running")
+        return self.func(self.report)
+
+    def report(self, progress=None, message=None):  # progress from inside the job. Stops the job once cancelled
+        if self.cancel_event.is_set():
+            raise JobCancelled(str(self.key))
+        self.progress = progress
+        if message is not None:
+            self.message = message
+
+    def done(self):
+        return self.future.done()
+
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def wait(self, timeout=None):  # True once finished (result, error or cancelled)
+        try:
+            self.future.exception(timeout)
+        except TimeoutError:
+            return False
+        except CancelledError:  # cancelled before it started
+            pass
+        return True
+
+    def failed(self):  # finished with an error or cancelled
+        return self.done() and (self.future.cancelled() or self.future.exception() is not None)
+
+    def result(self):  # return value of func, or its exception raised again
+        return self.future.result()
+
+
+# ==== submit / watch / cancel =====
+def submit_job(key, func):  # the queued, running or finished job with this key (any session), or a new one
+    with _jobs_lock:
+        job = _jobs.get(key)
+        if job is not None and not job.cancelled() and not job.failed():  # errors are not kept: run it again
+            _jobs.move_to_end(key)
+            return job
+        job = Job(key, func)
+        job.future = _get_job_pool().submit(job.run)
+        _jobs[key] = job
+        _prune_finished_jobs()
+    return job
+
+
+def watch_job(watcher, slot, key, func, is_active=None):  # submit_job, and release the job the slot waited for
+    # A job nobody waits for any more (i.e. the filters changed while it ran) is cancelled: dropped from the queue if
+    # it has not started, stopped at its next progress report if it is running.
+    # is_active(watcher): False once the watcher is gone (closed browser session), see _release_jobs.
+    with _jobs_lock:
+        old_key = _watchers.get((watcher, slot))
+        _watchers[(watcher, slot)] = key
+        _release_jobs([] if old_key == key else [old_key], is_active)
+    return submit_job(key, func)
+
+
+def unwatch_job(watcher, slot):  # the slot waits for nothing now (result shown)
+    with _jobs_lock:
+        _watchers.pop((watcher, slot), None)
+
+
+def release_job(key, is_active=None):  # cancel the job if it is unfinished and no slot waits for it
+    with _jobs_lock:
+        _release_jobs([key], is_active)
+
+
+def cancel_job(job):
+    job.cancel_event.set()
+    job.future.cancel()  # only works while queued. A running job stops at its next report
+
+
+def get_job_stats():  # number of queued, running and finished jobs (all sessions)
+    with _jobs_lock:
+        jobs = list(_jobs.values())
+    running = sum(job.started is not None and not job.done() for job in jobs)
+    finished = sum(job.done() for job in jobs)
+    return {"queued": len(jobs) - running - finished, "running": running, "finished": finished}
+
+
+def _release_jobs(keys, is_active):  # cancel the unfinished jobs of keys no slot waits for (lock held)
+    # Closed sessions never unwatch: their slots are dropped first (and the jobs they waited for released), so they
+    # neither keep shared jobs of other sessions running nor stay in _watchers forever.
+    if is_active is not None:
+        closed = [watch for watch in _watchers if not is_active(watch[0])]
+        keys = [*keys, *(_watchers.pop(watch) for watch in closed)]
+    watched = set(_watchers.values())
+    for key in keys:
+        job = _jobs.get(key)
+        if job is not None and not job.done() and key not in watched:
+            cancel_job(job)
+            del _jobs[key]
+
+
+def _prune_finished_jobs():  # keep the MAX_FINISHED_JOBS most recently used finished jobs (lock held)
+    finished = [key for key, job in _jobs.items() if job.done()]
+    for key in finished[: max(len(finished) - MAX_FINISHED_JOBS, 0)]:
+        del _jobs[key]
+
+
+def _get_job_pool():  # lock held
+    global _job_pool
+    if _job_pool is None:
+        _job_pool = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="analytics-job")
+    return _job_pool
+
+
+instrument_functions(globals())  # wall time / calls / memory per function when profiling is on
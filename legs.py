@@ -0,0 +1,191 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from trade_schema import ACCOUNT_COLUMN
+
+# ---- Legs field, i.e. "1 Dec 24 6915 C BTO 4.45 | 1 Dec 24 6905 P BTO 3.75" ----
+LEG_SEPARATOR = " | "
+LEG_PATTERN = r"^\d+ [A-Z][a-z]{2} \d{1,2} \d+(?:\.\d+)? [PC] [BS]T[OC] \d+(?:\.\d+)?$"  # one leg, 7 fields
+LEG_FIELDS = ["contracts", "month", "day", "strike", "put_call", "side", "price"]
+MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+SPREAD_TYPES = [
+    "Long Call",
+    "Long Put",
+    "Short Call",
+    "Short Put",
+    "Call Credit Spread",
+    "Call Debit Spread",
+    "Put Credit Spread",
+    "Put Debit Spread",
+    "Call Calendar/Diagonal",
+    "Put Calendar/Diagonal",
+    "Long Strangle/Straddle",
+    "Short Strangle/Straddle",
+    "Credit Iron Butterfly",
+    "Debit Iron Butterfly",
+    "Credit Iron Condor",
+    "Debit Iron Condor",
+    "Double Calendar/Diagonal",
+    "Other",
+]
+BREAKDOWN_COLUMNS = {  # column of get_trade_structure -> label used on the Strategies tab
+    "spread_type": "Spread type",
+    "strike_width": "Strike width",
+    "short_distance_bucket": "Short strike distance from open price",
+    "DTE": "Days to expiry at open",
+}
+
+
+def build_leg_table(dataframe):  # one row per leg, indexed by trade (dataframe index label), sorted
+    # Split, validate and field extraction all run inside pyarrow compute kernels (no python loop per trade).
+    leg_lists = pc.split_pattern(pa.array(dataframe["Legs"], type=pa.string(), from_pandas=True), LEG_SEPARATOR)
+    leg_text = pc.list_flatten(leg_lists)
+    parent = pc.list_parent_indices(leg_lists).to_numpy()
+    lengths = pc.fill_null(pc.list_value_length(leg_lists), 0).to_numpy()
+    leg_number = np.arange(len(parent)) - (np.cumsum(lengths) - lengths)[parent]  # position inside the trade
+
+    # legs that don't match the pattern are skipped. A plain match is much faster than capture groups in re2.
+    parsed = pc.fill_null(pc.match_substring_regex(leg_text, LEG_PATTERN), False).to_numpy(zero_copy_only=False)
+    leg_text = leg_text.filter(pa.array(parsed))
+    parent, leg_number = parent[parsed], leg_number[parsed]
+    # every valid leg has exactly len(LEG_FIELDS) space separated tokens: field i is every 7th token from i
+    tokens = pc.list_flatten(pc.split_pattern(leg_text, " "))
+    fields = {
+        name: tokens.take(pa.array(np.arange(i, len(tokens), len(LEG_FIELDS)))) for i, name in enumerate(LEG_FIELDS)
+    }
+
+    # ---- expiry: "Dec 24" has no year. Use the open year, or the next year if that date is before the open ----
+    open_day = _to_days(dataframe["Date Opened"])[parent]
+    open_year = open_day.astype("datetime64[Y]").astype(np.int64)  # years since 1970
+    month = pc.index_in(fields["month"], value_set=pa.array(MONTHS)).to_numpy(zero_copy_only=False)
+    day = pc.cast(fields["day"], pa.int64()).to_numpy()
+    expiry = _make_days(open_year, month, day)
+    expiry = np.where(expiry < open_day, _make_days(open_year + 1, month, day), expiry)
+
+    legs = pd.DataFrame(
+        {
+            "trade": dataframe.index.to_numpy()[parent],
+            "leg": leg_number.astype(np.int16),
+            "contracts": pc.cast(fields["contracts"], pa.int32()).to_numpy(),
+            "expiry": expiry.astype("datetime64[ns]"),
+            "strike": pc.cast(fields["strike"], pa.float64()).to_numpy(),
+            "put_call": _to_categorical(fields["put_call"], ["C", "P"]),
+            "side": _to_categorical(fields["side"], ["BTO", "STO", "BTC", "STC"]),
+            "price": pc.cast(fields["price"], pa.float64()).to_numpy(),
+        }
+    )
+    return legs.set_index("trade")
+
+
+def _make_days(year, month, day):  # year (since 1970), month index 0-11, day -> datetime64[D]
+    months = (year * 12 + month).astype("datetime64[M]")
+    return months.astype("datetime64[D]") + (day - 1)
+
+
+def _to_days(dates):  # date column -> datetime64[D], converting each distinct date once
+    codes, uniques = pd.factorize(dates)
+    return pd.to_datetime(uniques).to_numpy().astype("datetime64[D]")[codes]
+
+
+def _to_categorical(values, categories):  # pyarrow strings -> pandas categorical without python strings per row
+    codes = pc.index_in(values, value_set=pa.array(categories))
+    return pd.Categorical.from_codes(pc.fill_null(codes, -1).to_numpy(), categories=categories)
+
+
+def get_trade_structure(legs, dataframe):  # one row per trade with legs: spread type, strike width, distance, DTE
+    is_call = (legs["put_call"] == "C").to_numpy()
+    is_short = legs["side"].isin(["STO", "STC"]).to_numpy()
+    strike = legs["strike"].to_numpy()
+    trade = legs.index.to_numpy()
+    parts = pd.DataFrame(
+        {
+            "is_call": is_call,
+            "is_short": is_short,
+            "credit": np.where(is_short, 1, -1) * legs["price"].to_numpy() * legs["contracts"].to_numpy(),
+            "call_strike": np.where(is_call, strike, np.nan),
+            "put_strike": np.where(is_call, np.nan, strike),
+            "short_call_strike": np.where(is_call & is_short, strike, np.nan),
+            "short_put_strike": np.where(~is_call & is_short, strike, np.nan),
+            "expiry": legs["expiry"].to_numpy(),
+        },
+        index=trade,
+    )
+    if "Opening Price" in dataframe.columns:
+        opening_price = dataframe["Opening Price"].reindex(trade).to_numpy(dtype=np.float64)
+        parts["short_distance"] = np.where(is_short, np.abs(strike - opening_price), np.nan)
+    else:
+        parts["short_distance"] = np.nan
+
+    group = parts.groupby(level=0, sort=True)
+    df = pd.DataFrame(
+        {
+            "n_legs": group.size(),
+            "n_calls": group["is_call"].sum(),
+            "n_short": group["is_short"].sum(),
+            "n_expiries": group["expiry"].nunique(),
+            "credit": group["credit"].sum(),
+            "call_width": group["call_strike"].max() - group["call_strike"].min(),
+            "put_width": group["put_strike"].max() - group["put_strike"].min(),
+            "short_call_strike": group["short_call_strike"].min(),
+            "short_put_strike": group["short_put_strike"].max(),
+            "short_distance": group["short_distance"].min(),
+            "expiry": group["expiry"].min(),
+        }
+    )
+    df["n_puts"] = df["n_legs"] - df["n_calls"]
+    df["strike_width"] = df[["call_width", "put_width"]].max(axis=1).fillna(0)
+    df["spread_type"] = _classify_spread(df)
+    df["short_distance_bucket"] = _bucket(df["short_distance"])
+
+    # ---- trade columns needed to filter and aggregate like the other Strategies tab charts ----
+    trade_columns = [col for col in [ACCOUNT_COLUMN, "Strategy", "Date Opened", "P/L"] if col in dataframe.columns]
+    trades = dataframe.loc[df.index, trade_columns]
+    df = df.join(trades)
+    df["DTE"] = (df["expiry"] - pd.to_datetime(df["Date Opened"])).dt.days
+    return df
+
+
+def _classify_spread(df):  # spread type as a categorical (integer codes, no string building per trade)
+    n_legs, n_calls, n_puts = df["n_legs"], df["n_calls"], df["n_puts"]
+    is_put = (n_calls == 0).astype(int)
+    is_short = (df["n_short"] > 0).astype(int)
+    is_debit = (df["credit"] <= 0).astype(int)
+    same_expiry = df["n_expiries"] == 1
+    conditions = [
+        n_legs == 1,
+        (n_legs == 2) & ((n_calls == 2) | (n_puts == 2)) & same_expiry,
+        (n_legs == 2) & ((n_calls == 2) | (n_puts == 2)),
+        (n_legs == 2) & (n_calls == 1),
+        (n_legs == 4) & (n_calls == 2) & same_expiry & (df["short_call_strike"] == df["short_put_strike"]),
+        (n_legs == 4) & (n_calls == 2) & same_expiry,
+        (n_legs == 4) & (n_calls == 2),
+    ]
+    codes = [  # positions in SPREAD_TYPES
+        2 * is_short + is_put,
+        4 + 2 * is_put + is_debit,
+        8 + is_put,
+        10 + is_short,
+        12 + is_debit,
+        14 + is_debit,
+        16,
+    ]
+    codes = np.select(conditions, codes, default=len(SPREAD_TYPES) - 1)
+    return pd.Series(pd.Categorical.from_codes(codes, categories=SPREAD_TYPES), index=df.index)
+
+
+def _bucket(values, n_buckets=8):  # quantile buckets as readable labels
+    if values.notna().sum() == 0:
+        return pd.Series("n/a", index=values.index)
+    buckets = pd.qcut(values, q=n_buckets, duplicates="drop", precision=0)
+    return buckets.astype(str).where(values.notna(), "n/a")
+
+
+def get_leg_breakdown(df_structure, by):  # P/L, trade count and win rate per spread type / width / ...
+    df = (
+        df_structure.assign(wins=df_structure["P/L"] > 0)
+        .groupby(by, observed=True)
+        .agg(PL=("P/L", "sum"), trades=("P/L", "size"), wins=("wins", "sum"))
+    )
+    df["win_rate"] = df["wins"] / df["trades"] * 100
+    return df.drop(columns="wins").reset_index().rename(columns={"PL": "P/L"})
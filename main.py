@@ -1,8 +1,31 @@
+import sys
+import time
+
+_import_start = (time.perf_counter(), len(sys.modules))  # cold start / code reload: import time of the app modules
 import streamlit as st
 import pandas as pd
 from utility import *  # import funtions
+from ingest import load_trade_log, load_trade_log_file  # cached csv parsing (keyed by file content hash)
+from ingest import append_trade_log, get_file_hash, load_leg_tables, load_trade_logs, share_dataset
+from trade_library import list_library, save_to_library, get_library_info, query_library, PL_COLUMNS
+from trade_library import get_library_columns
+from pl_cube import get_PL_cube, get_cube_daily_PL, get_cube_strategy_PL, get_cube_open_dates
+from pl_cube import get_cube_strategy_daily_PL
+from chart_render import RENDER_MODES, MAX_PLOT_POINTS
+from monte_carlo import SIMULATION_METHODS, DEFAULT_PATHS, DEFAULT_BLOCK_SIZE, run_monte_carlo
+from allocation import ALLOCATION_MODES, ALLOCATION_RANKS, DEFAULT_CANDIDATES, optimize_allocation
+from risk_metrics import ROLLING_WINDOWS, DEFAULT_WINDOW, get_strategy_daily_PL, get_rolling_metrics
+from risk_metrics import get_latest_metrics
+from correlation import get_strategy_correlation
+from exposure import EXPOSURE_COLUMNS, build_exposure, has_exposure_columns
+from figure_cache import MAX_CACHED_FIGURES, get_figure_cache_stats
+from profiling import start_rerun, finish_rerun, profile_block, show_profile_sidebar
+from startup import get_startup_report, record_imports, warm_up_deferred_modules
 from styles.style import *
 
+record_imports(*_import_start)  # printed to the server log against the budget (startup.py)
+start_rerun()  # per rerun profiling (only when TRADE_LOG_PROFILE is set, see profiling.py)
+
 # ---- style, page set up, etc ----
 style_tidy_up()
 st.set_page_config(
@@ -12,6 +35,13 @@ st.set_page_config(
     # initial_sidebar_state="expanded",
 )
 
+
+def import_files(files, streaming, progress):  # files: [(account, file_bytes)]. Return df, hash (background job)
+    if len(files) == 1:
+        return load_trade_log(files[0][1], streaming, progress)
+    return load_trade_logs(files, streaming, progress)  # one account per file, parsed in parallel and merged
+
+
 # ---- session state initialize ----
 if "store_radio_index" not in st.session_state:
     st.session_state.store_radio_index = 0  # this is the default radio index
@@ -27,10 +57,14 @@ tab_label = [
 ]
 tab_import, tab_summary, tab_port, tab_per_strat = st.tabs(tabs=tab_label)
 
-with tab_import:
+with tab_import, profile_block("tab_import"):
     # --- data selection: use demo data or import data ---
-    radio_labels = ["Import Data", "Use Demo Data"]
-    radio_captions = ["Import your spending data below (i.e. option omega trade log)", "Use built in demo data."]
+    radio_labels = ["Import Data", "Use Demo Data", "Open Saved Dataset"]
+    radio_captions = [
+        "Import your spending data below (i.e. option omega trade log)",
+        "Use built in demo data.",
+        "Open a dataset saved to the local library (filters are applied when reading the data).",
+    ]
 
     st.subheader("Use demo data or import data", anchor=False)
     select_data_source = st.radio(
@@ -46,66 +80,421 @@ with tab_import:
 
     _, col_file_uploader, _ = st.columns((0.15, 1, 0.15))
     # --- file uploader widget (middle column) ---
-    file_uploader_disabled = [False, True]  # radio index 0: disabled=False, 1: disabled=True
-    uploaded_file = col_file_uploader.file_uploader(
+    file_uploader_disabled = [False, True, True]  # radio index 0: disabled=False, 1 & 2: disabled=True
+    uploaded_files = col_file_uploader.file_uploader(
         "Upload csv data (Select 'Import Data' to enable the uploader. Once a new file is uploaded, it will overwrite existing data)",
         type="csv",
+        accept_multiple_files=True,
+        disabled=file_uploader_disabled[st.session_state.store_radio_index],
+        help="Select several exports to import several accounts at once. Each file is an account, named after the file "
+        "by default (editable below the uploader).",
+    )
+    large_file_mode = col_file_uploader.toggle(
+        "Large file mode",
+        key="large_file_mode",
         disabled=file_uploader_disabled[st.session_state.store_radio_index],
+        help="Stream the csv in chunks and keep only daily P/L per strategy. "
+        "Use for multi-gigabyte logs (trade level columns such as Legs are not kept).",
     )
 
-    # --- Get df data and call out data_prep() ---
+    # --- Get df data (parsed + data_prep() once per file content, then served from cache) ---
+    # df_source: uploaded file ids and accounts (+ large file mode) or "demo". Reruns with the same source skip loading
+    # entirely.
     if st.session_state.store_radio_index == 0:  # Upload Data option
-        if uploaded_file:
-            df = pd.read_csv(uploaded_file)
-            data_prep(df)
-            st.session_state["df"] = df
+        accounts = [f.name.rsplit(".", 1)[0] for f in uploaded_files]  # default account: the file name
+        if len(uploaded_files) > 1:
+            # trades are deduplicated per account: exports of the same account (e.g. daily exports with different file
+            # names) must get the same account, so trades found in several of them are counted once
+            col_file_uploader.caption("_Account of each file (give exports of the same account the same name):_")
+            accounts = [
+                col_file_uploader.text_input(f"Account of {f.name}", value=account, key=f"account_{f.file_id}").strip()
+                or account
+                for f, account in zip(uploaded_files, accounts)
+            ]
+        upload_ids = ",".join(f"{f.file_id}={account}" for f, account in zip(uploaded_files, accounts))
+        upload_source = f"{upload_ids}:{large_file_mode}" if uploaded_files else None
+        if uploaded_files and st.session_state.get("df_source") != upload_source:
+            # parsed by a background job keyed by file contents: progress is shown below the uploader, and sessions
+            # uploading the same files wait for the same job
+            files = [(account, f.getvalue()) for f, account in zip(uploaded_files, accounts)]
+            import_key = (tuple((account, get_file_hash(file_bytes)) for account, file_bytes in files), large_file_mode)
+            with col_file_uploader:
+                loaded = get_job_result(
+                    "import", import_key, lambda progress: import_files(files, large_file_mode, progress), "Import"
+                )
+            if loaded is not None:
+                st.session_state["df"], st.session_state["df_hash"] = loaded
+                st.session_state["df_source"] = upload_source
+                st.session_state.pop("library_name", None)
+                st.session_state.pop("append_message", None)
     if st.session_state.store_radio_index == 1:  # Use Demo Data option
-        df = pd.read_csv("data/Demo_trade_log.csv")
-        data_prep(df)
-        st.session_state["df"] = df
+        if st.session_state.get("df_source") != "demo":
+            st.session_state["df"], st.session_state["df_hash"] = load_trade_log_file("data/Demo_trade_log.csv")
+            st.session_state["df_source"] = "demo"
+            st.session_state.pop("library_name", None)
+            st.session_state.pop("append_message", None)
+    if st.session_state.store_radio_index == 2:  # Open Saved Dataset option
+        # no data is loaded here: tabs read only the columns and rows their filters need
+        selected_library = col_file_uploader.selectbox(
+            "Select a saved dataset", list_library(), index=None, key="library_select"
+        )
+        if selected_library and st.session_state.get("df_source") != f"library:{selected_library}":
+            st.session_state.pop("df", None)
+            st.session_state.pop("df_hash", None)
+            st.session_state["library_name"] = selected_library
+            st.session_state["df_source"] = f"library:{selected_library}"
 
     # --- check st.session_state["df"] ---
     if "df" in st.session_state:
         st.markdown("---")
         df = st.session_state["df"]
-        st.markdown(f"> Data available. Entries:  __{df["Date Opened"].count()}__")
+        st.markdown(f"> Data available. Entries:  __{get_trade_number(df)}__")
+        if TRADE_COUNT_COLUMN in df.columns:
+            st.caption("_Large file mode: one row per strategy, open date and close date._")
+        if ACCOUNT_COLUMN in df.columns:
+            st.caption(f"_Accounts: {', '.join(get_account_list(df))}_")
         with st.expander("A quick preview of loaded data (a few top entries)"):
             st.dataframe(df.head(), hide_index=True)  # type: ignore
+        # --- save to local library (parquet) ---
+        with st.expander("Save to local library (open it later with 'Open Saved Dataset')"):
+            with st.form(key="save_library_form"):
+                library_name = st.text_input("Dataset name", placeholder="e.g. OO live 2025")
+                if st.form_submit_button("Save"):
+                    try:
+                        save_to_library(df, library_name)
+                        st.success(f"Saved as '{library_name.strip()}'.")
+                    except ValueError as e:
+                        st.error(str(e))
+        # --- append a newer export: only trades not loaded yet are added, P/L is updated from the last stored day ---
+        if TRADE_COUNT_COLUMN not in df.columns and ACCOUNT_COLUMN not in df.columns:
+            with st.expander("Append a newer export of the same log (only new trades are added)"):
+                appended_file = st.file_uploader("Upload newer csv data", type="csv", key="append_uploader")
+                if appended_file and st.session_state.get("append_source") != appended_file.file_id:
+                    new_df, new_hash = load_trade_log(appended_file.getvalue())
+                    trade_keys = st.session_state.get("trade_keys", (None, None))
+                    df, new_trades, trade_keys = append_trade_log(
+                        df, new_df, trade_keys[1] if trade_keys[0] == st.session_state.df_hash else None
+                    )
+                    df_hash = get_file_hash(f"{st.session_state.df_hash}+{new_hash}".encode())
+                    df = share_dataset(f"{df_hash}-appended", df)  # sessions appending the same exports
+                    PL_summary = st.session_state.get("df_PL_summary", (None, None))
+                    if PL_summary[0] == st.session_state.df_hash:  # continue the stored summary curve
+                        st.session_state["df_PL_summary"] = (df_hash, update_PL_metrics(PL_summary[1], new_trades))
+                    st.session_state["df"], st.session_state["df_hash"] = df, df_hash
+                    st.session_state["trade_keys"] = (df_hash, trade_keys)
+                    st.session_state["append_source"] = appended_file.file_id
+                    st.session_state["append_message"] = f"{len(new_trades)} new trades added."
+                    st.rerun()  # refresh entries and preview above
+                if "append_message" in st.session_state:
+                    st.caption(st.session_state.append_message)
+    elif "library_name" in st.session_state:
+        st.markdown("---")
+        library_info = get_library_info(st.session_state.library_name)
+        st.markdown(
+            f"> Saved dataset __{st.session_state.library_name}__ opened. Entries:  __{library_info['trade_number']}__"
+        )
     else:
         col_file_uploader.warning(
             "Data not imported yet: please import data or select the demo data from 'Import Data' tab."
         )
 
-with tab_summary:
-    if "df" not in st.session_state:
-        st.warning("Data not imported yet: please import data or select the demo data from 'Import Data' tab.")
-    else:
-        show_simple_stat(st.session_state.df)
-        df_PL_summary = convert_to_PL_no_starting_fund(st.session_state.df)
-        show_daily_PL_cum_PL_curve(df_PL_summary)
+    # --- chart settings ---
+    with st.expander("Chart settings"):
+        render_mode_labels = {
+            "auto": f"Fast (WebGL, long series reduced to ~{MAX_PLOT_POINTS} points keeping every peak and trough)",
+            "full": "Full detail (every point, slower for long histories)",
+        }
+        st.radio("Render mode", RENDER_MODES, format_func=render_mode_labels.__getitem__, key="chart_render_mode")
+        st.toggle("Show chart payload size", key="show_chart_payload")
+        figure_stats = get_figure_cache_stats()
+        st.caption(
+            f"_Figure cache (all sessions): {figure_stats['figures']} of {MAX_CACHED_FIGURES} figures, "
+            f"{figure_stats['hits']} hits, {figure_stats['misses']} misses._"
+        )
 
-with tab_port:
-    if "df" not in st.session_state:
-        st.warning("Data not imported yet: please import data or select the demo data from 'Import Data' tab.")
-    else:
+    # --- server memory: datasets are held once and shared by every session that loaded them ---
+    with st.expander("Memory usage (all sessions of this server)"):
+        show_memory_report()
+        startup = get_startup_report()
+        if startup:
+            st.caption(
+                f"_Start up: {startup['modules']} modules imported in {startup['seconds']:.2f} s "
+                f"(budget {startup['budget']:g} s). Chart modules load with the first chart._"
+            )
+
+# ---- analytics tabs ----
+# Each tab is a fragment: a widget inside a tab reruns only that tab. Results are memoized on the dataset and the
+# tab's own filter / starting fund selections (get_memoized), so a rerun without new inputs only redraws charts.
+def is_data_ready():
+    return "df" in st.session_state or "library_name" in st.session_state
+
+
+def get_summary_tables_library(name):  # Summary tab data, saved dataset: trades (P/L columns only), df_PL
+    df_summary = query_library(name, columns=PL_COLUMNS)
+    return df_summary, convert_to_PL_no_starting_fund(df_summary)
+
+
+# Strategies tab data, loaded dataset
+def get_strategy_tables_cube(PL_cube, selected_strat_list, selected_date, selected_accounts):
+    df_structure = None
+    if "Legs" in st.session_state.df.columns:  # parsed legs, cached with the dataset
+        _, df_structure = load_leg_tables(st.session_state.df, st.session_state.df_hash)
+        df_structure = apply_trade_filter(df_structure, selected_strat_list, selected_date, selected_accounts)
+    selections = (selected_strat_list, selected_date, selected_accounts)
+    return {
+        "daily_PL": get_cube_daily_PL(PL_cube, *selections),
+        "strat_PL": get_cube_strategy_PL(PL_cube, *selections),
+        "open_dates": get_cube_open_dates(PL_cube, *selections),
+        "strategy_daily_PL": get_cube_strategy_daily_PL(PL_cube, *selections),
+        "structure": df_structure,
+    }
+
+
+# Strategies tab data, saved dataset
+def get_strategy_tables_library(name, selected_strat_list, selected_date, selected_accounts):
+    df_filtered = query_library(name, selected_strat_list, selected_date, PL_COLUMNS, selected_accounts)
+    return {
+        "daily_PL": get_daily_PL(df_filtered),
+        "strat_PL": get_PL_per_strategy(df_filtered),
+        "open_dates": df_filtered,
+        "strategy_daily_PL": get_strategy_daily_PL(df_filtered),
+        "structure": None,
+    }
+
+
+def rolling_window_select(id):  # rolling metrics window widget. Return window in trading days
+    window_label = st.selectbox(
+        "Rolling window",
+        list(ROLLING_WINDOWS),
+        index=list(ROLLING_WINDOWS).index(DEFAULT_WINDOW),
+        format_func=lambda label: f"{label} ({ROLLING_WINDOWS[label]} trading days)",
+        key=f"rolling_window_{id}",
+    )
+    return ROLLING_WINDOWS[window_label]
+
+
+def get_rolling_tables(strategy_daily_PL, window, starting_fund):  # rolling metrics + latest window per series
+    rolling = get_rolling_metrics(strategy_daily_PL, window, starting_fund)
+    return rolling, get_latest_metrics(rolling)
+
+
+def monte_carlo_form(id):  # simulation settings inside a popover. Return settings, None until the first run
+    popover_simulation = st.popover("Monte Carlo")
+    with popover_simulation.form(key=f"monte_carlo_form_{id}"):
+        method = st.radio("Resampling", list(SIMULATION_METHODS), format_func=SIMULATION_METHODS.__getitem__)
+        n_paths = st.number_input("Paths", min_value=100, max_value=100_000, value=DEFAULT_PATHS, step=1000)
+        block_size = st.number_input("Block size (days, block bootstrap)", min_value=1, value=DEFAULT_BLOCK_SIZE)
+        seed = st.number_input("Seed", min_value=0, value=0)
+        if st.form_submit_button("Run simulation"):
+            st.session_state[f"monte_carlo_settings_{id}"] = (int(n_paths), method, int(block_size), int(seed))
+    return st.session_state.get(f"monte_carlo_settings_{id}")
+
+
+def allocation_form(id):  # optimizer settings inside a popover. Return settings, None until the first run
+    popover_allocation = st.popover("Optimize allocation")
+    with popover_allocation.form(key=f"allocation_form_{id}"):
+        mode = st.radio("Candidates", list(ALLOCATION_MODES), format_func=ALLOCATION_MODES.__getitem__)
+        rank_by = st.radio("Rank by", list(ALLOCATION_RANKS), format_func=ALLOCATION_RANKS.__getitem__)
+        n_candidates = st.number_input(
+            "Candidates to score", min_value=100, max_value=100_000, value=DEFAULT_CANDIDATES, step=1024
+        )
+        seed = st.number_input("Seed", min_value=0, value=0)
+        if st.form_submit_button("Run optimizer"):
+            st.session_state[f"allocation_settings_{id}"] = (mode, int(n_candidates), rank_by, int(seed))
+    return st.session_state.get(f"allocation_settings_{id}")
+
+
+# build_exposure of the selected trades of the loaded df, or of the saved dataset library_name if df is None.
+# None when the data has no open / close times (large file mode, saved aggregated dataset). Runs as a background job
+def get_exposure(df, library_name, selected_strat_list, selected_date, selected_accounts):
+    if df is not None:
+        if not has_exposure_columns(df):
+            return None
+        columns = [col for col in [*EXPOSURE_COLUMNS, ACCOUNT_COLUMN] if col in df.columns]
+        return build_exposure(apply_trade_filter(df[columns], selected_strat_list, selected_date, selected_accounts))
+    if not has_exposure_columns(pd.DataFrame(columns=get_library_columns(library_name))):
+        return None
+    df_trades = query_library(library_name, selected_strat_list, selected_date, EXPOSURE_COLUMNS, selected_accounts)
+    return build_exposure(df_trades)
+
+
+@st.fragment
+def summary_tab():
+    with profile_block("tab_summary"):
+        if not is_data_ready():
+            st.warning("Data not imported yet: please import data or select the demo data from 'Import Data' tab.")
+            return
+        if "df" in st.session_state:
+            df_summary = st.session_state.df
+            # summary P/L is kept per dataset hash (and updated incrementally on append)
+            if st.session_state.get("df_PL_summary", (None, None))[0] != st.session_state.df_hash:
+                df_PL = get_job_result(  # background job: instant for most logs, the page stays usable for huge ones
+                    "summary_PL",
+                    st.session_state.df_hash,
+                    lambda progress: convert_to_PL_no_starting_fund(df_summary),
+                    "P/L curve",
+                )
+                if df_PL is None:
+                    return
+                st.session_state["df_PL_summary"] = (st.session_state.df_hash, df_PL)
+            df_PL_summary = st.session_state.df_PL_summary[1]
+        else:  # saved dataset: read only the columns needed for summary
+            df_summary, df_PL_summary = get_memoized(
+                "summary_library", get_dataset_key(), lambda: get_summary_tables_library(st.session_state.library_name)
+            )
+        show_simple_stat(df_summary)
+        show_daily_PL_cum_PL_curve(df_PL_summary, key=get_dataset_key())  # figures cached per dataset + inputs
+        # rolling risk metrics of the portfolio and every strategy, one batched pass
+        col1, col2 = st.columns(2)
+        with col1:
+            window = rolling_window_select(id="summary")
+        with col2:
+            starting_fund = starting_fund_input(id="summary_fund")
+        strategy_daily_PL = get_memoized(
+            "summary_strategy_daily_PL", get_dataset_key(), lambda: get_strategy_daily_PL(df_summary)
+        )
+        rolling, df_latest = get_memoized(
+            "summary_rolling",
+            (get_dataset_key(), window, starting_fund),
+            lambda: get_rolling_tables(strategy_daily_PL, window, starting_fund),
+        )
+        show_rolling_metrics(rolling, df_latest, id="summary", key=(get_dataset_key(), window, starting_fund))
+
+
+@st.fragment
+def portfolio_tab():
+    with profile_block("tab_port"):
+        if not is_data_ready():
+            st.warning("Data not imported yet: please import data or select the demo data from 'Import Data' tab.")
+            return
         col1, col2 = st.columns((1, 4), vertical_alignment="top")
         with col1:
-            df_filtered = trade_filter_form(st.session_state.df, id="port")  # display and apply filters
+            # display filters, then compute (or reuse) the daily P/L of the selection
+            if "df" in st.session_state:  # filters applied on the strategy x day P/L cube (built once per dataset)
+                PL_cube = get_PL_cube(st.session_state.df, st.session_state.df_hash)
+                selected_strat_list, selected_date, selected_accounts = cube_filter_form(PL_cube, id="port")
+                compute_daily_PL = lambda: get_cube_daily_PL(
+                    PL_cube, selected_strat_list, selected_date, selected_accounts
+                )
+            else:  # saved dataset: filters are pushed down to the parquet scan
+                name = st.session_state.library_name
+                selected_strat_list, selected_date, selected_accounts = library_filter_form(name, id="port")
+                compute_daily_PL = lambda: get_daily_PL(
+                    query_library(name, selected_strat_list, selected_date, PL_COLUMNS, selected_accounts)
+                )
             # st.space("small")
-            df_PL, starting_fund = convert_to_PL(df_filtered, id="port_fund")  # need strating fund input
+            starting_fund = starting_fund_input(id="port_fund")  # need strating fund input
+            filter_key = (get_dataset_key(), get_filter_key(selected_strat_list, selected_date, selected_accounts))
+            df_daily_PL = get_memoized("port_daily_PL", filter_key, compute_daily_PL)
+            df_PL = get_memoized(
+                "port_PL", (filter_key, starting_fund), lambda: add_PL_metrics(df_daily_PL.copy(), starting_fund)
+            )  # copy: add_PL_metrics adds columns in place, the memoized daily P/L is shared by every fund
+            simulation_settings = monte_carlo_form(id="port")
         with col2:
-            show_PL_DD_plot(df_PL, starting_fund)
+            show_PL_DD_plot(df_PL, starting_fund, key=(filter_key, starting_fund))
+            if simulation_settings is not None:  # resampled daily P/L, kept until the selection or settings change
+                simulation = get_job_result(  # background job: progress per chunk of paths
+                    "port_monte_carlo",
+                    (filter_key, simulation_settings),
+                    lambda progress: run_monte_carlo(
+                        df_daily_PL["Daily_PL"], df_daily_PL["Date Closed"], *simulation_settings, progress=progress
+                    ),
+                    "Monte Carlo simulation",
+                )
+                if simulation is not None:
+                    show_monte_carlo_bands(
+                        simulation, df_PL, starting_fund, key=(filter_key, simulation_settings, starting_fund)
+                    )
+            # open / close events of the selected trades, swept once per selection (background job)
+            inputs = (st.session_state.get("df"), st.session_state.get("library_name"))
+            selections = (selected_strat_list, selected_date, selected_accounts)
+            exposure = get_job_result(
+                "port_exposure", filter_key, lambda progress: get_exposure(*inputs, *selections), "Open positions"
+            )
+            if st.session_state.get("memo_port_exposure", (None,))[0] == filter_key:  # finished (None: no times)
+                show_exposure(exposure, key=filter_key)
 
-with tab_per_strat:
-    if "df" not in st.session_state:
-        st.warning("Data not imported yet: please import data or select the demo data from 'Import Data' tab.")
-    else:
+
+@st.fragment
+def strategies_tab():
+    with profile_block("tab_per_strat"):
+        if not is_data_ready():
+            st.warning("Data not imported yet: please import data or select the demo data from 'Import Data' tab.")
+            return
         col1, col2 = st.columns((1, 4), vertical_alignment="top")
         with col1:
-            df_filtered = trade_filter_form(st.session_state.df, id="strat")  # display and apply filters
+            # display filters, then compute (or reuse) the tables of the selection
+            if "df" in st.session_state:  # filters applied on the strategy x day P/L cube (built once per dataset)
+                PL_cube = get_PL_cube(st.session_state.df, st.session_state.df_hash)
+                selected_strat_list, selected_date, selected_accounts = cube_filter_form(PL_cube, id="strat")
+                compute_tables = lambda: get_strategy_tables_cube(
+                    PL_cube, selected_strat_list, selected_date, selected_accounts
+                )
+            else:  # saved dataset: filters are pushed down to the parquet scan
+                name = st.session_state.library_name
+                selected_strat_list, selected_date, selected_accounts = library_filter_form(name, id="strat")
+                compute_tables = lambda: get_strategy_tables_library(
+                    name, selected_strat_list, selected_date, selected_accounts
+                )
             # st.space("small")
-            df_PL, starting_fund = convert_to_PL(df_filtered, id="strat_fund")  # need strating fund input
+            starting_fund = starting_fund_input(id="strat_fund")  # need strating fund input
+            filter_key = (get_dataset_key(), get_filter_key(selected_strat_list, selected_date, selected_accounts))
+            tables = get_memoized("strat_tables", filter_key, compute_tables)
+            df_PL = get_memoized(
+                "strat_PL",
+                (filter_key, starting_fund),
+                lambda: add_PL_metrics(tables["daily_PL"].copy(), starting_fund),
+            )
+            # equity / DD of every strategy on its own, one grouped pass over the strategy x day rows that traded
+            df_strat_DD = get_memoized(
+                "strat_DD",
+                (filter_key, starting_fund),
+                lambda: add_strategy_PL_metrics(
+                    convert_strategy_daily_PL_long(tables["strategy_daily_PL"]), starting_fund
+                ),
+            )
+            window = rolling_window_select(id="strat")
+            allocation_settings = allocation_form(id="strat")
+            rolling, df_latest = get_memoized(
+                "strat_rolling",
+                (filter_key, window, starting_fund),
+                lambda: get_rolling_tables(tables["strategy_daily_PL"], window, starting_fund),
+            )
         with col2:
-            show_PL_per_strategy_bar_chart(df_filtered)
-            show_open_date_per_strategy(df_filtered)
-            show_daily_PL_distribution_daily_trades(df_PL, starting_fund)
+            show_PL_per_strategy_bar_chart(tables["strat_PL"], key=filter_key)
+            show_open_date_per_strategy(tables["open_dates"], key=filter_key)
+            show_daily_PL_distribution_daily_trades(df_PL, starting_fund, key=(filter_key, starting_fund))
+            show_rolling_metrics(
+                rolling, df_latest, id="strat", per_strategy=True, key=(filter_key, window, starting_fund)
+            )
+            show_strategy_drawdowns(df_strat_DD, key=(filter_key, starting_fund))
+            if allocation_settings is not None:  # candidates of the selected strategies, background job
+                allocation_key = (filter_key, starting_fund, allocation_settings)
+                allocation = get_job_result(
+                    "strat_allocation",
+                    allocation_key,
+                    lambda progress: optimize_allocation(
+                        tables["strategy_daily_PL"], starting_fund, *allocation_settings, progress=progress
+                    ),
+                    "Allocation optimizer",
+                )
+                if st.session_state.get("memo_strat_allocation", (None,))[0] == allocation_key:  # None: no trades
+                    show_allocation(allocation, id="strat", key=allocation_key)
+            # all strategy pairs from one matrix product, cached per dataset + filters for every session
+            show_strategy_correlation(get_strategy_correlation(tables["strategy_daily_PL"], filter_key), key=filter_key)
+            if tables["structure"] is not None:
+                show_leg_breakdown(tables["structure"])
+
+
+with tab_summary:
+    summary_tab()
+
+with tab_port:
+    portfolio_tab()
+
+with tab_per_strat:
+    strategies_tab()
+
+record_session_memory()  # for the memory report on the Import tab
+show_profile_sidebar(finish_rerun())
+warm_up_deferred_modules()  # page drawn: preload the chart modules in the background (once per process)
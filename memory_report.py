@@ -0,0 +1,88 @@
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+from ingest import get_shared_datasets
+from profiling import instrument_functions
+
+# ---- memory report settings ----
+SESSION_TTL_SECONDS = 30 * 60  # sessions not seen for this long are left out of the report (browser tab closed)
+
+_sessions = {}  # session id -> {"datasets", "private_bytes", "last_seen"}. All sessions of the server process.
+_sessions_lock = threading.Lock()
+
+
+# ==== per session: bytes held only by the session, shared datasets it points to =====
+def record_session(session_id, state):  # state: session_state as a dict. Call once per rerun
+    shared = {id(df): key for key, (df, _) in get_shared_datasets().items()}
+    datasets = set()
+    private_bytes = get_object_bytes(state.values(), shared, datasets)
+    now = time.time()
+    with _sessions_lock:
+        _sessions[session_id] = {"datasets": datasets, "private_bytes": private_bytes, "last_seen": now}
+        for old_id in [sid for sid, record in _sessions.items() if now - record["last_seen"] > SESSION_TTL_SECONDS]:
+            del _sessions[old_id]
+
+
+def get_object_bytes(objects, shared, datasets):  # bytes of objects and their contents, each object counted once
+    # shared: id -> dataset key of the shared frames. They are not counted, their keys are added to datasets.
+    seen = set()
+    stack = list(objects)
+    total = 0
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen:
+            continue
+        seen.add(id(obj))
+        if id(obj) in shared:
+            datasets.add(shared[id(obj)])
+        elif isinstance(obj, pd.DataFrame):
+            total += int(obj.memory_usage(deep=True).sum())
+        elif isinstance(obj, (pd.Series, pd.Index)):
+            total += int(obj.memory_usage(deep=True))
+        elif isinstance(obj, np.ndarray):
+            total += obj.nbytes
+        elif isinstance(obj, dict):
+            total += sys.getsizeof(obj)
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            total += sys.getsizeof(obj)
+            stack.extend(obj)
+        else:  # scalars, figures, ...: shallow size
+            total += sys.getsizeof(obj)
+    return total
+
+
+# ==== server report =====
+def get_memory_report():  # datasets table (held once, shared by sessions), sessions table (private bytes)
+    datasets = get_shared_datasets()
+    with _sessions_lock:
+        sessions = {sid: dict(record) for sid, record in _sessions.items()}
+    now = time.time()
+    df_datasets = pd.DataFrame(
+        {
+            "Dataset": [_short_key(key) for key in datasets],
+            "Rows": [len(df.index) for df, _ in datasets.values()],
+            "MB": [size / 1024**2 for _, size in datasets.values()],
+            "Sessions": [sum(key in record["datasets"] for record in sessions.values()) for key in datasets],
+        }
+    )
+    df_sessions = pd.DataFrame(
+        {
+            "Session": list(sessions),
+            "Datasets": [", ".join(sorted(map(_short_key, record["datasets"]))) for record in sessions.values()],
+            "Private MB": [record["private_bytes"] / 1024**2 for record in sessions.values()],
+            "Idle seconds": [int(now - record["last_seen"]) for record in sessions.values()],
+        }
+    )
+    return df_datasets, df_sessions
+
+
+def _short_key(key):  # "<sha256>-<mode>" -> "<first 12 hex>-<mode>"
+    file_hash, _, mode = key.partition("-")
+    return f"{file_hash[:12]}-{mode}"
+
+
+instrument_functions(globals())  # wall time / calls / memory per function when profiling is on
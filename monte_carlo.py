@@ -0,0 +1,113 @@
+import os
+
+import numpy as np
+import pandas as pd
+from analytics import get_day_numbers
+from process_pools import map_process_pool
+from profiling import instrument_functions
+
+# ---- simulation settings ----
+SIMULATION_METHODS = {  # method -> label
+    "bootstrap": "Bootstrap (days drawn with replacement)",
+    "block_bootstrap": "Block bootstrap (runs of consecutive days)",
+    "shuffle": "Shuffle (same days, random order)",
+}
+DEFAULT_PATHS = 10_000
+DEFAULT_BLOCK_SIZE = 5  # days per block (block bootstrap keeps streaks and volatility clusters)
+PERCENTILES = [5, 25, 50, 75, 95]  # bands reported per day and per path statistic
+CHUNK_PATHS = 1_000  # paths simulated together: bounds memory to a few [1000 x days] arrays
+SIM_WORKERS = os.cpu_count() or 1  # processes for large runs
+SIM_START_METHOD = "spawn"  # same as ingest: forking the multi-threaded streamlit server is not safe
+MIN_PARALLEL_CELLS = 20_000_000  # paths x days. Smaller runs finish before the pool could pay for itself
+
+
+# ==== Monte Carlo simulation of the daily P/L (all paths of a chunk as one [paths x days] array) =====
+# Every path is a resampled sequence of the realized daily P/L, laid on the realized close dates. Cumulative P/L,
+# running max, DD and DD duration are computed for all paths of a chunk at once, with the same definitions as the
+# realized curve (utility.add_PL_metrics). Chunks get their own seed from one SeedSequence, so the result of a
+# seed is the same with or without the process pool.
+def run_monte_carlo(
+    daily_PL,
+    dates,
+    n_paths=DEFAULT_PATHS,
+    method="bootstrap",
+    block_size=DEFAULT_BLOCK_SIZE,
+    seed=0,
+    parallel=None,  # None: use the pool for large runs only
+    progress=None,  # progress(fraction, message) after every chunk of paths (jobs.Job.report)
+):  # Return percentile bands per day and percentiles of per path statistics. None without data
+    if method not in SIMULATION_METHODS:
+        raise ValueError(f"method must be one of {list(SIMULATION_METHODS)}, not '{method}'.")
+    daily_PL = np.asarray(daily_PL, dtype=np.float64)
+    if len(daily_PL) == 0 or n_paths < 1:
+        return None
+    day_numbers = get_day_numbers(dates)
+    chunk_sizes = [min(CHUNK_PATHS, n_paths - start) for start in range(0, n_paths, CHUNK_PATHS)]
+    seeds = np.random.SeedSequence(seed).spawn(len(chunk_sizes))
+    args = [daily_PL, day_numbers, method, block_size]
+    if parallel is None:
+        parallel = SIM_WORKERS > 1 and n_paths * len(daily_PL) >= MIN_PARALLEL_CELLS
+    if parallel and len(chunk_sizes) > 1:
+        n_chunks = len(chunk_sizes)
+        pool_args = ("simulation", SIM_WORKERS, SIM_START_METHOD)  # started on the first large run, reused
+        chunks = map_process_pool(*pool_args, simulate_chunk, *[[arg] * n_chunks for arg in args], chunk_sizes, seeds)
+    else:
+        chunks = (simulate_chunk(*args, size, chunk_seed) for size, chunk_seed in zip(chunk_sizes, seeds))
+
+    cum_PL = np.empty((n_paths, len(daily_PL)), dtype=np.float32)  # float32 halves the memory of the bands input
+    DD = np.empty_like(cum_PL)
+    stats = []
+    start = 0
+    for chunk in chunks:
+        end = start + len(chunk["stats"].index)
+        cum_PL[start:end], DD[start:end] = chunk["cum_PL"], chunk["DD"]
+        stats.append(chunk["stats"])
+        start = end
+        if progress is not None:
+            progress(end / n_paths, f"{end:,} of {n_paths:,} paths")
+    df_stats = pd.concat(stats, ignore_index=True)
+    return {
+        "method": method,
+        "n_paths": n_paths,
+        "percentiles": PERCENTILES,
+        "dates": pd.Index(dates),
+        "PL_bands": np.percentile(cum_PL, PERCENTILES, axis=0),  # [percentiles x days]
+        "DD_bands": np.percentile(DD, PERCENTILES, axis=0),
+        "stats": df_stats.quantile(np.array(PERCENTILES) / 100).set_axis(PERCENTILES),  # [percentiles x stats]
+    }
+
+
+def simulate_chunk(daily_PL, day_numbers, method, block_size, n_paths, seed):  # one chunk of paths (runs in a worker)
+    rng = np.random.default_rng(seed)
+    cum_PL = np.cumsum(resample_daily_PL(daily_PL, n_paths, method, block_size, rng), axis=1)
+    DD = np.maximum.accumulate(cum_PL, axis=1)
+    DD -= cum_PL  # running max - cum P/L
+    # DD duration: days since the last DD == 0 day. The first day is always a peak, so every row has one
+    at_peak = DD == 0
+    last_peak = np.maximum.accumulate(np.where(at_peak, day_numbers, np.iinfo(np.int64).min), axis=1)
+    DD_duration = np.where(at_peak, 0, day_numbers - last_peak)
+    stats = pd.DataFrame(
+        {
+            "ending_PL": cum_PL[:, -1],
+            "max_DD": DD.max(axis=1),
+            "max_DD_duration": DD_duration.max(axis=1),
+        }
+    )
+    return {"cum_PL": cum_PL.astype(np.float32), "DD": DD.astype(np.float32), "stats": stats}
+
+
+def resample_daily_PL(daily_PL, n_paths, method, block_size, rng):  # [n_paths x days] resampled daily P/L
+    n_days = len(daily_PL)
+    if method == "bootstrap":
+        return daily_PL[rng.integers(n_days, size=(n_paths, n_days))]
+    if method == "block_bootstrap":  # circular blocks: a block starting near the end wraps to the first days
+        block_size = max(1, min(block_size, n_days))
+        n_blocks = -(-n_days // block_size)
+        starts = rng.integers(n_days, size=(n_paths, n_blocks, 1))
+        positions = (starts + np.arange(block_size)) % n_days
+        return daily_PL[positions.reshape(n_paths, n_blocks * block_size)[:, :n_days]]
+    # shuffle: every path has the same days (same ending P/L), only the order and so the DD change
+    return rng.permuted(np.broadcast_to(daily_PL, (n_paths, n_days)), axis=1)
+
+
+instrument_functions(globals())  # wall time / calls / memory per function when profiling is on
@@ -0,0 +1,179 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from trade_schema import ACCOUNT_COLUMN, TRADE_COUNT_COLUMN
+
+# ---- cube cache settings ----
+MAX_CACHED_CUBES = 8  # cubes are small (days x strategies), one per loaded dataset
+
+_cube_cache = OrderedDict()  # dataset hash -> cube, least recently used first. Shared by all sessions.
+_cube_lock = threading.Lock()
+
+
+# ==== strategy x close date P/L cube =====
+# Trades opened and closed on the same day (the usual case) are summed into dense [days x strategies] P/L and
+# trade count matrices. For those trades the open date filter is the same as a close date row slice, so applying
+# the dashboard filters is a column selection + row slice + sum. Trades held over one or more nights cannot be
+# filtered that way and are kept in a small trade level remainder ("overnight"), filtered with a mask.
+# Multi-account data has one column per (strategy, account) pair, so the account filter is a column selection too.
+def build_PL_cube(dataframe):
+    strat_codes, strategies = pd.factorize(dataframe["Strategy"], sort=False)  # same order as .unique()
+    if ACCOUNT_COLUMN in dataframe.columns:
+        account_codes, accounts = pd.factorize(dataframe[ACCOUNT_COLUMN], sort=True)
+    else:
+        account_codes, accounts = np.zeros(len(dataframe.index), dtype=np.int64), []
+    n_accounts = max(len(accounts), 1)
+    column_codes, columns = pd.factorize(strat_codes * n_accounts + account_codes, sort=True)
+    date_codes, dates = pd.factorize(dataframe["Date Closed"], sort=True)
+    if TRADE_COUNT_COLUMN in dataframe.columns:  # pre-aggregated rows (large file mode)
+        trade_counts = dataframe[TRADE_COUNT_COLUMN].to_numpy(dtype=np.int64)
+    else:
+        trade_counts = np.ones(len(dataframe.index), dtype=np.int64)
+    PL = dataframe["P/L"].to_numpy(dtype=np.float64)
+    valid = (date_codes >= 0) & (strat_codes >= 0) & (account_codes >= 0)  # rows without close date are left out
+    same_day = valid & (dataframe["Date Opened"] == dataframe["Date Closed"]).to_numpy()
+    overnight = valid & ~same_day
+
+    n_cells = len(dates) * len(columns)
+    cell = date_codes[same_day] * len(columns) + column_codes[same_day]
+    cube_PL = np.bincount(cell, weights=PL[same_day], minlength=n_cells).reshape(len(dates), len(columns))
+    cube_count = np.bincount(cell, weights=trade_counts[same_day], minlength=n_cells).astype(np.int64)
+
+    return {
+        "strategies": pd.Index(strategies),
+        "accounts": pd.Index(accounts),  # sorted. Empty for single account data
+        "column_strategy": np.asarray(columns) // n_accounts,  # strategy position of every cube column
+        "column_account": np.asarray(columns) % n_accounts,
+        "dates": pd.Index(dates),  # sorted close dates
+        "PL": cube_PL,
+        "count": cube_count.reshape(len(dates), len(columns)),
+        "overnight": pd.DataFrame(
+            {
+                "column": column_codes[overnight],
+                "Date Opened": dataframe["Date Opened"].to_numpy()[overnight],
+                "date_code": date_codes[overnight],
+                "P/L": PL[overnight],
+                "count": trade_counts[overnight],
+            }
+        ),
+        "min_open_date": dataframe["Date Opened"].min(),
+        "max_open_date": dataframe["Date Opened"].max(),
+    }
+
+
+def get_PL_cube(dataframe, df_hash):  # cached build_PL_cube, one cube per dataset
+    with _cube_lock:
+        cube = _cube_cache.get(df_hash)
+        if cube is not None:
+            _cube_cache.move_to_end(df_hash)
+            return cube
+    cube = build_PL_cube(dataframe)
+    with _cube_lock:
+        _cube_cache[df_hash] = cube
+        while len(_cube_cache) > MAX_CACHED_CUBES:
+            _cube_cache.popitem(last=False)
+    return cube
+
+
+def _select(cube, selected_strat_list, selected_date, selected_accounts=None):  # columns, row slice, overnight rows
+    strat_positions = cube["strategies"].get_indexer(list(selected_strat_list))
+    selected_columns = np.isin(cube["column_strategy"], strat_positions[strat_positions >= 0])
+    if selected_accounts is not None and len(cube["accounts"]):
+        account_positions = cube["accounts"].get_indexer(list(selected_accounts))
+        selected_columns &= np.isin(cube["column_account"], account_positions[account_positions >= 0])
+    columns = np.flatnonzero(selected_columns)
+    start_date, end_date = pd.Timestamp(selected_date[0]), pd.Timestamp(selected_date[1])  # slider: python dates
+    rows = slice(
+        cube["dates"].searchsorted(start_date, side="left"),
+        cube["dates"].searchsorted(end_date, side="right"),
+    )
+    overnight = cube["overnight"]
+    overnight_mask = (
+        (overnight["Date Opened"] >= start_date)
+        & (overnight["Date Opened"] <= end_date)
+        & selected_columns[overnight["column"].to_numpy()]
+    )
+    return columns, rows, overnight[overnight_mask.to_numpy()]
+
+
+def get_cube_daily_PL(cube, selected_strat_list, selected_date, selected_accounts=None):  # = get_daily_PL(filtered)
+    columns, rows, overnight = _select(cube, selected_strat_list, selected_date, selected_accounts)
+    daily_PL = np.zeros(len(cube["dates"]))
+    daily_count = np.zeros(len(cube["dates"]), dtype=np.int64)
+    daily_PL[rows] = cube["PL"][rows, columns].sum(axis=1)
+    daily_count[rows] = cube["count"][rows, columns].sum(axis=1)
+    # overnight trades add to their close date, which can be after the selected open date range
+    np.add.at(daily_PL, overnight["date_code"].to_numpy(), overnight["P/L"].to_numpy())
+    np.add.at(daily_count, overnight["date_code"].to_numpy(), overnight["count"].to_numpy())
+    traded = daily_count > 0  # only days with closed trades, like groupby
+    return pd.DataFrame(
+        {"Date Closed": cube["dates"][traded], "Daily_PL": daily_PL[traded], "Daily_count": daily_count[traded]}
+    )
+
+
+def get_cube_strategy_PL(cube, selected_strat_list, selected_date, selected_accounts=None):  # P/L per traded strategy
+    columns, rows, overnight = _select(cube, selected_strat_list, selected_date, selected_accounts)
+    column_PL = np.zeros(len(cube["column_strategy"]))
+    column_count = np.zeros(len(cube["column_strategy"]), dtype=np.int64)
+    column_PL[columns] = cube["PL"][rows, columns].sum(axis=0)
+    column_count[columns] = cube["count"][rows, columns].sum(axis=0)
+    np.add.at(column_PL, overnight["column"].to_numpy(), overnight["P/L"].to_numpy())
+    np.add.at(column_count, overnight["column"].to_numpy(), overnight["count"].to_numpy())
+    # columns of the same strategy in different accounts add up
+    n_strategies = len(cube["strategies"])
+    strat_PL = np.bincount(cube["column_strategy"], weights=column_PL, minlength=n_strategies)
+    strat_count = np.bincount(cube["column_strategy"], weights=column_count, minlength=n_strategies)
+    traded = strat_count > 0
+    df_strat_PL = pd.DataFrame({"Strategy": cube["strategies"][traded], "P/L": strat_PL[traded]})
+    return df_strat_PL.sort_values(by="Strategy").reset_index(drop=True)  # same order as get_PL_per_strategy
+
+
+# daily P/L per traded strategy (risk_metrics.get_strategy_daily_PL of the filtered trades)
+def get_cube_strategy_daily_PL(cube, selected_strat_list, selected_date, selected_accounts=None):
+    columns, rows, overnight = _select(cube, selected_strat_list, selected_date, selected_accounts)
+    n_dates, n_strategies = len(cube["dates"]), len(cube["strategies"])
+    strat_PL = np.zeros((n_dates, n_strategies))
+    strat_count = np.zeros((n_dates, n_strategies), dtype=np.int64)
+    if len(columns):
+        # columns of the same strategy in different accounts add up. Cube columns are sorted by strategy code, so
+        # the columns of a strategy are adjacent: one reduceat over the runs, O(days x columns), no matmul
+        column_strategy = cube["column_strategy"][columns]
+        starts = np.flatnonzero(np.r_[True, column_strategy[1:] != column_strategy[:-1]])
+        strat_PL[rows][:, column_strategy[starts]] = np.add.reduceat(cube["PL"][rows, columns], starts, axis=1)
+        strat_count[rows][:, column_strategy[starts]] = np.add.reduceat(cube["count"][rows, columns], starts, axis=1)
+    overnight_strategy = cube["column_strategy"][overnight["column"].to_numpy()]
+    np.add.at(strat_PL, (overnight["date_code"].to_numpy(), overnight_strategy), overnight["P/L"].to_numpy())
+    np.add.at(strat_count, (overnight["date_code"].to_numpy(), overnight_strategy), overnight["count"].to_numpy())
+    traded_days = strat_count.sum(axis=1) > 0  # only days with closed trades, like groupby
+    order = np.argsort(cube["strategies"].to_numpy(), kind="stable")  # sorted names, like factorize(sort=True)
+    order = order[strat_count[:, order].sum(axis=0) > 0]  # only traded strategies
+    return {
+        "dates": cube["dates"][traded_days],
+        "strategies": cube["strategies"][order],
+        "PL": strat_PL[np.ix_(traded_days, order)],
+        "count": strat_count[np.ix_(traded_days, order)],
+    }
+
+
+def get_cube_open_dates(cube, selected_strat_list, selected_date, selected_accounts=None):  # Strategy, Date Opened
+    columns, rows, overnight = _select(cube, selected_strat_list, selected_date, selected_accounts)
+    date_idx, column_idx = np.nonzero(cube["count"][rows, columns] > 0)
+    return pd.concat(
+        [
+            pd.DataFrame(
+                {
+                    "Strategy": cube["strategies"][cube["column_strategy"][columns[column_idx]]],
+                    "Date Opened": cube["dates"][rows][date_idx],  # same day trades: open date = close date
+                }
+            ),
+            pd.DataFrame(
+                {
+                    "Strategy": cube["strategies"][cube["column_strategy"][overnight["column"].to_numpy()]],
+                    "Date Opened": overnight["Date Opened"].to_numpy(),
+                }
+            ),
+        ],
+        ignore_index=True,
+    ).drop_duplicates()
@@ -0,0 +1,78 @@
+import multiprocessing
+import os
+import site
+import sys
+import threading
+import types
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from profiling import instrument_functions
+
+# ---- process pool settings ----
+APP_DIR = os.path.dirname(os.path.abspath(__file__))  # workers import the task functions from the app modules
+
+_pools = {}  # pool name -> ProcessPoolExecutor, started on first use and reused (until it breaks)
+_pools_lock = threading.Lock()  # held while a pool is started or replaced: the __main__ swap is process wide
+
+
+# ==== process pools started from a streamlit script run =====
+# A spawned worker first rebuilds the __main__ module of its parent: from __main__.__file__ when it has one. Under
+# `streamlit run`, __main__ is the script module (main.py, with its __file__), so every worker would run the whole
+# app script again, without a session, and crash the pool. All workers are started here, with a __main__ stand-in
+# that has no file: they only import the modules of the functions they run. A pool starts a worker for each task
+# submitted while none is idle, so once all are started the pool never spawns again (unless a worker dies: the pool
+# is then broken and replaced by map_process_pool).
+def get_process_pool(name, max_workers, start_method):  # the pool of name (i.e. "parse"), started on first use
+    with _pools_lock:
+        pool = _pools.get(name)
+        if pool is None:
+            pool = _pools[name] = _start_process_pool(max_workers, start_method)
+        return pool
+
+
+def _start_process_pool(max_workers, start_method):  # ProcessPoolExecutor with every worker already started
+    # lock held: no other thread starts a pool (or a process) while __main__ is the stand-in
+    pool = ProcessPoolExecutor(
+        max_workers=max_workers,
+        mp_context=multiprocessing.get_context(start_method),
+        initializer=site.addsitedir,  # the app folder is on sys.path during script runs only, not in a job thread
+        initargs=(APP_DIR,),
+    )
+    script_main = sys.modules["__main__"]
+    sys.modules["__main__"] = types.ModuleType("__main__")
+    try:
+        for _ in range(max_workers):
+            pool.submit(int)  # no-op task: starts a worker
+    finally:
+        sys.modules["__main__"] = script_main
+    return pool
+
+
+def discard_process_pool(name, pool):  # drop a broken pool: the next get_process_pool of name starts a new one
+    with _pools_lock:
+        if _pools.get(name) is pool:  # not replaced by another thread already
+            del _pools[name]
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+# pool.map of the pool of name, results in order as they come. A worker that dies (killed, out of memory) breaks the
+# pool: BrokenProcessPool is raised on submit or on a result. The broken pool is then replaced and the tasks without
+# a result are sent again, once: tasks must be repeatable (same arguments, same result).
+def map_process_pool(name, max_workers, start_method, func, *iterables):
+    tasks = list(zip(*iterables))
+    done = 0
+    for attempt in range(2):
+        pool = get_process_pool(name, max_workers, start_method)
+        try:
+            for result in pool.map(func, *zip(*tasks[done:])):
+                done += 1
+                yield result
+            return
+        except BrokenProcessPool:
+            discard_process_pool(name, pool)
+            if attempt:
+                raise
+
+
+instrument_functions(globals())  # wall time / calls / memory per function when profiling is on
@@ -0,0 +1,180 @@
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import nullcontext
+from datetime import datetime, timezone
+
+# ---- profiling settings (read once at start up) ----
+# TRADE_LOG_PROFILE=time: wall time + call counts per function / block. =memory: also peak memory (tracemalloc,
+# slows every allocation down). Unset / off: nothing is wrapped, so instrumentation costs nothing.
+PROFILE_MODES = ["off", "time", "memory"]
+PROFILE_MODE = os.environ.get("TRADE_LOG_PROFILE", "off").strip().lower()
+PROFILE_MODE = {"": "off", "0": "off", "1": "time", "on": "time", "true": "time"}.get(PROFILE_MODE, PROFILE_MODE)
+if PROFILE_MODE not in PROFILE_MODES:
+    raise ValueError(f"TRADE_LOG_PROFILE must be one of {PROFILE_MODES}, not '{PROFILE_MODE}'.")
+PROFILE_ENABLED = PROFILE_MODE != "off"
+# one json line per function / block per rerun, for offline analysis (i.e. pandas.read_json(path, lines=True))
+PROFILE_LOG_PATH = os.environ.get(
+    "TRADE_LOG_PROFILE_LOG", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "profile.jsonl")
+)
+
+_local = threading.local()  # records of the rerun running on this thread (streamlit runs a script in one thread)
+_log_lock = threading.Lock()
+_rerun_counter = 0
+_NULL_BLOCK = nullcontext()
+
+
+# ==== recording =====
+def _get_records():  # name -> {"kind", "calls", "seconds"(, "peak_MB")} of the current rerun
+    if not hasattr(_local, "records"):
+        _local.records = {}
+        _local.stack = []  # open blocks: [start memory, peak of finished children]
+    return _local.records
+
+
+def _enter():
+    _get_records()
+    frame = [0, 0]
+    if PROFILE_MODE == "memory":
+        current, peak = tracemalloc.get_traced_memory()
+        if _local.stack:  # the enclosing block's peak so far, before the counter is reset for this block
+            _local.stack[-1][1] = max(_local.stack[-1][1], peak)
+        tracemalloc.reset_peak()
+        frame = [current, 0]
+    _local.stack.append(frame)
+    return time.perf_counter()
+
+
+def _exit(name, kind, start):
+    seconds = time.perf_counter() - start
+    start_memory, child_peak = _local.stack.pop()
+    record = _local.records.setdefault(name, {"kind": kind, "calls": 0, "seconds": 0.0})
+    record["calls"] += 1
+    record["seconds"] += seconds
+    if PROFILE_MODE == "memory":
+        peak = max(tracemalloc.get_traced_memory()[1], child_peak)
+        if _local.stack:
+            _local.stack[-1][1] = max(_local.stack[-1][1], peak)
+        record["peak_MB"] = max(record.get("peak_MB", 0.0), (peak - start_memory) / 1024**2)
+
+
+def profiled(func, name=None, kind="function"):  # decorator. Returns func itself when profiling is off
+    if not PROFILE_ENABLED:
+        return func
+    name = name or f"{func.__module__}.{func.__qualname__}"
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        start = _enter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            _exit(name, kind, start)
+
+    return wrapper
+
+
+class _Block:  # context manager for a block of code (i.e. one tab of main.py)
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        # no rerun open: the block runs alone (a fragment rerun), report it as a rerun of its own
+        _get_records()
+        self.own_rerun = not _local.stack
+        if self.own_rerun:
+            start_rerun(scope=self.name)
+        self.start = _enter()
+        return self
+
+    def __exit__(self, *exc_info):
+        _exit(self.name, "block", self.start)
+        if self.own_rerun:
+            finish_rerun(complete=exc_info[0] is None)
+        return False  # exceptions (st.stop, st.rerun) pass through
+
+
+def profile_block(name):  # `with profile_block("tab_summary"):`. A shared no-op context when profiling is off
+    return _Block(name) if PROFILE_ENABLED else _NULL_BLOCK
+
+
+def instrument_functions(namespace):  # wrap every function defined in a module: instrument_functions(globals())
+    # Calls inside the module go through the module globals, so they are recorded too.
+    if not PROFILE_ENABLED:
+        return
+    for name, obj in list(namespace.items()):
+        if inspect.isfunction(obj) and obj.__module__ == namespace["__name__"]:
+            namespace[name] = profiled(obj)
+
+
+# ==== per rerun report =====
+def start_rerun(scope="app"):  # call at the top of the script. Records left by an interrupted rerun are reported
+    global _rerun_counter
+    if not PROFILE_ENABLED:
+        return
+    if _get_records() or _local.stack:
+        finish_rerun(complete=False)
+    if PROFILE_MODE == "memory" and not tracemalloc.is_tracing():
+        tracemalloc.start()
+    with _log_lock:
+        _rerun_counter += 1
+        _local.rerun = _rerun_counter
+    _local.scope = scope  # "app", or the block name of a fragment rerun
+    _local.stack = []
+    _local.rerun_start = _enter()  # the whole rerun is recorded as one more block
+
+
+def finish_rerun(complete=True):  # clear the records of this rerun, write them as json lines. Return the report
+    if not PROFILE_ENABLED:
+        return None
+    records = _get_records()
+    if _local.stack:
+        del _local.stack[1:]  # blocks left open by an interrupted rerun
+        _exit("rerun", "rerun", _local.rerun_start)
+    report = {
+        "time": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+        "rerun": getattr(_local, "rerun", None),
+        "scope": getattr(_local, "scope", None),
+        "complete": complete,
+        "records": [{"name": name, **record} for name, record in records.items()],
+    }
+    _local.records = {}
+    _write_profile_log(report)
+    return report
+
+
+def _write_profile_log(report):
+    lines = [
+        json.dumps({key: report[key] for key in ("time", "rerun", "scope", "complete")} | record)
+        for record in report["records"]
+    ]
+    if not lines:
+        return
+    try:
+        os.makedirs(os.path.dirname(PROFILE_LOG_PATH), exist_ok=True)
+        with _log_lock, open(PROFILE_LOG_PATH, "a") as f:
+            f.write("\n".join(lines) + "\n")
+    except OSError:  # read-only disk: the sidebar report still works
+        pass
+
+
+def show_profile_sidebar(report):  # debug sidebar with the records of the rerun that just finished
+    if report is None:
+        return
+    import streamlit as st  # only the dashboard shows the report: headless imports of this module skip streamlit
+
+    with st.sidebar:
+        st.subheader("Profiling", anchor=False)
+        st.caption(f"_Rerun {report['rerun']}, mode: {PROFILE_MODE}. Times include nested calls._")
+        rows = sorted(report["records"], key=lambda record: record["seconds"], reverse=True)
+        columns = ["name", "kind", "calls", "seconds"] + (["peak_MB"] if PROFILE_MODE == "memory" else [])
+        st.dataframe(
+            [{column: row[column] for column in columns} for row in rows],
+            hide_index=True,
+            column_config={"seconds": st.column_config.NumberColumn(format="%.4f")},
+        )
+        st.caption(f"_Json lines: {PROFILE_LOG_PATH}_")
@@ -0,0 +1,227 @@
+# Headless batch report: metrics tables and static html charts for many trade logs, without starting streamlit
+# (nothing imported here imports streamlit). Logs are processed in parallel, one process per log. Run from the
+# repository root:
+#   python report.py data/Demo_trade_log.csv                      # starting fund 50000, parquet tables
+#   python report.py logs/*.csv --starting-fund 50000 100000 --format csv --output reports/nightly
+#   python report.py huge_log.csv --large-file                    # streamed: daily P/L per strategy only
+#   python report.py logs/*.csv --no-cache                        # parse every log, nothing cached on disk
+# Output: summary.<format> (one row per log and starting fund), and per log a folder (named after the file, see
+# get_report_names) with daily_PL, strategies (whole period metrics per strategy), strategy_equity (cum. P/L and DD of
+# every strategy on its own, one row per strategy and day it traded), rolling_latest (last rolling window per
+# strategy), exposure_peaks and exposure_daily (peak open positions / capital at risk, not in large file mode) and one
+# html page of charts per starting fund. Parsed logs are cached in <output>/.cache (not in the app's .cache folder),
+# so a nightly run over the same exports skips parsing: see --cache-dir / --no-cache.
+import argparse
+import hashlib
+import os
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import ingest
+import pandas as pd
+import plotly.offline
+from analytics import add_PL_metrics, get_daily_PL, get_PL_per_strategy, get_simple_stat
+from analytics import add_strategy_PL_metrics, convert_strategy_daily_PL_long
+from figures import get_daily_PL_cum_PL_figure, get_PL_DD_figure, get_PL_per_strategy_figure
+from figures import get_rolling_metric_figure, get_strategy_DD_figure
+from ingest import load_trade_log_file
+from exposure import build_exposure, has_exposure_columns
+from risk_metrics import ROLLING_WINDOWS, DEFAULT_WINDOW, get_latest_metrics, get_rolling_metrics
+from risk_metrics import get_strategy_daily_PL
+
+# ---- report settings ----
+DEFAULT_STARTING_FUNDS = [50000]
+DEFAULT_OUTPUT_DIR = "reports"
+CACHE_DIR_NAME = ".cache"  # default cache folder, inside the output folder
+TABLE_FORMATS = ["parquet", "csv"]
+REPORT_WORKERS = os.cpu_count() or 1
+REPORT_NAME_HASH_LENGTH = 8  # path hash added to the folder of logs sharing a file name
+PLOTLY_JS_NAME = "plotly.min.js"  # written once next to the html pages, so they open offline
+
+
+# ==== one trade log (runs in a worker) =====
+def build_log_report(path, name, starting_funds, output_dir, table_format, window, large_file=False):
+    # Write the tables and charts of one log in output_dir/name (see get_report_names). Return the summary rows (one
+    # per starting fund).
+    df, _ = load_trade_log_file(path, streaming=large_file)
+    log_dir = os.path.join(output_dir, name)
+    os.makedirs(log_dir, exist_ok=True)
+    trade_number, start_date, end_date, strategy_number, _ = get_simple_stat(df)
+    df_daily_PL = get_daily_PL(df)
+    strategy_daily_PL = get_strategy_daily_PL(df)
+    df_strategy_long = convert_strategy_daily_PL_long(strategy_daily_PL)
+    n_days = len(df_daily_PL.index)
+
+    summary_rows, daily_tables, strategy_tables, equity_tables, rolling_tables = [], [], [], [], []
+    for starting_fund in starting_funds:
+        df_PL = add_PL_metrics(df_daily_PL.copy(), starting_fund)
+        df_strategy_PL = add_strategy_PL_metrics(df_strategy_long.copy(), starting_fund)
+        # whole period metrics: one rolling window over all days
+        df_period = get_latest_metrics(get_rolling_metrics(strategy_daily_PL, max(n_days, 1), starting_fund))
+        rolling = get_rolling_metrics(strategy_daily_PL, window, starting_fund)
+        portfolio = df_period.iloc[0] if n_days else pd.Series(dtype=float)
+        summary_rows.append(
+            {
+                "log": name,
+                "starting_fund": starting_fund,
+                "trades": trade_number,
+                "strategies": strategy_number,
+                "start_date": start_date,
+                "end_date": end_date,
+                "days": n_days,
+                "total_PL": float(df_PL["cum_PL"].iat[-1]) if n_days else 0.0,
+                "max_DD": float(df_PL["DD"].max()) if n_days else 0.0,
+                "max_DD_pct": float(df_PL["DD_pct_startingfund"].max()) if n_days else 0.0,
+                "max_DD_duration": int(df_PL["DD_duration"].max()) if n_days else 0,
+                **portfolio.drop("P/L", errors="ignore").to_dict(),
+            }
+        )
+        daily_tables.append(df_PL.assign(starting_fund=starting_fund))
+        strategy_tables.append(_series_table(df_period, starting_fund))
+        equity_tables.append(df_strategy_PL.assign(starting_fund=starting_fund))
+        rolling_tables.append(_series_table(get_latest_metrics(rolling), starting_fund))
+        _write_charts(
+            os.path.join(log_dir, f"charts_{starting_fund:.0f}.html"),  # :g would write 1e+06 for 1,000,000
+            f"{name}: starting fund {starting_fund:,.0f}",
+            [
+                get_daily_PL_cum_PL_figure(df_PL),
+                get_PL_DD_figure(df_PL, starting_fund),
+                get_PL_per_strategy_figure(get_PL_per_strategy(df)),
+                get_rolling_metric_figure(rolling, "sharpe", per_strategy=True),
+                get_strategy_DD_figure(df_strategy_PL, "DD_pct_startingfund"),
+            ],
+        )
+    write_table(pd.concat(daily_tables, ignore_index=True), os.path.join(log_dir, "daily_PL"), table_format)
+    write_table(pd.concat(strategy_tables, ignore_index=True), os.path.join(log_dir, "strategies"), table_format)
+    write_table(pd.concat(equity_tables, ignore_index=True), os.path.join(log_dir, "strategy_equity"), table_format)
+    write_table(pd.concat(rolling_tables, ignore_index=True), os.path.join(log_dir, "rolling_latest"), table_format)
+    if has_exposure_columns(df):  # trade level logs: peak open positions / capital at risk per strategy
+        exposure = build_exposure(df)
+        write_table(exposure["peaks"].reset_index(), os.path.join(log_dir, "exposure_peaks"), table_format)
+        write_table(exposure["daily_peaks"], os.path.join(log_dir, "exposure_daily"), table_format)
+    return summary_rows
+
+
+def _series_table(df_metrics, starting_fund):  # series x metric dataframe -> Series column + starting fund column
+    df_metrics = df_metrics.rename_axis("Series").reset_index()
+    df_metrics.insert(1, "starting_fund", starting_fund)
+    return df_metrics
+
+
+def _write_charts(path, title, figures):  # one static html page, plotly.js loaded from the report folder
+    divs = [fig.to_html(full_html=False, include_plotlyjs=False) for fig in figures]
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(
+            f'<html><head><meta charset="utf-8"><title>{title}</title>'
+            f'<script src="../{PLOTLY_JS_NAME}"></script></head>'
+            f'<body style="background-color:#111111">{"".join(divs)}</body></html>'
+        )
+
+
+def write_table(dataframe, path, table_format):  # path without extension
+    if table_format == "parquet":
+        dataframe.to_parquet(f"{path}.parquet", index=False)
+    else:
+        dataframe.to_csv(f"{path}.csv", index=False)
+
+
+# ==== all trade logs =====
+def run_reports(
+    paths,
+    starting_funds,
+    output_dir,
+    table_format="parquet",
+    window=None,
+    large_file=False,
+    workers=None,
+    cache_dir=None,  # disk cache of the parsed logs. None: parsed logs are not written to disk
+):  # Process every log (in parallel when there are several) and write summary.<format>. Return summary, failures
+    window = window or ROLLING_WINDOWS[DEFAULT_WINDOW]
+    paths = list(dict.fromkeys(paths))  # a log given twice is reported once
+    names = get_report_names(paths)
+    workers = min(workers or REPORT_WORKERS, len(paths))
+    os.makedirs(output_dir, exist_ok=True)
+    with open(os.path.join(output_dir, PLOTLY_JS_NAME), "w", encoding="utf-8") as f:
+        f.write(plotly.offline.get_plotlyjs())
+    args = (starting_funds, output_dir, table_format, window, large_file)
+    if workers > 1:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_set_cache_dir, initargs=(cache_dir,)) as pool:
+            futures = {path: pool.submit(build_log_report, path, names[path], *args) for path in paths}
+            results = {path: _get_result(future.result, path) for path, future in futures.items()}
+    else:  # in this process: the cache folder is set back afterwards
+        app_cache_dir = _set_cache_dir(cache_dir)
+        try:
+            results = {path: _get_result(lambda: build_log_report(path, names[path], *args), path) for path in paths}
+        finally:
+            _set_cache_dir(app_cache_dir)
+    summary_rows = [row for rows in results.values() if rows is not None for row in rows]
+    failures = [path for path, rows in results.items() if rows is None]
+    df_summary = pd.DataFrame(summary_rows)
+    write_table(df_summary, os.path.join(output_dir, "summary"), table_format)
+    return df_summary, failures
+
+
+def _set_cache_dir(cache_dir):  # disk cache folder of ingest (None: none). Return the previous one
+    previous, ingest.CACHE_DIR = ingest.CACHE_DIR, cache_dir
+    return previous
+
+
+def get_report_names(paths):  # path -> folder name of its report: the file name, unique among the logs
+    # logs with the same file name in different folders (a/trades.csv, b/trades.csv) would overwrite each other's
+    # report: they get a short hash of their full path, stable from run to run. Compared case insensitively, as on
+    # Windows / macOS file systems.
+    stems = {path: os.path.splitext(os.path.basename(path))[0] for path in paths}
+    counts = Counter(stem.lower() for stem in stems.values())
+    return {
+        path: stem if counts[stem.lower()] == 1 else f"{stem}_{_get_path_hash(path)}" for path, stem in stems.items()
+    }
+
+
+def _get_path_hash(path):
+    return hashlib.sha256(os.path.abspath(path).encode()).hexdigest()[:REPORT_NAME_HASH_LENGTH]
+
+
+def _get_result(get, path):  # rows of one log, None (reported) if it failed
+    try:
+        rows = get()
+    except Exception as e:  # one bad export should not stop the nightly run
+        print(f"FAILED {path}: {type(e).__name__}: {e}", flush=True)
+        return None
+    print(f"done {path}", flush=True)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write metrics tables and html charts for trade logs (no server).")
+    parser.add_argument("paths", nargs="+", help="csv trade logs (option omega format)")
+    parser.add_argument(
+        "--starting-fund", type=float, nargs="+", default=DEFAULT_STARTING_FUNDS, help="one report per fund"
+    )
+    parser.add_argument("--output", default=DEFAULT_OUTPUT_DIR, help="output folder")
+    parser.add_argument("--format", choices=TABLE_FORMATS, default="parquet", help="table file format")
+    parser.add_argument("--window", choices=list(ROLLING_WINDOWS), default=DEFAULT_WINDOW, help="rolling window")
+    parser.add_argument("--large-file", action="store_true", help="stream the logs (daily P/L per strategy only)")
+    parser.add_argument("--workers", type=int, default=REPORT_WORKERS, help="processes (one log per process)")
+    parser.add_argument("--cache-dir", help=f"parsed log cache folder (default: <output>/{CACHE_DIR_NAME})")
+    parser.add_argument("--no-cache", action="store_true", help="parse every log, write no cache")
+    args = parser.parse_args()
+    cache_dir = None if args.no_cache else args.cache_dir or os.path.join(args.output, CACHE_DIR_NAME)
+
+    df_summary, failures = run_reports(
+        args.paths,
+        args.starting_fund,
+        args.output,
+        args.format,
+        ROLLING_WINDOWS[args.window],
+        args.large_file,
+        args.workers,
+        cache_dir,
+    )
+    print(f"{len(df_summary.index)} summary row(s) written to {os.path.join(args.output, 'summary.' + args.format)}")
+    print(f"{len(failures)} failed log(s)")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,157 @@
+import numpy as np
+import pandas as pd
+from analytics import get_day_numbers
+from trade_schema import TRADE_COUNT_COLUMN
+from profiling import instrument_functions
+
+# ---- rolling metrics settings ----
+ROLLING_WINDOWS = {  # label -> window in trading days (rows of the daily P/L)
+    "1M": 21,
+    "3M": 63,
+    "6M": 126,
+    "1Y": 252,
+}
+DEFAULT_WINDOW = "3M"
+TRADING_DAYS_PER_YEAR = 252  # annualization of Sharpe and Sortino
+PORTFOLIO_NAME = "Portfolio"  # series name of the sum of all strategies
+ROLLING_METRICS = {  # metric -> label
+    "PL": "P/L",
+    "sharpe": "Sharpe",
+    "sortino": "Sortino",
+    "win_rate": "Win rate %",
+    "profit_factor": "Profit factor",
+    "CAGR": "CAGR %",
+    "worst_day": "Worst day P/L",
+    "DD": "DD from window high",
+}
+
+
+# ==== daily P/L per strategy as [days x strategies] matrices (input of the rolling engine) =====
+def get_strategy_daily_PL(dataframe):  # trade level data -> dates, strategies, P/L and trade count matrices
+    strat_codes, strategies = pd.factorize(dataframe["Strategy"], sort=True)
+    date_codes, dates = pd.factorize(dataframe["Date Closed"], sort=True)
+    if TRADE_COUNT_COLUMN in dataframe.columns:  # pre-aggregated rows (large file mode)
+        trade_counts = dataframe[TRADE_COUNT_COLUMN].to_numpy(dtype=np.float64)
+    else:
+        trade_counts = np.ones(len(dataframe.index))
+    valid = (strat_codes >= 0) & (date_codes >= 0)
+    cell = date_codes[valid] * len(strategies) + strat_codes[valid]
+    n_cells = len(dates) * len(strategies)
+    PL = np.bincount(cell, weights=dataframe["P/L"].to_numpy(dtype=np.float64)[valid], minlength=n_cells)
+    count = np.bincount(cell, weights=trade_counts[valid], minlength=n_cells).astype(np.int64)
+    return {
+        "dates": pd.Index(dates),
+        "strategies": pd.Index(strategies),
+        "PL": PL.reshape(len(dates), len(strategies)),
+        "count": count.reshape(len(dates), len(strategies)),
+    }
+
+
+# ==== O(n) rolling metrics over every strategy + the portfolio at once =====
+# Windows are counted in rows (days with closed trades). Every metric comes from running sums (cumsum differences)
+# or from a rolling max / min, computed on the whole [days x series] matrix, so the cost is O(days x series)
+# whatever the window. Rows before the first full window are NaN, like pandas rolling. A history shorter than the
+# window is measured as one window over all of its days.
+def get_rolling_metrics(strategy_daily_PL, window, starting_fund=None):  # return dict, metric -> [days x series]
+    series = pd.Index([PORTFOLIO_NAME, *strategy_daily_PL["strategies"]])
+    PL = strategy_daily_PL["PL"]
+    count = strategy_daily_PL["count"]
+    daily_PL = np.column_stack([PL.sum(axis=1), PL])
+    traded = np.column_stack([count.sum(axis=1), count]) > 0
+    n_days = len(daily_PL)
+    window = max(1, min(window, n_days)) if n_days else window
+
+    # P/L, mean, std (centered on the series mean: running sums of squares lose less precision)
+    PL_sum = _rolling_sum(daily_PL, window)
+    mean = PL_sum / window
+    centered = daily_PL - daily_PL.mean(axis=0) if n_days else daily_PL
+    centered_sum = _rolling_sum(centered, window)
+    variance = (_rolling_sum(centered**2, window) - centered_sum**2 / window) / (window - 1 or np.nan)  # 1 day: NaN
+    worst_day = _rolling_min(daily_PL, window)
+    # constant windows (e.g. days without trades) get exactly 0, not the rounding left by the running sums
+    std = np.where(_rolling_max(daily_PL, window) == worst_day, 0.0, np.sqrt(np.clip(variance, 0, None)))
+    downside = np.sqrt(_rolling_sum(np.minimum(daily_PL, 0) ** 2, window) / window)
+    annualize = np.sqrt(TRADING_DAYS_PER_YEAR)
+    # win rate and profit factor over the days the series traded
+    gains = _rolling_sum(np.maximum(daily_PL, 0), window)
+    losses = -_rolling_sum(np.minimum(daily_PL, 0), window)
+    wins = _rolling_sum((daily_PL > 0) & traded, window)
+    traded_days = _rolling_sum(traded, window)
+    # equity and DD from the highest equity in the window
+    cum_PL = np.cumsum(daily_PL, axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        metrics = {
+            "PL": PL_sum,
+            "sharpe": np.where(std > 0, mean / std * annualize, np.nan),
+            "sortino": np.where(downside > 0, mean / downside * annualize, np.nan),
+            "win_rate": np.where(traded_days > 0, wins / traded_days * 100, np.nan),
+            "profit_factor": np.where(losses > 0, gains / losses, np.nan),
+            "worst_day": worst_day,
+            "DD": _rolling_max(cum_PL, window) - cum_PL,
+        }
+        if starting_fund is not None:
+            metrics["CAGR"] = _get_rolling_CAGR(cum_PL, strategy_daily_PL["dates"], window, starting_fund)
+    labels = {metric: label for metric, label in ROLLING_METRICS.items() if metric in metrics}
+    return {"dates": strategy_daily_PL["dates"], "series": series, "window": window, "labels": labels, **metrics}
+
+
+def get_latest_metrics(rolling):  # last row of every metric: series x metric dataframe
+    df_latest = pd.DataFrame(
+        {label: rolling[metric][-1] for metric, label in rolling["labels"].items() if len(rolling["dates"])},
+        index=rolling["series"],
+    )
+    return df_latest
+
+
+def _get_rolling_CAGR(cum_PL, dates, window, starting_fund):  # CAGR % of starting fund + P/L over each window
+    # equity before the window: starting fund + cum P/L of the day before the first day of the window
+    end_equity = starting_fund + cum_PL
+    start_equity = starting_fund + _shift(cum_PL, window, fill=0.0)
+    days = get_day_numbers(dates)
+    span = np.full(len(days), np.nan)
+    span[window - 1 :] = days[window - 1 :] - days[: len(days) - window + 1] + 1  # calendar days, both ends included
+    years = (span / 365.25)[:, None]
+    growth = end_equity / start_equity
+    CAGR = np.where((start_equity > 0) & (growth > 0), (growth ** (1 / years) - 1) * 100, -100.0)
+    CAGR[: window - 1] = np.nan
+    return CAGR
+
+
+def _shift(values, periods, fill):  # values[t - periods], fill for t < periods
+    shifted = np.full_like(values, fill, dtype=np.float64)
+    shifted[periods:] = values[: len(values) - periods]
+    return shifted
+
+
+def _rolling_sum(values, window):  # sum over the last window rows (cumsum difference), NaN before a full window
+    values = np.asarray(values, dtype=np.float64)
+    out = np.full(values.shape, np.nan)
+    if window <= len(values):
+        cum = np.cumsum(values, axis=0)
+        out[window - 1] = cum[window - 1]
+        out[window:] = cum[window:] - cum[:-window]
+    return out
+
+
+def _rolling_max(values, window):  # max over the last window rows, NaN before a full window
+    # van Herk / Gil-Werman: prefix and suffix maxima inside blocks of window rows. The window ending at row t covers
+    # the suffix of one block and the prefix of the next, so every window max is one comparison: O(n) for any window
+    # (same cost as a monotonic deque, but one numpy pass over all series instead of a python loop per series).
+    values = np.asarray(values, dtype=np.float64)
+    n_days = len(values)
+    out = np.full(values.shape, np.nan)
+    if window > n_days:
+        return out
+    padded = np.concatenate([values, np.full(((-n_days) % window, *values.shape[1:]), -np.inf)])
+    blocks = padded.reshape(-1, window, *values.shape[1:])
+    prefix = np.maximum.accumulate(blocks, axis=1).reshape(padded.shape)
+    suffix = np.maximum.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].reshape(padded.shape)
+    out[window - 1 :] = np.maximum(suffix[: n_days - window + 1], prefix[window - 1 : n_days])
+    return out
+
+
+def _rolling_min(values, window):
+    return -_rolling_max(-np.asarray(values, dtype=np.float64), window)
+
+
+instrument_functions(globals())  # wall time / calls / memory per function when profiling is on
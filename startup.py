@@ -0,0 +1,69 @@
+import importlib
+import os
+import sys
+import threading
+import time
+
+from profiling import instrument_functions
+
+# ---- start up settings ----
+IMPORT_BUDGET_SECONDS = float(os.environ.get("TRADE_LOG_IMPORT_BUDGET", "0.5"))  # modules imported by main.py
+# imported by the first chart / saved dataset query, not at start up
+DEFERRED_MODULES = ["plotly.express", "plotly.subplots", "figures", "pyarrow.dataset"]
+# preloaded once the first page is out. Third party only: the app folder is on sys.path during script runs only
+WARM_UP_MODULES = ["plotly.express", "plotly.subplots", "pyarrow.dataset"]
+WARM_UP_TEMPLATE = "plotly_dark"  # plotly loads a template on first use: every chart uses this one
+
+_startup = {}  # last cold start / code reload: import seconds, modules loaded, deferred modules already loaded
+_warm_up_started = False
+_warm_up_lock = threading.Lock()
+
+
+# ==== import time of the app modules =====
+# A new server process (or a code reload) imports the app modules during the first script run, before anything is
+# drawn. main.py measures its imports and reports them here; plain reruns load nothing and are not reported.
+def record_imports(start, n_modules):  # start: perf_counter, n_modules: len(sys.modules) before the imports
+    if len(sys.modules) == n_modules:  # rerun: every module already loaded
+        return None
+    seconds = time.perf_counter() - start
+    _startup.update(
+        seconds=seconds,
+        modules=len(sys.modules) - n_modules,
+        budget=IMPORT_BUDGET_SECONDS,
+        deferred_loaded=[name for name in DEFERRED_MODULES if name in sys.modules],
+    )
+    status = "within" if seconds <= IMPORT_BUDGET_SECONDS else "OVER"
+    print(
+        f"start up: {_startup['modules']} modules imported in {seconds:.3f} s "
+        f"({status} the {IMPORT_BUDGET_SECONDS:g} s budget)",
+        file=sys.stderr,
+    )
+    return get_startup_report()
+
+
+def get_startup_report():  # {} until the first cold start
+    return dict(_startup)
+
+
+# ==== deferred modules, preloaded in the background =====
+# Called at the end of a script run: the page is drawn, so importing the chart modules now (once per process) takes
+# them off the path of the first chart without delaying the first paint. Imports of the same module from the script
+# thread wait for this one (import lock), they never load a module twice.
+def warm_up_deferred_modules():
+    global _warm_up_started
+    with _warm_up_lock:
+        if _warm_up_started:
+            return
+        _warm_up_started = True
+    threading.Thread(target=_warm_up, name="module-warm-up", daemon=True).start()
+
+
+def _warm_up():
+    for name in WARM_UP_MODULES:
+        importlib.import_module(name)
+    import plotly.io as pio
+
+    pio.templates[WARM_UP_TEMPLATE]  # loads the template json
+
+
+instrument_functions(globals())  # wall time / calls / memory per function when profiling is on
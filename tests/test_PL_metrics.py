@@ -0,0 +1,80 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+from analytics import compute_PL_metrics
+from benchmarks.synthetic_log import get_trade_log_bytes
+from ingest import read_trade_log
+
+DEMO_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "Demo_trade_log.csv")
+STARTING_FUND = 50000
+
+
+# reference: the row by row loop compute_PL_metrics replaced (convert_to_PL before the vectorized engine)
+def compute_PL_metrics_loop(dataframe, starting_fund=None):
+    df_PL = dataframe.groupby("Date Closed")["P/L"].agg(["sum", "count"]).reset_index()
+    df_PL["cum_PL"] = df_PL["sum"].cumsum()  # cumulative PL. 'sum' column is daily PL.
+    if starting_fund is not None:
+        df_PL["Fund"] = df_PL["cum_PL"] + starting_fund
+    df_PL["DD"] = df_PL["cum_PL"].cummax() - df_PL["cum_PL"]  # DD in amount
+    if starting_fund is not None:
+        df_PL["DD_pct_startingfund"] = df_PL["DD"] / starting_fund * 100
+    DD_duration = []  # calendar days since the last DD == 0 day
+    for t in range(len(df_PL)):
+        if df_PL["DD"].iloc[t] == 0:
+            DD_duration.append(0)
+        else:
+            days = (df_PL["Date Closed"][t] - df_PL["Date Closed"][t - 1]) // np.timedelta64(1, "D")
+            DD_duration.append(DD_duration[t - 1] + days)
+    df_PL["DD_duration"] = DD_duration
+    return df_PL.rename(columns={"sum": "Daily_PL", "count": "Daily_count"})
+
+
+def get_trades(daily_PL, dates):  # trade log with one trade per close date (two on even rows: same day P/L summed)
+    rows = []
+    for i, (PL, date) in enumerate(zip(daily_PL, pd.to_datetime(dates))):
+        rows += [(date, PL / 2), (date, PL / 2)] if i % 2 == 0 else [(date, PL)]
+    return pd.DataFrame(rows, columns=["Date Closed", "P/L"])
+
+
+def assert_same_metrics(dataframe, starting_fund):
+    result = compute_PL_metrics(dataframe, starting_fund)
+    expected = compute_PL_metrics_loop(dataframe, starting_fund)
+    assert list(result.columns) == list(expected.columns)
+    pd.testing.assert_series_equal(result["Date Closed"], expected["Date Closed"])
+    pd.testing.assert_series_equal(result["Daily_count"], expected["Daily_count"], check_dtype=False)
+    for column in ["Daily_PL", "cum_PL", "Fund", "DD", "DD_pct_startingfund"]:
+        if column in expected.columns:
+            np.testing.assert_array_equal(result[column], expected[column], err_msg=column)  # same summation order
+    np.testing.assert_array_equal(result["DD_duration"].to_numpy(), expected["DD_duration"].to_numpy())
+
+
+@pytest.mark.parametrize("starting_fund", [STARTING_FUND, None])
+def test_demo_log(starting_fund):
+    with open(DEMO_PATH, "rb") as file:
+        assert_same_metrics(read_trade_log(file.read()), starting_fund)
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_synthetic_log(seed):
+    assert_same_metrics(read_trade_log(get_trade_log_bytes(5000, n_strategies=8, n_days=400, seed=seed)), STARTING_FUND)
+
+
+def test_runs_at_peak():  # DD == 0 runs (new highs day after day, flat days) between drawdowns
+    daily_PL = [100, 50, 0, 0, 25, -300, 100, 400, 10, 0, -5, -5, 20, 30, 0]
+    assert_same_metrics(get_trades(daily_PL, pd.bdate_range("2024-01-01", periods=len(daily_PL))), STARTING_FUND)
+
+
+def test_gaps_of_several_days():  # durations count calendar days, not trading days
+    dates = ["2024-01-02", "2024-01-03", "2024-01-10", "2024-02-01", "2024-02-02", "2024-03-15", "2024-06-30"]
+    assert_same_metrics(get_trades([500, -200, 50, -100, 400, -50, -10], dates), STARTING_FUND)
+
+
+def test_negative_start():  # the running max starts at the first day, even below 0
+    assert_same_metrics(get_trades([-400, -100, 200, 600, -50], pd.bdate_range("2024-01-01", periods=5)), None)
+
+
+@pytest.mark.parametrize("PL", [250.0, -250.0, 0.0])
+def test_single_row(PL):
+    assert_same_metrics(pd.DataFrame({"Date Closed": [pd.Timestamp("2024-05-06")], "P/L": [PL]}), STARTING_FUND)
@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+import pytest
+from allocation import ALLOCATION_RANKS, FRONTIER_SIZE, get_frontier, optimize_allocation
+from analytics import compute_PL_metrics
+from benchmarks.synthetic_log import get_trade_log_bytes
+from ingest import read_trade_log
+from risk_metrics import get_strategy_daily_PL
+
+STARTING_FUND = 50000
+
+
+@pytest.fixture(scope="module")
+def df_trades():
+    return read_trade_log(get_trade_log_bytes(2000, n_strategies=5, n_days=200, seed=6))
+
+
+# reference: the realized curve of the trades of each candidate on their own (weights scale the trade P/L)
+def get_scores_brute_force(df_trades, allocation):
+    rows = []
+    for weights in allocation["weights"]:
+        weight = pd.Series(weights, index=allocation["strategies"])
+        df = df_trades.assign(**{"P/L": df_trades["P/L"] * df_trades["Strategy"].astype(str).map(weight)})
+        df_PL = compute_PL_metrics(df[df["P/L"] != 0], STARTING_FUND)
+        rows.append((df_PL["cum_PL"].iloc[-1], df_PL["DD"].max()))
+    return pd.DataFrame(rows, columns=["P/L", "Max DD"])
+
+
+def get_frontier_brute_force(df_scores):  # candidates no other beats: lower (or same) DD and higher P/L
+    PL, DD = df_scores["P/L"].to_numpy(), df_scores["Max DD"].to_numpy()
+    frontier = []
+    for i in range(len(PL)):
+        beaten = (DD < DD[i]) & (PL >= PL[i]) | (DD == DD[i]) & (PL > PL[i])
+        same_before = (DD == DD[i]) & (PL == PL[i]) & (np.arange(len(PL)) < i)  # duplicates: first one listed
+        if not (beaten | same_before).any():
+            frontier.append(i)
+    return frontier
+
+
+@pytest.mark.parametrize("mode", ["subsets", "weights"])
+def test_scores_same_as_realized_curve(df_trades, mode):
+    allocation = optimize_allocation(get_strategy_daily_PL(df_trades), STARTING_FUND, mode, n_candidates=200)
+    expected = get_scores_brute_force(df_trades, allocation)
+    if mode == "subsets":  # 5 strategies: all 31 subsets
+        assert len(allocation["weights"]) == 31 and len(np.unique(allocation["weights"], axis=0)) == 31
+    for column in ["P/L", "Max DD"]:
+        np.testing.assert_allclose(allocation["scores"][column], expected[column], atol=1e-6, err_msg=column)
+    np.testing.assert_array_equal(allocation["weights"][0], 1)  # the current selection is candidate 0
+
+
+@pytest.mark.parametrize("rank_by", list(ALLOCATION_RANKS))
+def test_frontier_same_as_pairwise(df_trades, rank_by):
+    allocation = optimize_allocation(get_strategy_daily_PL(df_trades), STARTING_FUND, "weights", 600, rank_by, seed=2)
+    df_scores = allocation["scores"]
+    df_frontier = get_frontier(df_scores, allocation["weights"], allocation["strategies"], rank_by)
+    frontier = get_frontier_brute_force(df_scores)
+    ranks = df_scores.loc[frontier, ALLOCATION_RANKS[rank_by]].fillna(-np.inf)
+    ranks = ranks.sort_values(ascending=False, kind="stable")
+    assert set(df_frontier.index) <= set(frontier) and len(df_frontier.index) == min(len(frontier), FRONTIER_SIZE)
+    np.testing.assert_array_equal(df_frontier[ALLOCATION_RANKS[rank_by]].fillna(-np.inf), ranks.iloc[:FRONTIER_SIZE])
@@ -0,0 +1,48 @@
+import numpy as np
+import pandas as pd
+import pytest
+from analytics import compute_PL_metrics, update_PL_metrics
+from benchmarks.synthetic_log import get_trade_log_bytes
+from ingest import append_trade_log, get_trade_keys, read_trade_log
+from trade_schema import PL_COLUMNS
+
+STARTING_FUND = 50000
+
+
+@pytest.fixture(scope="module")
+def df_trades():  # one export of every trade (repeated trades dropped: an export lists a trade once)
+    df = read_trade_log(get_trade_log_bytes(3000, n_strategies=5, n_days=150, seed=5))
+    return df[~pd.Series(get_trade_keys(df)).duplicated().to_numpy()].reset_index(drop=True)
+
+
+def get_exports(df_trades, *cuts):  # exports of consecutive open date ranges, split at these fractions of the dates
+    dates = np.sort(df_trades["Date Opened"].unique())
+    edges = [dates[0], *(dates[int(cut * (len(dates) - 1))] for cut in cuts)]
+    opened = df_trades["Date Opened"]
+    exports = [df_trades[(opened >= start) & (opened < end)] for start, end in zip(edges[:-1], edges[1:])]
+    return [export.reset_index(drop=True) for export in [*exports, df_trades[opened >= edges[-1]]]]
+
+
+def get_rows(dataframe):
+    df = dataframe[PL_COLUMNS].astype({"Strategy": str})
+    return df.sort_values(PL_COLUMNS, kind="stable").reset_index(drop=True)
+
+
+def test_appends_same_as_full_recompute(df_trades):  # reference: load the whole history and compute it again
+    first, *newer = get_exports(df_trades, 0.4, 0.7)
+    df, df_PL, trade_keys = first, compute_PL_metrics(first, STARTING_FUND), None
+    for export in newer:
+        export = pd.concat([df.tail(50), export], ignore_index=True)  # the newer export repeats recent trades
+        df, new_trades, trade_keys = append_trade_log(df, export, trade_keys)
+        df_PL = update_PL_metrics(df_PL, new_trades, STARTING_FUND)
+        np.testing.assert_array_equal(trade_keys, np.sort(get_trade_keys(df)))
+    pd.testing.assert_frame_equal(get_rows(df), get_rows(df_trades))
+    expected = compute_PL_metrics(df_trades, STARTING_FUND)
+    pd.testing.assert_frame_equal(df_PL, expected, check_dtype=False, check_exact=False, rtol=1e-12, atol=1e-6)
+    np.testing.assert_array_equal(df_PL["DD_duration"], expected["DD_duration"])
+
+
+def test_append_nothing_new(df_trades):
+    df, new_trades, trade_keys = append_trade_log(df_trades, df_trades.tail(20))
+    assert df is df_trades and new_trades.empty
+    np.testing.assert_array_equal(trade_keys, np.sort(get_trade_keys(df_trades)))
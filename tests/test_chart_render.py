@@ -0,0 +1,50 @@
+import numpy as np
+import plotly.graph_objects as go
+import pytest
+from chart_render import WEBGL_POINT_THRESHOLD, downsample_min_max, downsample_series, get_scatter_class
+
+
+# reference: one bucket at a time, lowest and highest point of each (first occurrence), plus both ends
+def downsample_loop(y, max_points):
+    n_buckets = max(max_points // 2, 1)
+    bucket_size = -(-len(y) // n_buckets)
+    keep = {0, len(y) - 1}
+    for start in range(0, len(y), bucket_size):
+        bucket = y[start : start + bucket_size]
+        keep.update((start + int(np.argmin(bucket)), start + int(np.argmax(bucket))))
+    return np.array(sorted(keep))
+
+
+def get_max_DD(y):
+    return np.max(np.maximum.accumulate(y) - y)
+
+
+@pytest.mark.parametrize("n, max_points", [(10_000, 2000), (12_345, 2000), (2001, 2000), (50_000, 300), (7, 2)])
+def test_downsample_same_as_loop(n, max_points):
+    y = np.cumsum(np.random.default_rng(n).normal(0, 100, n))  # equity curve
+    keep = downsample_min_max(y, max_points)
+    np.testing.assert_array_equal(keep, downsample_loop(y, max_points))
+    assert keep[0] == 0 and keep[-1] == n - 1 and len(keep) <= max_points + 2
+    assert y[keep].min() == y.min() and y[keep].max() == y.max()
+    assert get_max_DD(y[keep]) == get_max_DD(y)  # peak and trough of the max drawdown are both kept
+
+
+def test_short_series_kept_whole():
+    x, y = np.arange(100), np.arange(100.0)
+    np.testing.assert_array_equal(downsample_min_max(y, 100), np.arange(100))
+    for result, expected in zip(downsample_series(x, y, max_points=50, render_mode="full"), (x, y)):
+        np.testing.assert_array_equal(result, expected)
+
+
+def test_downsample_series_endpoints():
+    x = np.arange(5000)
+    y = np.sin(x / 50.0)
+    x_plot, y_plot = downsample_series(x, y, max_points=200)
+    assert (x_plot[0], x_plot[-1]) == (0, 4999) and len(x_plot) <= 202
+    np.testing.assert_array_equal(y_plot, y[x_plot])
+
+
+def test_scatter_class():
+    assert get_scatter_class(WEBGL_POINT_THRESHOLD + 1) is go.Scattergl
+    assert get_scatter_class(WEBGL_POINT_THRESHOLD) is go.Scatter
+    assert get_scatter_class(WEBGL_POINT_THRESHOLD + 1, render_mode="full") is go.Scatter
@@ -0,0 +1,83 @@
+import gc
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+import ingest
+from analytics import compact_trade_log
+from ingest import clear_trade_log_cache, get_shared_datasets, load_cached, read_trade_log, share_dataset
+from trade_schema import DATE_COLUMNS, FLOAT32_COLUMNS, FLOAT32_MAX_VALUE
+
+DEMO_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "Demo_trade_log.csv")
+
+
+@pytest.fixture(scope="module")
+def file_bytes():
+    with open(DEMO_PATH, "rb") as file:
+        return file.read()
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest, "CACHE_DIR", str(tmp_path))
+    clear_trade_log_cache()
+    gc.collect()
+    yield tmp_path
+    clear_trade_log_cache()
+
+
+def get_values(values):  # plain python values, missing values as None
+    return values.astype(object).where(values.notna(), None).tolist()
+
+
+# reference: the frame read_csv returns (python strings, float64), which the app held before the compact schema
+def test_same_values_as_read_csv(file_bytes):
+    df_raw = pd.read_csv(DEMO_PATH)
+    df = read_trade_log(file_bytes)
+    assert list(df.columns) == list(df_raw.columns)
+    for col in df_raw.columns:
+        if col in DATE_COLUMNS:
+            pd.testing.assert_series_equal(df[col], pd.to_datetime(df_raw[col]), check_names=False)
+        elif col in FLOAT32_COLUMNS and df_raw[col].dtype == np.float64:
+            assert df[col].dtype == np.float32
+            np.testing.assert_array_equal(df[col].to_numpy(dtype=np.float64).round(2), df_raw[col], err_msg=col)
+        elif pd.api.types.is_numeric_dtype(df_raw[col]):  # P/L and integer columns are kept as is
+            assert df[col].dtype == df_raw[col].dtype
+            np.testing.assert_array_equal(df[col], df_raw[col], err_msg=col)
+        else:
+            assert get_values(df[col]) == get_values(df_raw[col]), col
+    assert isinstance(df["Strategy"].dtype, pd.CategoricalDtype)
+    assert df.memory_usage(deep=True).sum() < df_raw.memory_usage(deep=True).sum()
+
+
+def test_large_prices_stay_float64():  # float32 keeps 2 decimals only below FLOAT32_MAX_VALUE
+    df = compact_trade_log(pd.DataFrame({"Closing Price": [1.25, FLOAT32_MAX_VALUE * 2 + 0.01], "Gap": [1.25, -3.5]}))
+    assert df["Closing Price"].dtype == np.float64 and df["Gap"].dtype == np.float32
+
+
+def test_concat_drops_unused_categories():
+    df = compact_trade_log(pd.DataFrame({"Strategy": ["A", "B", "A"]}))
+    df = compact_trade_log(df[df["Strategy"] == "A"].copy())
+    assert list(df["Strategy"].cat.categories) == ["A"]
+
+
+def test_share_dataset_same_frame():
+    first, second = pd.DataFrame({"P/L": [1.0]}), pd.DataFrame({"P/L": [1.0]})
+    assert share_dataset("shared-test", first) is first
+    assert share_dataset("shared-test", second) is first  # another session loading the same data
+    assert get_shared_datasets()["shared-test"][0] is first
+    del first
+    gc.collect()  # no session holds it any more
+    assert "shared-test" not in get_shared_datasets()
+    assert share_dataset("shared-test", second) is second
+
+
+def test_shared_after_lru_eviction(cache_dir, monkeypatch):
+    monkeypatch.setattr(ingest, "MAX_MEMORY_CACHE_BYTES", 1)  # the LRU keeps only the last frame
+    calls = []
+    parse = lambda: calls.append(1) or pd.DataFrame({"P/L": [float(len(calls))]})
+    held = load_cached("first", "full", parse)  # held by a session
+    load_cached("second", "full", parse)
+    assert list(ingest._frame_cache) == ["second-full"]
+    assert load_cached("first", "full", parse) is held and len(calls) == 2
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+import pytest
+import correlation
+from benchmarks.synthetic_log import get_trade_log_bytes
+from correlation import build_strategy_correlation, get_strategy_correlation
+from ingest import read_trade_log
+from risk_metrics import get_strategy_daily_PL
+
+
+@pytest.fixture(scope="module")
+def strategy_daily_PL():
+    return get_strategy_daily_PL(read_trade_log(get_trade_log_bytes(3000, n_strategies=7, n_days=250, seed=5)))
+
+
+def get_daily_frame(strategy_daily_PL):  # days x strategies frame, 0 P/L on days a strategy did not trade
+    return pd.DataFrame(
+        strategy_daily_PL["PL"], index=strategy_daily_PL["dates"], columns=strategy_daily_PL["strategies"]
+    )
+
+
+# reference: pairwise merges of two daily P/L curves, one pair at a time
+def get_co_DD_pairwise(df_daily):
+    in_DD = df_daily.cumsum().cummax() - df_daily.cumsum() > 0
+    co_DD = pd.DataFrame(np.nan, index=df_daily.columns, columns=df_daily.columns)
+    for first in df_daily.columns:
+        for second in df_daily.columns:
+            either = (in_DD[first] | in_DD[second]).sum()
+            if either:
+                co_DD.loc[first, second] = (in_DD[first] & in_DD[second]).sum() / either * 100
+    return co_DD
+
+
+def test_same_as_dataframe_corr(strategy_daily_PL):
+    df_daily = get_daily_frame(strategy_daily_PL)
+    result = build_strategy_correlation(strategy_daily_PL)
+    np.testing.assert_allclose(result["correlation"], df_daily.corr().to_numpy(), atol=1e-12)
+    np.testing.assert_allclose(result["covariance"], df_daily.cov().to_numpy(), rtol=1e-10)
+    np.testing.assert_allclose(result["co_DD"], get_co_DD_pairwise(df_daily).to_numpy(), atol=1e-12)
+
+
+def test_top_pairs(strategy_daily_PL):
+    df_corr = get_daily_frame(strategy_daily_PL).corr()
+    pairs = build_strategy_correlation(strategy_daily_PL)["pairs"]
+    expected = df_corr.where(np.triu(np.ones(df_corr.shape, dtype=bool), k=1)).stack().sort_values(ascending=False)
+    assert len(pairs.index) == correlation.TOP_PAIRS
+    np.testing.assert_allclose(pairs["Correlation"], expected.iloc[: correlation.TOP_PAIRS].to_numpy(), atol=1e-12)
+    for row in pairs.itertuples(index=False):
+        assert df_corr.loc[row[0], row[1]] == pytest.approx(row[2])
+
+
+def test_constant_strategy_has_no_correlation():
+    PL = np.array([[100.0, 0.0, -20.0], [-50.0, 0.0, 30.0], [25.0, 0.0, 10.0], [-5.0, 0.0, -40.0]])
+    strategy_daily_PL = {"strategies": pd.Index(["A", "Flat", "B"]), "PL": PL}
+    result = build_strategy_correlation(strategy_daily_PL)
+    np.testing.assert_allclose(result["correlation"], pd.DataFrame(PL).corr().to_numpy(), atol=1e-12)
+    assert np.isnan(result["pairs"]["Correlation"].iloc[-1])  # pairs without correlation last
+
+
+def test_cache_lru(strategy_daily_PL, monkeypatch):
+    monkeypatch.setattr(correlation, "_correlation_cache", correlation.OrderedDict())
+    monkeypatch.setattr(correlation, "MAX_CACHED_CORRELATIONS", 2)
+    first = get_strategy_correlation(strategy_daily_PL, "a")
+    assert get_strategy_correlation(None, "a") is first  # hit: the matrix is not read
+    get_strategy_correlation(strategy_daily_PL, "b")
+    get_strategy_correlation(None, "a")
+    get_strategy_correlation(strategy_daily_PL, "c")
+    assert list(correlation._correlation_cache) == ["a", "c"]
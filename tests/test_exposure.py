@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+from benchmarks.synthetic_log import get_trade_log_bytes
+from exposure import EXPOSURE_COLUMNS, MISSING_CLOSE_TIME, build_exposure, get_exposure_series
+from ingest import read_trade_log
+from risk_metrics import PORTFOLIO_NAME
+
+# same day, overnight, several days, closed at its open, closed before its open (bad row), no close time, still open
+TRADES = pd.DataFrame(
+    [
+        ("A", "2024-03-04", "9:32:00", "2024-03-04", "16:00:00", -2.5, 1),
+        ("A", "2024-03-04", "10:30:00", "2024-03-04", "15:30:00", 4.0, 2),
+        ("B", "2024-03-04", "15:45:00", "2024-03-05", "13:00:00", 1.5, 3),
+        ("B", "2024-03-05", "9:45:00", "2024-03-08", "16:00:00", -3.0, 1),
+        ("A", "2024-03-05", "12:00:00", "2024-03-05", "12:00:00", 2.0, 5),
+        ("C", "2024-03-05", "15:00:00", "2024-03-05", "13:00:00", 6.0, 1),
+        ("C", "2024-03-06", "11:15:00", "2024-03-06", None, 1.0, 1),
+        ("B", "2024-03-07", "13:30:00", None, None, 2.5, 2),
+    ],
+    columns=EXPOSURE_COLUMNS,
+)
+TRADES["Date Opened"] = pd.to_datetime(TRADES["Date Opened"])
+TRADES["Date Closed"] = pd.to_datetime(TRADES["Date Closed"])
+
+
+# reference: at every event time, count the trades open at that time (open <= time < close), one trade at a time
+def get_exposure_brute_force(dataframe, times):
+    open_time = pd.to_datetime(dataframe["Date Opened"]) + pd.to_timedelta(dataframe["Time Opened"].astype(str))
+    close_time = pd.to_datetime(dataframe["Date Closed"]) + pd.to_timedelta(
+        dataframe["Time Closed"].astype(object).where(dataframe["Time Closed"].notna(), None)
+    ).fillna(MISSING_CLOSE_TIME)
+    close_time = close_time.fillna(max(open_time.max(), close_time.max()))  # still open: until the end of the data
+    capital = (dataframe["Initial Premium"].abs() * dataframe["No. of Contracts"]).to_numpy(dtype=np.float64)
+    positions, committed = [], []
+    for time in times:
+        is_open = [opened <= time < max(closed, opened) for opened, closed in zip(open_time, close_time)]
+        positions.append(sum(is_open))
+        committed.append(capital[np.array(is_open, dtype=bool)].sum())
+    return np.array(positions), np.array(committed)
+
+
+def assert_sweep_matches(dataframe):
+    exposure = build_exposure(dataframe)
+    for series in [PORTFOLIO_NAME, *exposure["strategies"]]:
+        trades = dataframe if series == PORTFOLIO_NAME else dataframe[dataframe["Strategy"] == series]
+        events = get_exposure_series(exposure, series)
+        positions, capital = get_exposure_brute_force(trades, events["time"])
+        assert (events["positions"].to_numpy() >= 0).all() and (events["capital"].to_numpy() >= 0).all()
+        np.testing.assert_array_equal(events["positions"].to_numpy(), positions, err_msg=series)
+        np.testing.assert_allclose(events["capital"].to_numpy(), capital, atol=1e-6, err_msg=series)
+
+
+def test_sweep_handmade_trades():
+    assert_sweep_matches(TRADES)
+
+
+@pytest.mark.parametrize("seed", [0, 1])
+def test_sweep_synthetic_log(seed):
+    assert_sweep_matches(read_trade_log(get_trade_log_bytes(600, n_strategies=4, n_days=60, seed=seed)))
+
+
+def test_close_before_open_is_never_open():
+    exposure = build_exposure(TRADES[TRADES["Strategy"] == "C"].iloc[:1])
+    assert exposure["peaks"].loc[PORTFOLIO_NAME, "Peak positions"] == 0
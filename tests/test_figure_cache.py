@@ -0,0 +1,64 @@
+import pandas as pd
+import pytest
+import figure_cache
+from figure_cache import clear_figure_cache, get_cached_figure, get_figure_cache_stats
+from figures import get_PL_per_strategy_figure
+
+STRAT_PL = pd.DataFrame({"Strategy": ["A", "B", "C"], "P/L": [120.0, -40.0, 15.5]})
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    monkeypatch.setattr(figure_cache, "_figure_cache", figure_cache.OrderedDict())
+    clear_figure_cache()
+
+
+def get_counted_build():  # build function returning a new figure, and the list of its calls
+    calls = []
+    return (lambda: calls.append(1) or get_PL_per_strategy_figure(STRAT_PL)), calls
+
+
+# reference: the figure built on every rerun before the cache
+def test_cached_figure_same_as_build():
+    fig = get_cached_figure("PL_per_strategy", ("dataset", "filters"), lambda: get_PL_per_strategy_figure(STRAT_PL))
+    assert fig.to_json() == get_PL_per_strategy_figure(STRAT_PL).to_json()
+
+
+def test_hit_skips_build():
+    build, calls = get_counted_build()
+    first = get_cached_figure("PL_per_strategy", "key", build)
+    assert get_cached_figure("PL_per_strategy", "key", build) is first and len(calls) == 1
+    get_cached_figure("open_date", "key", build)  # other figure, same inputs
+    get_cached_figure("PL_per_strategy", "other key", build)
+    assert len(calls) == 3 and get_figure_cache_stats() == {"hits": 1, "misses": 3, "figures": 3}
+
+
+def test_no_key_always_builds():
+    build, calls = get_counted_build()
+    assert get_cached_figure("PL_per_strategy", None, build) is not get_cached_figure("PL_per_strategy", None, build)
+    assert len(calls) == 2 and get_figure_cache_stats()["figures"] == 0
+
+
+def test_lru_eviction(monkeypatch):
+    monkeypatch.setattr(figure_cache, "MAX_CACHED_FIGURES", 2)
+    build, calls = get_counted_build()
+    for key in ["a", "b", "a", "c"]:  # a used again: b is the least recently used
+        get_cached_figure("PL_per_strategy", key, build)
+    assert list(figure_cache._figure_cache) == [("PL_per_strategy", "a"), ("PL_per_strategy", "c")]
+    get_cached_figure("PL_per_strategy", "b", build)
+    assert len(calls) == 4
+
+
+def test_app_figures_built_once():  # every chart of the demo (Monte Carlo and heatmap included) is built once
+    from streamlit.testing.v1 import AppTest
+    from test_memo import MAIN_PATH
+
+    at = AppTest.from_file(MAIN_PATH, default_timeout=120)
+    at.session_state["monte_carlo_settings_port"] = (500, "block_bootstrap", 5, 1)
+    at.run()
+    at.radio(key="key_radio_index").set_value(1).run()
+    names = {name for name, _ in figure_cache._figure_cache}
+    assert {"monte_carlo", "correlation_correlation", "PL_DD"} <= names and not at.exception
+    misses = get_figure_cache_stats()["misses"]
+    at.run()
+    assert get_figure_cache_stats()["misses"] == misses
@@ -0,0 +1,76 @@
+import gc
+import os
+
+import pandas as pd
+import pytest
+import ingest
+from ingest import clear_trade_log_cache, load_cached, load_trade_log, read_trade_log
+
+DEMO_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "Demo_trade_log.csv")
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):  # empty memory and disk cache in a temporary folder
+    monkeypatch.setattr(ingest, "CACHE_DIR", str(tmp_path))
+    clear_trade_log_cache()
+    gc.collect()  # frames of earlier tests leave the shared datasets
+    yield tmp_path
+    clear_trade_log_cache()
+
+
+def get_counted_parse():  # parse function returning a new frame, and the list of its calls
+    calls = []
+    return (lambda: calls.append(1) or pd.DataFrame({"P/L": [1.0, 2.0]})), calls
+
+
+def test_cached_load_same_as_parse():  # reference: the uncached read every rerun did before the cache
+    with open(DEMO_PATH, "rb") as file:
+        file_bytes = file.read()
+    df, file_hash = load_trade_log(file_bytes)
+    pd.testing.assert_frame_equal(df, read_trade_log(file_bytes))
+    assert load_trade_log(file_bytes)[0] is df and file_hash == ingest.get_file_hash(file_bytes)
+
+
+def test_memory_hit_skips_parse():
+    parse, calls = get_counted_parse()
+    first = load_cached("hash", "full", parse)
+    assert load_cached("hash", "full", parse) is first and len(calls) == 1
+    load_cached("hash", "stream", parse)  # other mode: other entry
+    assert len(calls) == 2
+
+
+def test_lru_eviction(monkeypatch):
+    frames = {name: pd.DataFrame({"P/L": [float(i)] * 1000}) for i, name in enumerate("abc")}
+    monkeypatch.setattr(ingest, "MAX_MEMORY_CACHE_BYTES", 2 * int(frames["a"].memory_usage(deep=True).sum()))
+    ingest._put_cached_frame("a", frames["a"])
+    ingest._put_cached_frame("b", frames["b"])
+    assert ingest._get_cached_frame("a") is frames["a"]  # a is now the most recently used
+    ingest._put_cached_frame("c", frames["c"])
+    assert list(ingest._frame_cache) == ["a", "c"]  # b (least recently used) evicted
+    monkeypatch.setattr(ingest, "MAX_MEMORY_CACHE_BYTES", 1)
+    ingest._put_cached_frame("b", frames["b"])
+    assert list(ingest._frame_cache) == ["b"]  # over the cap: the frame just added is kept anyway
+
+
+def test_disk_cache_survives_memory_clear(cache_dir):
+    parse, calls = get_counted_parse()
+    expected = load_cached("hash", "full", parse).copy()
+    clear_trade_log_cache()
+    gc.collect()  # no session holds the frame any more
+    pd.testing.assert_frame_equal(load_cached("hash", "full", parse), expected)
+    assert len(calls) == 1 and os.listdir(cache_dir) == [f"hash-full.v{ingest.CACHE_VERSION}.pkl"]
+
+
+@pytest.mark.parametrize("change", ["version", "corrupt", "cleared"])
+def test_disk_entry_invalidated(cache_dir, monkeypatch, change):
+    parse, calls = get_counted_parse()
+    load_cached("hash", "full", parse)
+    clear_trade_log_cache(disk=change == "cleared")
+    gc.collect()
+    if change == "version":  # data_prep output changed: old entries are ignored
+        monkeypatch.setattr(ingest, "CACHE_VERSION", ingest.CACHE_VERSION + 1)
+    elif change == "corrupt":
+        with open(os.path.join(cache_dir, f"hash-full.v{ingest.CACHE_VERSION}.pkl"), "wb") as file:
+            file.write(b"not a pickle")
+    load_cached("hash", "full", parse)
+    assert len(calls) == 2
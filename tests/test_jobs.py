@@ -0,0 +1,113 @@
+import threading
+
+import pytest
+import jobs
+from jobs import JobCancelled, get_job_stats, release_job, submit_job, unwatch_job, watch_job
+
+TIMEOUT = 10
+
+
+@pytest.fixture(autouse=True)
+def job_state(monkeypatch):  # no jobs or watchers of other tests, a pool of its own
+    monkeypatch.setattr(jobs, "_jobs", jobs.OrderedDict())
+    monkeypatch.setattr(jobs, "_watchers", {})
+    monkeypatch.setattr(jobs, "_job_pool", None)
+    yield
+    for job in list(jobs._jobs.values()):  # jobs of a failed test stop at their next report
+        jobs.cancel_job(job)
+    if jobs._job_pool is not None:
+        jobs._job_pool.shutdown(wait=True, cancel_futures=True)
+
+
+def get_blocking_func(calls):  # job that reports progress until released (or cancelled)
+    release = threading.Event()
+
+    def func(report):
+        calls.append(1)
+        while not release.wait(0.01):
+            report(0.5, "waiting")
+        return len(calls)
+
+    return func, release
+
+
+def test_same_key_runs_once():  # reference: every session computed the result itself
+    calls = []
+    func, release = get_blocking_func(calls)
+    first = watch_job("session 1", "slot", "key", func)
+    assert watch_job("session 2", "slot", "key", func) is first and submit_job("key", func) is first
+    release.set()
+    assert first.wait(TIMEOUT) and first.result() == 1 and len(calls) == 1
+    assert submit_job("key", func) is first  # finished jobs are kept for later sessions
+
+
+def test_shared_job_runs_while_watched():
+    func, release = get_blocking_func([])
+    job = watch_job("session 1", "slot", "key", func)
+    watch_job("session 2", "slot", "key", func)
+    watch_job("session 1", "slot", "other key", lambda report: None)  # session 1 changed its inputs
+    assert not job.cancelled()
+    release.set()
+    assert job.wait(TIMEOUT) and job.result() == 1
+
+
+def test_unwatched_running_job_cancelled():
+    func, release = get_blocking_func([])
+    job = watch_job("session 1", "slot", "key", func)
+    while job.started is None:
+        job.wait(0.01)
+    watch_job("session 1", "slot", "other key", lambda report: None)
+    assert job.cancelled() and job.wait(TIMEOUT) and job.failed()
+    with pytest.raises(JobCancelled):
+        job.result()
+    release.set()
+    assert submit_job("key", func) is not job  # a cancelled job is not reused
+
+
+def test_queued_job_cancelled_before_start(monkeypatch):
+    monkeypatch.setattr(jobs, "JOB_WORKERS", 1)
+    func, release = get_blocking_func([])
+    busy = submit_job("busy", func)  # holds the only worker
+    calls = []
+    queued = watch_job("session 1", "slot", "queued", lambda report: calls.append(1))
+    unwatch_job("session 1", "slot")
+    release_job("queued")
+    release.set()
+    assert busy.wait(TIMEOUT) and queued.wait(TIMEOUT) and queued.failed() and calls == []
+    assert get_job_stats() == {"queued": 0, "running": 0, "finished": 1}  # the cancelled job is dropped
+
+
+def test_failed_job_runs_again():
+    calls = []
+
+    def func(report):
+        calls.append(1)
+        if len(calls) == 1:
+            raise ValueError("first run fails")
+        return "ok"
+
+    job = submit_job("key", func)
+    assert job.wait(TIMEOUT) and job.failed()
+    assert submit_job("key", func).wait(TIMEOUT) and submit_job("key", func).result() == "ok" and len(calls) == 2
+
+
+def test_finished_jobs_pruned(monkeypatch):
+    monkeypatch.setattr(jobs, "MAX_FINISHED_JOBS", 2)
+    for key in ["a", "b", "c"]:
+        assert submit_job(key, lambda report: None).wait(TIMEOUT)
+    submit_job("d", lambda report: None).wait(TIMEOUT)
+    assert list(jobs._jobs) == ["b", "c", "d"]  # pruned when a job is submitted: a dropped, d not counted yet
+
+
+def test_closed_session_released():  # a closed session never unwatches: its slots must not keep jobs alive
+    func, release = get_blocking_func([])
+    open_sessions = {"session 1", "session 2"}
+    is_active = open_sessions.__contains__
+    job = watch_job("session 1", "slot", "key", func, is_active)
+    watch_job("session 2", "slot", "key", func, is_active)
+    watch_job("session 2", "other slot", "other key", func, is_active)
+    open_sessions.discard("session 2")  # browser tab closed
+    unwatch_job("session 1", "slot")  # session 1 cancels (Cancel button): nobody else waits any more
+    release_job("key", is_active)
+    assert job.cancelled() and jobs._watchers == {}
+    assert "other key" not in jobs._jobs  # the other job of the closed session is released too
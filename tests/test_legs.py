@@ -0,0 +1,89 @@
+import datetime
+import os
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+from benchmarks.synthetic_log import get_trade_log_bytes
+from ingest import read_trade_log
+from legs import build_leg_table, get_trade_structure
+
+DEMO_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "Demo_trade_log.csv")
+LEG_REGEX = re.compile(r"^(\d+) ([A-Z][a-z]{2}) (\d{1,2}) (\d+(?:\.\d+)?) ([PC]) ([BS]T[OC]) (\d+(?:\.\d+)?)$")
+
+
+# reference: a regex with capture groups per leg string, one trade at a time
+def build_leg_table_loop(dataframe):
+    rows = []
+    for trade, legs_text, opened in zip(dataframe.index, dataframe["Legs"], pd.to_datetime(dataframe["Date Opened"])):
+        if not isinstance(legs_text, str):
+            continue
+        for leg, text in enumerate(legs_text.split(" | ")):
+            match = LEG_REGEX.match(text)
+            if match is None:  # not a leg: skipped, the position of the next legs is kept
+                continue
+            contracts, month, day, strike, put_call, side, price = match.groups()
+            expiry = datetime.datetime.strptime(f"{month} {day} {opened.year}", "%b %d %Y")
+            if expiry < opened:  # no year in the leg: the next one after the open date
+                expiry = expiry.replace(year=opened.year + 1)
+            rows.append((trade, leg, int(contracts), expiry, float(strike), put_call, side, float(price)))
+    columns = ["trade", "leg", "contracts", "expiry", "strike", "put_call", "side", "price"]
+    return pd.DataFrame(rows, columns=columns).set_index("trade")
+
+
+def assert_same_legs(dataframe):
+    legs = build_leg_table(dataframe)
+    expected = build_leg_table_loop(dataframe)
+    assert len(legs.index) == len(expected.index) > 0
+    pd.testing.assert_frame_equal(
+        legs.astype({"put_call": str, "side": str}), expected, check_dtype=False, check_index_type=False
+    )
+
+
+def test_demo_legs():
+    with open(DEMO_PATH, "rb") as file:
+        assert_same_legs(read_trade_log(file.read()))
+
+
+def test_synthetic_legs():
+    assert_same_legs(read_trade_log(get_trade_log_bytes(2000, n_strategies=6, n_days=120, seed=8)))
+
+
+def test_unusual_legs():  # year roll over, bad and missing legs, decimal strikes, non default index
+    dataframe = pd.DataFrame(
+        {
+            "Date Opened": pd.to_datetime(["2024-12-30", "2024-03-01", "2024-03-01", "2024-02-28"]),
+            "Legs": [
+                "2 Jan 3 4800 P STO 1.5 | 2 Jan 3 4750 P BTO 0.75",
+                "garbage | 1 Mar 1 450.5 C BTO 12 | 1 Mar 1 455 C STC 9.25",
+                None,
+                "1 Feb 29 5000 P BTO 20",
+            ],
+        },
+        index=[10, 11, 12, 13],
+    )
+    assert_same_legs(dataframe)
+    legs = build_leg_table(dataframe)
+    assert list(legs.loc[10, "expiry"]) == [pd.Timestamp("2025-01-03")] * 2
+    assert list(legs.loc[11, "leg"]) == [1, 2]
+
+
+def test_spread_types():
+    dataframe = pd.DataFrame(
+        {
+            "Strategy": "S",
+            "Date Opened": pd.Timestamp("2024-03-04"),
+            "P/L": [100.0, -50.0, 20.0],
+            "Opening Price": 5000.0,
+            "Legs": [
+                "1 Mar 4 5010 C BTO 4 | 1 Mar 4 4990 P BTO 3 | 1 Mar 4 5020 C STO 2 | 1 Mar 4 4980 P STO 1.5",
+                "1 Mar 4 4950 P BTO 2 | 1 Mar 4 4960 P STO 3",
+                "1 Mar 4 5000 P BTO 10",
+            ],
+        }
+    )
+    df_structure = get_trade_structure(build_leg_table(dataframe), dataframe)
+    assert list(df_structure["spread_type"].astype(str)) == ["Debit Iron Condor", "Put Credit Spread", "Long Put"]
+    np.testing.assert_array_equal(df_structure["strike_width"], [10.0, 10.0, 0.0])
+    np.testing.assert_array_equal(df_structure["DTE"], [0, 0, 0])
@@ -0,0 +1,44 @@
+import os
+
+import pytest
+import utility
+from streamlit.testing.v1 import AppTest
+from utility import get_memoized
+
+MAIN_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "main.py")
+
+
+def test_memo_recomputes_on_key_change(monkeypatch):
+    monkeypatch.setattr(utility.st, "session_state", {})
+    calls = []
+    compute = lambda: calls.append(1) or object()
+    first = get_memoized("tab", ("dataset", 1), compute)
+    assert get_memoized("tab", ("dataset", 1), compute) is first and len(calls) == 1
+    assert get_memoized("other", ("dataset", 1), compute) is not first and len(calls) == 2  # one memo per name
+    assert get_memoized("tab", ("dataset", 2), compute) is not first and len(calls) == 3
+    assert get_memoized("tab", ("dataset", 1), compute) is not first and len(calls) == 4  # only the last key is kept
+
+
+@pytest.fixture(scope="module")
+def app():  # demo data loaded, every tab run once
+    at = AppTest.from_file(MAIN_PATH, default_timeout=120)
+    at.run()
+    at.radio(key="key_radio_index").set_value(1).run()
+    assert not at.exception
+    return at
+
+
+def get_memos(at):
+    return {key: at.session_state[key] for key in at.session_state if key.startswith("memo_")}
+
+
+# reference: before the fragments every tab recomputed on any widget change. Now only memos of the changed inputs do
+def test_other_tabs_reuse_results(app):
+    before = get_memos(app)
+    assert {"memo_port_daily_PL", "memo_port_PL", "memo_strat_tables", "memo_summary_rolling"} <= set(before)
+    app.number_input(key="starting_fund_input_port_fund").set_value(80000).run()
+    after = get_memos(app)
+    assert not app.exception
+    changed = {key for key in before if after[key] is not before[key]}
+    assert changed == {"memo_port_PL"}  # the filter did not change: same daily P/L, only the fund dependent metrics
+    assert after["memo_port_PL"][1]["Fund"].iloc[0] - before["memo_port_PL"][1]["Fund"].iloc[0] == 30000
@@ -0,0 +1,68 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+from analytics import apply_trade_filter, get_daily_PL, get_PL_per_strategy
+from benchmarks.synthetic_log import get_trade_log_bytes
+from ingest import read_trade_log
+from pl_cube import build_PL_cube, get_cube_daily_PL, get_cube_open_dates, get_cube_strategy_daily_PL
+from pl_cube import get_cube_strategy_PL
+from trade_schema import ACCOUNT_COLUMN
+
+
+@pytest.fixture(scope="module", params=[False, True], ids=["one account", "two accounts"])
+def df_trades(request):  # same day and overnight trades (held up to 7 days)
+    df = read_trade_log(get_trade_log_bytes(3000, n_strategies=6, n_days=150, seed=6))
+    if request.param:
+        df[ACCOUNT_COLUMN] = np.where(np.arange(len(df.index)) % 3, "IRA", "Taxable")
+    return df
+
+
+FILTERS = [
+    (None, None, None),
+    ([1, 4], (datetime.date(2022, 2, 1), datetime.date(2022, 4, 15)), None),
+    ([0, 2, 3, 5], (datetime.date(2022, 1, 3), datetime.date(2022, 1, 3)), ["Taxable"]),
+    ([5], (datetime.date(2022, 6, 1), datetime.date(2022, 7, 1)), ["IRA", "missing"]),
+]
+
+
+def get_filter(df_trades, strategies, dates, accounts):  # strategy positions -> names, None -> everything
+    strategy_list = list(df_trades["Strategy"].unique())
+    if strategies is not None:
+        strategy_list = [strategy_list[i] for i in strategies] + ["missing"]
+    dates = dates or (df_trades["Date Opened"].min().date(), df_trades["Date Opened"].max().date())
+    return strategy_list, dates, accounts
+
+
+@pytest.mark.parametrize("selection", FILTERS)
+def test_cube_same_as_groupby(df_trades, selection):  # reference: filter the trades, then group them
+    strategy_list, dates, accounts = get_filter(df_trades, *selection)
+    cube = build_PL_cube(df_trades)
+    df_filtered = apply_trade_filter(df_trades, strategy_list, dates, accounts)
+
+    pd.testing.assert_frame_equal(
+        get_cube_daily_PL(cube, strategy_list, dates, accounts),
+        get_daily_PL(df_filtered),
+        check_dtype=False,
+        check_exact=False,
+        rtol=1e-12,
+    )
+
+    expected = get_PL_per_strategy(df_filtered).astype({"Strategy": str})
+    df_strat_PL = get_cube_strategy_PL(cube, strategy_list, dates, accounts).astype({"Strategy": str})
+    pd.testing.assert_frame_equal(df_strat_PL, expected, check_dtype=False, check_exact=False, rtol=1e-12)
+
+    strategy_daily = get_cube_strategy_daily_PL(cube, strategy_list, dates, accounts)
+    grouped = df_filtered.groupby(["Date Closed", "Strategy"], observed=True)["P/L"]
+    expected_PL = grouped.sum().unstack(fill_value=0).sort_index(axis=1)
+    assert list(strategy_daily["strategies"]) == list(expected_PL.columns)
+    assert list(strategy_daily["dates"]) == list(expected_PL.index)
+    np.testing.assert_allclose(strategy_daily["PL"], expected_PL.to_numpy(), rtol=1e-12, atol=1e-9)
+    np.testing.assert_array_equal(strategy_daily["count"], grouped.size().unstack(fill_value=0).sort_index(axis=1))
+
+    df_open = get_cube_open_dates(cube, strategy_list, dates, accounts)
+    expected_open = df_filtered[["Strategy", "Date Opened"]].drop_duplicates()
+    assert set(map(tuple, df_open.astype({"Strategy": str}).to_numpy())) == set(
+        map(tuple, expected_open.astype({"Strategy": str}).to_numpy())
+    )
@@ -0,0 +1,106 @@
+import os
+import subprocess
+import sys
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+import process_pools
+from process_pools import discard_process_pool, map_process_pool
+
+APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Child process set up like a streamlit script run: __main__ is the script module, with the file of main.py, and the
+# app folder is on sys.path only while the script runs (pools are started from job threads too).
+CHILD_PREAMBLE = """
+import sys, types
+app_dir, main_path = sys.argv[1], sys.argv[2]
+script_main = types.ModuleType("__main__")
+script_main.__file__ = main_path
+sys.modules["__main__"] = script_main
+sys.path.insert(0, app_dir)
+import ingest, monte_carlo
+sys.path.remove(app_dir)
+"""
+PARSE_CODE = """
+ingest.PARSE_WORKERS = 2
+data = open(main_path.replace("main.py", "data/Demo_trade_log.csv"), "rb").read()
+print([len(frame) for frame in ingest.parse_trade_logs([data, data, data])])
+"""
+SIM_CODE = """
+import numpy as np
+import pandas as pd
+monte_carlo.SIM_WORKERS = 2
+daily_PL, dates = np.random.default_rng(0).normal(10, 100, 250), pd.bdate_range("2024-01-01", periods=250)
+parallel = monte_carlo.run_monte_carlo(daily_PL, dates, n_paths=3000, parallel=True)
+serial = monte_carlo.run_monte_carlo(daily_PL, dates, n_paths=3000, parallel=False)
+print(parallel["stats"].equals(serial["stats"]) and np.array_equal(parallel["DD_bands"], serial["DD_bands"]))
+"""
+
+# a worker of the running pool dies between two runs (killed, out of memory): the next run gets a new pool
+SIM_KILLED_WORKER_CODE = """
+import os, signal
+import numpy as np
+import pandas as pd
+import process_pools
+monte_carlo.SIM_WORKERS = 2
+daily_PL, dates = np.random.default_rng(1).normal(10, 100, 250), pd.bdate_range("2024-01-01", periods=250)
+first = monte_carlo.run_monte_carlo(daily_PL, dates, n_paths=3000, parallel=True)
+pool = process_pools._pools["simulation"]
+os.kill(next(iter(pool._processes)), signal.SIGKILL)
+pool._executor_manager_thread.join(30)  # the pool notices the dead worker
+again = monte_carlo.run_monte_carlo(daily_PL, dates, n_paths=3000, parallel=True)
+print(process_pools._pools["simulation"] is not pool and again["stats"].equals(first["stats"]))
+"""
+
+
+def run_child(code, tmp_path):  # stdout of the child, which fails on any exception
+    completed = subprocess.run(
+        [sys.executable, "-c", CHILD_PREAMBLE + code, APP_DIR, os.path.join(APP_DIR, "main.py")],
+        cwd=tmp_path,
+        capture_output=True,
+        text=True,
+        timeout=300,
+    )
+    assert completed.returncode == 0, completed.stderr
+    return completed.stdout.strip().splitlines()[-1]
+
+
+def test_parse_pool_under_streamlit_main(tmp_path):
+    assert run_child(PARSE_CODE, tmp_path) == "[237, 237, 237]"
+
+
+def test_sim_pool_under_streamlit_main(tmp_path):  # same seed: same result with or without the pool
+    assert run_child(SIM_CODE, tmp_path) == "True"
+
+
+def test_sim_pool_replaced_after_worker_killed(tmp_path):
+    assert run_child(SIM_KILLED_WORKER_CODE, tmp_path) == "True"
+
+
+def exit_once(marker, value):  # kills its worker (pool broken) the first time any worker runs it, then returns value
+    if marker is not None and not os.path.exists(marker):
+        open(marker, "w").close()
+        os._exit(1)
+    return value
+
+
+@pytest.fixture
+def test_pool():  # name of a pool of this test, shut down afterwards
+    yield "test"
+    pool = process_pools._pools.get("test")
+    if pool is not None:
+        discard_process_pool("test", pool)
+
+
+def test_broken_pool_replaced(tmp_path, test_pool):  # reference: the same map without a worker dying
+    marker = str(tmp_path / "exited")
+    results = list(map_process_pool(test_pool, 2, "spawn", exit_once, [marker] * 6, range(6)))
+    assert results == list(map(exit_once, [None] * 6, range(6))) and os.path.exists(marker)
+    first_pool = process_pools._pools[test_pool]
+    assert list(map_process_pool(test_pool, 2, "spawn", exit_once, [marker] * 2, range(2))) == [0, 1]
+    assert process_pools._pools[test_pool] is first_pool  # a working pool is reused
+
+
+def test_broken_twice_raises(tmp_path, test_pool):
+    with pytest.raises(BrokenProcessPool):
+        list(map_process_pool(test_pool, 1, "spawn", os._exit, [1, 1]))  # every worker dies
+    assert test_pool not in process_pools._pools  # the next map starts a new pool
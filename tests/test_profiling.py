@@ -0,0 +1,99 @@
+import json
+import time
+import tracemalloc
+
+import numpy as np
+import pytest
+import profiling
+from profiling import finish_rerun, instrument_functions, profile_block, profiled, start_rerun
+
+
+@pytest.fixture
+def profile_mode(tmp_path, monkeypatch):  # switch profiling on (read once at start up otherwise), log in tmp_path
+    def set_mode(mode):
+        monkeypatch.setattr(profiling, "PROFILE_MODE", mode)
+        monkeypatch.setattr(profiling, "PROFILE_ENABLED", mode != "off")
+        monkeypatch.setattr(profiling, "PROFILE_LOG_PATH", str(tmp_path / "profile.jsonl"))
+        return tmp_path / "profile.jsonl"
+
+    yield set_mode
+    profiling._local.__dict__.clear()
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+
+
+def get_module(source):  # namespace of a small module, as instrument_functions(globals()) sees it
+    namespace = {"__name__": "sample"}
+    exec(source, namespace)
+    return namespace
+
+
+SAMPLE = """
+import time
+
+def outer(n):
+    return sum(inner(i) for i in range(n))
+
+def inner(i):
+    time.sleep(0.002)
+    return i * 2
+
+def fail():
+    raise KeyError("missing")
+"""
+
+
+def test_off_wraps_nothing(profile_mode):
+    profile_mode("off")
+    namespace = get_module(SAMPLE)
+    functions = {name: namespace[name] for name in ("outer", "inner", "fail")}
+    instrument_functions(namespace)
+    assert all(namespace[name] is func for name, func in functions.items())
+    assert profiled(len) is len and profile_block("tab") is profile_block("other")
+    assert start_rerun() is None and finish_rerun() is None
+
+
+def test_time_records_calls(profile_mode):
+    log_path = profile_mode("time")
+    namespace = get_module(SAMPLE)
+    instrument_functions(namespace)
+    start_rerun()
+    with profile_block("tab_summary"):
+        assert namespace["outer"](5) == 20  # same result as the plain functions
+    with pytest.raises(KeyError):
+        namespace["fail"]()
+    report = finish_rerun()
+
+    records = {record["name"]: record for record in report["records"]}
+    assert records["sample.outer"]["calls"] == 1 and records["sample.inner"]["calls"] == 5  # calls inside the module
+    assert records["sample.fail"]["calls"] == 1 and records["tab_summary"]["kind"] == "block"
+    assert records["sample.inner"]["seconds"] >= 0.01
+    assert records["rerun"]["seconds"] >= records["tab_summary"]["seconds"] >= records["sample.outer"]["seconds"]
+    lines = [json.loads(line) for line in log_path.read_text().splitlines()]
+    assert {line["name"] for line in lines} == set(records) and all(line["complete"] for line in lines)
+
+
+def test_interrupted_rerun_reported(profile_mode):
+    log_path = profile_mode("time")
+    start_rerun()
+    profile_block("tab_strategies").__enter__()  # st.stop: the block never exits
+    start_rerun()  # the next rerun reports the open one as incomplete
+    finish_rerun()
+    lines = [json.loads(line) for line in log_path.read_text().splitlines()]
+    assert [line["complete"] for line in lines if line["name"] == "rerun"] == [False, True]
+
+
+def test_fragment_block_is_its_own_rerun(profile_mode):
+    profile_mode("time")
+    with profile_block("tab_portfolio"):
+        time.sleep(0.001)
+    assert profiling._local.records == {}  # reported and cleared when the block exits
+
+
+def test_memory_peak(profile_mode):
+    profile_mode("memory")
+    allocate = profiled(lambda: np.ones(2_000_000).sum(), name="allocate")  # 16 MB
+    start_rerun()
+    allocate()
+    records = {record["name"]: record for record in finish_rerun()["records"]}
+    assert 15 < records["allocate"]["peak_MB"] < 20 and records["rerun"]["peak_MB"] >= records["allocate"]["peak_MB"]
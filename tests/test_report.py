@@ -0,0 +1,32 @@
+import os
+
+import pytest
+import ingest
+from benchmarks.synthetic_log import get_trade_log_bytes
+from report import get_report_names, run_reports
+
+
+def test_report_names_unique():  # same file name in different folders (or only differing in case): one folder each
+    paths = [os.path.join("a", "trades.csv"), os.path.join("b", "trades.csv"), os.path.join("c", "Trades.csv")]
+    names = get_report_names(paths + ["other.csv"])
+    assert len(set(name.lower() for name in names.values())) == 4
+    assert names["other.csv"] == "other"
+    assert all(names[path].startswith(os.path.splitext(os.path.basename(path))[0] + "_") for path in paths)
+    assert get_report_names(["other.csv"] + paths[::-1]) == names  # stable: does not depend on the order of the logs
+
+
+
+@pytest.mark.parametrize("use_cache", [True, False])
+def test_cache_outside_app_folder(tmp_path, monkeypatch, use_cache):  # the app's own cache folder is left alone
+    monkeypatch.setattr(ingest, "CACHE_DIR", str(tmp_path / "app_cache"))
+    log_path = tmp_path / "log.csv"  # content of its own: not already parsed by another test
+    log_path.write_bytes(get_trade_log_bytes(300, n_strategies=3, n_days=40, seed=8))
+    cache_dir = tmp_path / "report_cache"
+    output_dir = tmp_path / "out"
+    df_summary, failures = run_reports(
+        [str(log_path)], [1_234_567], str(output_dir), workers=1, cache_dir=str(cache_dir) if use_cache else None
+    )
+    assert failures == [] and len(df_summary.index) == 1
+    assert os.path.exists(output_dir / "log" / "charts_1234567.html")  # not charts_1.23457e+06.html
+    assert ingest.CACHE_DIR == str(tmp_path / "app_cache") and not (tmp_path / "app_cache").exists()
+    assert cache_dir.exists() == use_cache
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+from benchmarks.synthetic_log import get_trade_log_bytes
+from ingest import read_trade_log
+from risk_metrics import PORTFOLIO_NAME, TRADING_DAYS_PER_YEAR, get_rolling_metrics, get_strategy_daily_PL
+
+STARTING_FUND = 50000
+
+
+@pytest.fixture(scope="module")
+def df_trades():
+    return read_trade_log(get_trade_log_bytes(4000, n_strategies=5, n_days=300, seed=4))
+
+
+# reference: pandas rolling over a days x series frame (groupby pivot of the trades), one metric at a time
+def get_rolling_pandas(dataframe, window, starting_fund):
+    pivot = dataframe.pivot_table(index="Date Closed", columns="Strategy", values="P/L", aggfunc=["sum", "count"])
+    daily_PL = pivot["sum"].fillna(0.0)
+    traded = pivot["count"].fillna(0) > 0
+    daily_PL.insert(0, PORTFOLIO_NAME, daily_PL.sum(axis=1))
+    traded.insert(0, PORTFOLIO_NAME, traded.any(axis=1))
+    window = min(window, len(daily_PL.index))
+    rolling = daily_PL.rolling(window)
+    cum_PL = daily_PL.cumsum()
+    start_equity = starting_fund + cum_PL.shift(window, fill_value=0.0)
+    days = pd.Series(daily_PL.index, index=daily_PL.index)
+    years = ((days - days.shift(window - 1)).dt.days + 1) / 365.25
+    growth = (starting_fund + cum_PL) / start_equity
+    losses = -daily_PL.clip(upper=0).rolling(window).sum()
+    return {
+        "PL": rolling.sum(),
+        "sharpe": rolling.mean() / rolling.std() * np.sqrt(TRADING_DAYS_PER_YEAR),
+        "sortino": rolling.mean() / np.sqrt((daily_PL.clip(upper=0) ** 2).rolling(window).mean())
+        * np.sqrt(TRADING_DAYS_PER_YEAR),
+        "win_rate": ((daily_PL > 0) & traded).rolling(window).sum() / traded.rolling(window).sum() * 100,
+        "profit_factor": (daily_PL.clip(lower=0).rolling(window).sum() / losses).where(losses > 0),
+        "CAGR": ((growth ** (1 / years.to_numpy()[:, None]) - 1) * 100).where(years.notna()),
+        "worst_day": rolling.min(),
+        "DD": cum_PL.rolling(window).max() - cum_PL,
+    }
+
+
+@pytest.mark.parametrize("window", [1, 5, 21, 63, 1000])  # 1000: longer than the history, one window over all days
+def test_same_as_pandas_rolling(df_trades, window):
+    rolling = get_rolling_metrics(get_strategy_daily_PL(df_trades), window, STARTING_FUND)
+    expected = get_rolling_pandas(df_trades, window, STARTING_FUND)
+    assert list(rolling["series"]) == list(expected["PL"].columns)
+    assert rolling["window"] == min(window, len(rolling["dates"]))
+    for metric, df_expected in expected.items():
+        values = df_expected.to_numpy(dtype=np.float64)
+        if metric in ("sharpe", "sortino"):  # 0 std / downside: NaN here, inf or NaN in pandas
+            values = np.where(np.isfinite(values), values, np.nan)
+        np.testing.assert_allclose(rolling[metric], values, rtol=1e-7, atol=1e-6, err_msg=metric)
+
+
+def test_strategy_daily_PL_same_as_groupby(df_trades):
+    strategy_daily_PL = get_strategy_daily_PL(df_trades)
+    expected = df_trades.groupby(["Date Closed", "Strategy"], observed=True)["P/L"].agg(["sum", "count"])
+    expected = expected.unstack(fill_value=0)
+    assert list(strategy_daily_PL["dates"]) == list(expected.index)
+    assert list(strategy_daily_PL["strategies"]) == list(expected["sum"].columns)
+    np.testing.assert_allclose(strategy_daily_PL["PL"], expected["sum"].to_numpy(), atol=1e-9)
+    np.testing.assert_array_equal(strategy_daily_PL["count"], expected["count"].to_numpy())
+
+
+def test_without_starting_fund(df_trades):
+    rolling = get_rolling_metrics(get_strategy_daily_PL(df_trades), 21)
+    assert "CAGR" not in rolling and "CAGR" not in rolling["labels"]
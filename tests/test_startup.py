@@ -0,0 +1,23 @@
+import pytest
+from benchmarks.check_startup import check_startup
+from startup import DEFERRED_MODULES
+
+STARTUP_REPEAT = 3  # fresh interpreters, the best one counts (timings are noisy on shared machines)
+
+
+@pytest.fixture(scope="module")
+def startup():  # cold start of the app in fresh interpreters (see benchmarks/check_startup.py)
+    best, _ = check_startup(STARTUP_REPEAT)
+    return best
+
+
+def test_imports_within_budget(startup):  # TRADE_LOG_IMPORT_BUDGET raises the budget on slower machines
+    assert startup["seconds"] <= startup["budget"]
+
+
+def test_deferred_modules_not_imported(startup):  # sys.modules right after the imports of main.py
+    assert DEFERRED_MODULES and startup["deferred_loaded"] == []
+
+
+def test_first_run_without_errors(startup):
+    assert startup["exceptions"] == []
@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+from analytics import compute_PL_metrics, compute_strategy_PL_metrics, convert_strategy_daily_PL_long
+from analytics import add_strategy_PL_metrics, get_strategy_DD_summary
+from benchmarks.synthetic_log import get_trade_log_bytes
+from ingest import read_trade_log
+from risk_metrics import get_strategy_daily_PL
+
+STARTING_FUND = 50000
+COLUMNS = ["Daily_PL", "Daily_count", "cum_PL", "Fund", "DD", "DD_pct_startingfund", "DD_duration"]
+
+
+@pytest.fixture(scope="module")
+def df_trades():
+    return read_trade_log(get_trade_log_bytes(3000, n_strategies=6, n_days=300, seed=9))
+
+
+# reference: compute_PL_metrics of each strategy's trades on its own, one strategy at a time
+def get_per_strategy_brute_force(df_trades, starting_fund):
+    frames = []
+    for strategy in sorted(df_trades["Strategy"].astype(str).unique()):
+        df_PL = compute_PL_metrics(df_trades[df_trades["Strategy"] == strategy], starting_fund)
+        frames.append(df_PL.assign(Strategy=strategy))
+    return pd.concat(frames, ignore_index=True)
+
+
+def assert_same_as_brute_force(df_long, expected):
+    assert list(df_long["Strategy"].astype(str)) == list(expected["Strategy"])
+    pd.testing.assert_series_equal(df_long["Date Closed"], expected["Date Closed"], check_names=False)
+    for column in COLUMNS:
+        if column in expected.columns:
+            np.testing.assert_allclose(df_long[column], expected[column], atol=1e-6, err_msg=column)
+
+
+@pytest.mark.parametrize("starting_fund", [STARTING_FUND, None])
+def test_grouped_same_as_per_strategy(df_trades, starting_fund):
+    df_long = compute_strategy_PL_metrics(df_trades, starting_fund)
+    assert_same_as_brute_force(df_long, get_per_strategy_brute_force(df_trades, starting_fund))
+
+
+def test_from_daily_PL_matrix(df_trades):  # cube / library path: long form built from the [days x strategies] matrix
+    df_long = add_strategy_PL_metrics(convert_strategy_daily_PL_long(get_strategy_daily_PL(df_trades)), STARTING_FUND)
+    assert_same_as_brute_force(df_long, get_per_strategy_brute_force(df_trades, STARTING_FUND))
+
+
+def test_DD_summary(df_trades):
+    df_summary = get_strategy_DD_summary(compute_strategy_PL_metrics(df_trades, STARTING_FUND))
+    expected = get_per_strategy_brute_force(df_trades, STARTING_FUND).groupby("Strategy")
+    np.testing.assert_allclose(df_summary["Max DD"], expected["DD"].max(), atol=1e-6)
+    np.testing.assert_array_equal(df_summary["Max DD days"], expected["DD_duration"].max())
+    np.testing.assert_allclose(df_summary["P/L"], expected["Daily_PL"].sum(), atol=1e-6)
@@ -0,0 +1,48 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+from analytics import compute_PL_metrics
+from benchmarks.synthetic_log import get_trade_log_bytes
+from ingest import read_trade_log, stream_trade_log
+from trade_schema import PL_COLUMNS, TRADE_COUNT_COLUMN
+
+GROUP_COLUMNS = ["Strategy", "Date Opened", "Date Closed"]
+
+
+@pytest.fixture(scope="module")
+def file_bytes():
+    return get_trade_log_bytes(4000, n_strategies=5, n_days=120, seed=4)
+
+
+def get_groups(dataframe):  # P/L and trade count per (strategy, open date, close date), as plain values
+    df = dataframe.astype({"Strategy": str}).sort_values(GROUP_COLUMNS, kind="stable").reset_index(drop=True)
+    return df[[*GROUP_COLUMNS, "P/L", TRADE_COUNT_COLUMN]]
+
+
+@pytest.mark.parametrize("chunksize", [97, 1000, 100_000])  # many chunks (and folds), a few, one
+def test_stream_same_as_full_load(file_bytes, chunksize):  # reference: group the fully loaded trades
+    df_full = read_trade_log(file_bytes)
+    expected = df_full.groupby(GROUP_COLUMNS, observed=True).agg(
+        **{"P/L": ("P/L", "sum"), TRADE_COUNT_COLUMN: ("P/L", "size")}
+    )
+    df_stream = stream_trade_log(io.BytesIO(file_bytes), chunksize=chunksize)
+    assert list(df_stream.columns) == [*PL_COLUMNS, TRADE_COUNT_COLUMN]
+    assert df_stream["Date Opened"].is_monotonic_increasing
+    pd.testing.assert_frame_equal(
+        get_groups(df_stream), get_groups(expected.reset_index()), check_dtype=False, check_exact=False, rtol=1e-12
+    )
+
+
+def test_stream_PL_metrics_same_as_full_load(file_bytes):
+    df_PL = compute_PL_metrics(stream_trade_log(io.BytesIO(file_bytes), chunksize=500), 50000)
+    expected = compute_PL_metrics(read_trade_log(file_bytes), 50000)
+    pd.testing.assert_frame_equal(df_PL, expected, check_dtype=False, check_exact=False, rtol=1e-12, atol=1e-6)
+    np.testing.assert_array_equal(df_PL["DD_duration"], expected["DD_duration"])
+
+
+def test_stream_empty_log(file_bytes):
+    header = file_bytes.split(b"\n", 1)[0] + b"\n"
+    df_stream = stream_trade_log(io.BytesIO(header))
+    assert df_stream.empty and list(df_stream.columns) == [*PL_COLUMNS, TRADE_COUNT_COLUMN]
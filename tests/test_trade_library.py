@@ -0,0 +1,72 @@
+import datetime
+
+import pandas as pd
+import pytest
+import trade_library
+from analytics import apply_trade_filter
+from benchmarks.synthetic_log import get_trade_log_bytes
+from ingest import read_trade_log
+from trade_library import get_library_info, query_library, save_to_library
+from trade_schema import ACCOUNT_COLUMN, PL_COLUMNS
+
+
+@pytest.fixture(scope="module")
+def df_trades():  # two accounts, so the account filter is pushed down too
+    df = read_trade_log(get_trade_log_bytes(3000, n_strategies=6, n_days=200, seed=3))
+    return df.assign(**{ACCOUNT_COLUMN: ["IRA" if i % 3 else "Taxable" for i in range(len(df.index))]})
+
+
+@pytest.fixture(autouse=True)
+def library_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(trade_library, "LIBRARY_DIR", str(tmp_path))
+    monkeypatch.setattr(trade_library, "ROW_GROUP_SIZE", 250)  # many row groups: date pruning is exercised
+
+
+def get_rows(dataframe, columns):  # rows as plain values, in a fixed order (the library sorts by open date)
+    df = dataframe[columns].astype({"Strategy": str, **({ACCOUNT_COLUMN: str} if ACCOUNT_COLUMN in columns else {})})
+    return df.sort_values(columns, kind="stable").reset_index(drop=True)
+
+
+@pytest.mark.parametrize(
+    "strategies, dates, accounts",
+    [
+        (None, None, None),
+        (["Strategy 01 - IC", "Strategy 05 - RIC"], None, None),
+        (None, (datetime.date(2022, 3, 1), datetime.date(2022, 5, 31)), None),
+        (["Strategy 02 - Long Put", "missing"], (datetime.date(2022, 1, 3), datetime.date(2022, 1, 3)), None),
+        (
+            ["Strategy 03 - Long Put", "Strategy 06 - Long Put"],
+            (datetime.date(2022, 2, 15), datetime.date(2022, 8, 1)),
+            ["IRA"],
+        ),
+    ],
+)
+def test_query_same_as_in_memory_filter(df_trades, strategies, dates, accounts):  # reference: filter after a full load
+    save_to_library(df_trades, "synthetic")
+    columns = [ACCOUNT_COLUMN, *PL_COLUMNS]
+    df_query = query_library("synthetic", strategies, dates, columns, accounts)
+    expected = apply_trade_filter(
+        df_trades,
+        df_trades["Strategy"].unique() if strategies is None else strategies,
+        dates or (df_trades["Date Opened"].min(), df_trades["Date Opened"].max()),
+        accounts,
+    )
+    assert list(df_query.columns) == columns and len(df_query.index) > 0
+    pd.testing.assert_frame_equal(get_rows(df_query, columns), get_rows(expected, columns), check_dtype=False)
+
+
+def test_library_info_from_footer(df_trades):
+    save_to_library(df_trades, "synthetic")
+    info = get_library_info("synthetic")
+    assert info["trade_number"] == len(df_trades.index)
+    assert (info["start_date"], info["end_date"]) == (
+        df_trades["Date Opened"].min().date(),
+        df_trades["Date Opened"].max().date(),
+    )
+    assert sorted(info["strategy_list"]) == sorted(df_trades["Strategy"].astype(str).unique())
+    assert info["account_list"] == ["IRA", "Taxable"]
+
+
+def test_invalid_name():
+    with pytest.raises(ValueError):
+        save_to_library(pd.DataFrame(), "../outside")
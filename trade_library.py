@@ -0,0 +1,106 @@
+import json
+import os
+import re
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from trade_schema import ACCOUNT_COLUMN, DATE_COLUMNS, PL_COLUMNS, TRADE_COUNT_COLUMN
+from analytics import compact_trade_log
+
+# ---- library settings ----
+LIBRARY_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "library")
+ROW_GROUP_SIZE = 100_000  # smaller row groups = finer date range pruning
+METADATA_KEY = b"trade_library"  # dataset info (stats, strategy list) kept in the parquet footer
+
+
+def get_library_path(name):
+    if not re.fullmatch(r"[\w\- ]+", name or ""):
+        raise ValueError("Dataset name can only contain letters, numbers, spaces, '-' and '_'.")
+    return os.path.join(LIBRARY_DIR, f"{name.strip()}.parquet")
+
+
+def list_library():  # saved dataset names, alphabetical
+    if not os.path.isdir(LIBRARY_DIR):
+        return []
+    return sorted(name[: -len(".parquet")] for name in os.listdir(LIBRARY_DIR) if name.endswith(".parquet"))
+
+
+def save_to_library(dataframe, name):  # save a prepped trade log (data_prep output) as a typed parquet dataset
+    path = get_library_path(name)
+    df = dataframe.drop(columns=["index"], errors="ignore").copy()
+    # ---- typed columns: categorical strategy, datetime64 dates, float P/L ----
+    df["Strategy"] = df["Strategy"].astype("category")
+    if ACCOUNT_COLUMN in df.columns:
+        df[ACCOUNT_COLUMN] = df[ACCOUNT_COLUMN].astype("category")
+    for col in DATE_COLUMNS:
+        df[col] = pd.to_datetime(df[col])
+    df["P/L"] = df["P/L"].astype("float64")
+    # sorted by open date, so each row group covers a narrow date range (min/max stats used for pushdown)
+    df = df.sort_values(by=["Date Opened", "Strategy"], kind="stable").reset_index(drop=True)
+
+    info = {
+        "trade_number": int(df[TRADE_COUNT_COLUMN].sum()) if TRADE_COUNT_COLUMN in df.columns else len(df.index),
+        "start_date": f"{df['Date Opened'].min():%Y-%m-%d}" if len(df.index) else None,
+        "end_date": f"{df['Date Opened'].max():%Y-%m-%d}" if len(df.index) else None,
+        "strategy_list": [str(item) for item in df["Strategy"].unique()],
+    }
+    if ACCOUNT_COLUMN in df.columns:
+        info["account_list"] = sorted(str(item) for item in df[ACCOUNT_COLUMN].unique())
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    table = table.replace_schema_metadata({**(table.schema.metadata or {}), METADATA_KEY: json.dumps(info).encode()})
+
+    os.makedirs(LIBRARY_DIR, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    pq.write_table(table, tmp_path, row_group_size=ROW_GROUP_SIZE, write_statistics=True)
+    os.replace(tmp_path, path)
+    return path
+
+
+def get_library_info(name):  # dataset stats from the parquet footer only (no row data read)
+    info = json.loads(pq.read_schema(get_library_path(name)).metadata[METADATA_KEY])
+    for key in ("start_date", "end_date"):
+        info[key] = pd.Timestamp(info[key]).date() if info[key] else None
+    return info
+
+
+def get_library_columns(name):  # column names from the parquet footer only (no row data read)
+    return pq.read_schema(get_library_path(name)).names
+
+
+def build_trade_filter(selected_strat_list=None, selected_date=None, selected_accounts=None):  # pyarrow filter expr
+    import pyarrow.dataset as ds  # loaded by the first query, not at start up (see startup.py)
+
+    expr = None
+    if selected_strat_list is not None:
+        expr = ds.field("Strategy").isin(list(selected_strat_list))
+    if selected_accounts is not None:
+        account_expr = ds.field(ACCOUNT_COLUMN).isin(list(selected_accounts))
+        expr = account_expr if expr is None else expr & account_expr
+    if selected_date is not None:
+        date_expr = (ds.field("Date Opened") >= pd.Timestamp(selected_date[0])) & (
+            ds.field("Date Opened") < pd.Timestamp(selected_date[1]) + pd.Timedelta(days=1)  # end date inclusive
+        )
+        expr = date_expr if expr is None else expr & date_expr
+    return expr
+
+
+def query_library(name, selected_strat_list=None, selected_date=None, columns=None, selected_accounts=None):
+    # filters are pushed down to the scan: row groups outside the date range are skipped using parquet stats,
+    # and only the requested columns are read. Return a dataframe in the same shape as data_prep output.
+    import pyarrow.dataset as ds
+
+    dataset = ds.dataset(get_library_path(name), format="parquet")
+    if ACCOUNT_COLUMN not in dataset.schema.names:  # single account dataset: nothing to filter by
+        selected_accounts = None
+    if columns is not None and TRADE_COUNT_COLUMN in dataset.schema.names and TRADE_COUNT_COLUMN not in columns:
+        columns = [*columns, TRADE_COUNT_COLUMN]  # aggregated dataset: trade counts are needed with every P/L read
+    table = dataset.to_table(
+        columns=columns, filter=build_trade_filter(selected_strat_list, selected_date, selected_accounts)
+    )
+    # parquet keeps the dashboard types (categorical strategy, datetime64 dates), other text columns are compacted
+    return compact_trade_log(table.to_pandas())
+
+
+def delete_from_library(name):
+    os.remove(get_library_path(name))
@@ -0,0 +1,19 @@
+# ---- trade log column names shared by data loading, library and analytics ----
+DATE_COLUMNS = ["Date Opened", "Date Closed"]
+PL_COLUMNS = ["Strategy", "Date Opened", "Date Closed", "P/L"]  # columns needed for P/L and DD charts
+# trade count of a pre-aggregated row (streamed large files). Rows without this column are single trades.
+TRADE_COUNT_COLUMN = "No. of Trades"
+# source account of a row when several exports are imported together. Single file imports have no account column.
+ACCOUNT_COLUMN = "Account"
+# stable identity of a trade across overlapping exports (used to skip trades already loaded)
+TRADE_KEY_COLUMNS = ["Strategy", "Date Opened", "Time Opened", "Legs"]  # (+ ACCOUNT_COLUMN when present)
+
+# date formats tried (in order) before falling back to slow per-element inference. OO exports use the first one.
+DATE_FORMATS = ["%m/%d/%Y", "%Y-%m-%d", "%m/%d/%y", "%Y/%m/%d", "%d/%m/%Y", "%m/%d/%Y %H:%M:%S", "%Y-%m-%d %H:%M:%S"]
+
+# ---- compact in-memory schema (analytics.compact_trade_log) ----
+CATEGORY_COLUMNS = ["Strategy", "Reason For Close", ACCOUNT_COLUMN]  # text columns always stored as categoricals
+CATEGORY_MAX_RATIO = 0.5  # other text: categorical if distinct values <= ratio * rows, else arrow strings
+# display-only price columns stored as float32 (P/L and the columns used in calculations stay float64)
+FLOAT32_COLUMNS = ["Closing Price", "Avg. Closing Cost", "Initial Premium", "Opening VIX", "Closing VIX", "Gap"]
+FLOAT32_MAX_VALUE = 2**24 / 100  # below this, 2 decimal values survive the float32 round trip
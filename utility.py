@@ -1,26 +1,21 @@
+import os
+import time
 import streamlit as st
-import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
-from plotly.subplots import make_subplots
 import numpy as np
-
-
-def data_prep(dataframe):  # for OO live trade log
-    # convert to datatime & removed hour and time
-    dataframe["Date Opened"] = pd.to_datetime(dataframe["Date Opened"]).dt.date
-    dataframe["Date Closed"] = pd.to_datetime(dataframe["Date Closed"]).dt.date
-    # make sure it's in ascending order
-    dataframe = dataframe.sort_values(by="Date Opened", ascending=True).reset_index()
-
-
-def get_simple_stat(dataframe):  # return entry number, data range,
-    trade_number = len(dataframe.index)
-    start_date = dataframe["Date Opened"].min()
-    end_date = dataframe["Date Opened"].max()
-    strategy_number = len(dataframe["Strategy"].unique())
-    strategy_list = dataframe["Strategy"].unique()
-    return trade_number, start_date, end_date, strategy_number, strategy_list
+import pandas as pd
+from analytics import *  # analytics core without streamlit (parsing, filters, P/L metrics), re-exported to main
+from trade_library import get_library_info, get_library_path
+from chart_render import get_figure_payload_bytes, get_trace_point_count
+from legs import BREAKDOWN_COLUMNS, get_leg_breakdown
+from exposure import get_exposure_series
+from allocation import ALLOCATION_RANKS, get_allocation_strategies
+from trade_schema import ACCOUNT_COLUMN, TRADE_COUNT_COLUMN
+from figure_cache import get_cached_figure
+from jobs import JOB_POLL_SECONDS, JOB_WAIT_SECONDS, get_job_stats, release_job, unwatch_job, watch_job
+from memory_report import SESSION_TTL_SECONDS, get_memory_report, record_session
+from streamlit.runtime import Runtime
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+from profiling import instrument_functions
 
 
 def show_simple_stat(dataframe):  # display stats in
@@ -53,21 +48,67 @@ def show_simple_stat(dataframe):  # display stats in
 
 
 def trade_filter_form(dataframe, id):  # create filter form inside a popover, and return filtered data
+    selected_strat_list, selected_date, selected_accounts = trade_filter_select(
+        dataframe["Strategy"].unique(),
+        dataframe["Date Opened"].min(),
+        dataframe["Date Opened"].max(),
+        id,
+        get_account_list(dataframe),
+    )
+    return apply_trade_filter(dataframe, selected_strat_list, selected_date, selected_accounts)
+
+
+def library_filter_form(name, id):  # same filter form for a saved dataset. Return selections (see query_library)
+    info = get_library_info(name)
+    account_list = info.get("account_list")  # saved from a multi-account import
+    return trade_filter_select(info["strategy_list"], info["start_date"], info["end_date"], id, account_list)
+
+
+def cube_filter_form(cube, id):  # same filter form for the P/L cube. Return selections (applied on the cube)
+    return trade_filter_select(
+        list(cube["strategies"]),
+        cube["min_open_date"],
+        cube["max_open_date"],
+        id,
+        list(cube["accounts"]) or None,
+    )
+
+
+# filter widgets only. Return selections: strategies, (start date, end date), accounts (None without account_list)
+def trade_filter_select(strategy_list, min_date_val, max_date_val, id, account_list=None):
+    # the slider steps by day for python dates (datetime64 min / max of the data would step by 15 minutes)
+    min_date_val, max_date_val = pd.Timestamp(min_date_val).date(), pd.Timestamp(max_date_val).date()
     # header at left column
     st.text("Selected filters")
     popover_filter = st.popover("Filters")
+    strategies_key = f"filter_strategies_{id}"  # also set by apply_strategy_filter
+    accounts_key = f"filter_accounts_{id}"
+    # pills keep their selection by key only: other data (other strategies / accounts) starts again from all of them
+    dataset_key = get_dataset_key()
+    if st.session_state.get(f"filter_dataset_{id}") != dataset_key:
+        st.session_state.pop(strategies_key, None)
+        st.session_state.pop(accounts_key, None)
+        st.session_state[f"filter_dataset_{id}"] = dataset_key
     with popover_filter.form(key=f"filter_form_{id}"):
         # select envelopes
         selected_strat_list = st.pills(
             "Select one or multiple envelopes",
-            dataframe["Strategy"].unique(),
+            strategy_list,
             selection_mode="multi",
-            default=dataframe["Strategy"].unique(),  # default to select all strategies
+            default=None if strategies_key in st.session_state else strategy_list,  # default to select all strategies
+            key=strategies_key,
         )
+        # select accounts (multi-account import only)
+        selected_accounts = None
+        if account_list is not None:
+            selected_accounts = st.pills(
+                "Select one or multiple accounts",
+                account_list,
+                selection_mode="multi",
+                default=account_list,
+                key=accounts_key,
+            )
         # select dates
-        min_date_val = dataframe["Date Opened"].min()  #### somehow .date() used in data prep. necessary for slides.
-        max_date_val = dataframe["Date Opened"].max()
-
         selected_date = st.slider(
             f"Select a range of dates (available dates from **{min_date_val:%Y/%m/%d}** to **{max_date_val:%Y/%m/%d}**)",
             min_value=min_date_val,
@@ -84,6 +125,9 @@ def trade_filter_form(dataframe, id):  # create filter form inside a popover, an
             if not selected_strat_list:
                 st.error("Please select at least one strategy above.")
                 st.stop()
+            if account_list is not None and not selected_accounts:
+                st.error("Please select at least one account above.")
+                st.stop()
 
     # confirm selected filter  (outside of the form)
     # min_date_val = selected_date[0]
@@ -93,346 +137,362 @@ def trade_filter_form(dataframe, id):  # create filter form inside a popover, an
     for item in selected_strat_list:
         markdown_strat_list += f" * {item}\n"
     popover_filter.caption(markdown_strat_list)  # or use markdown
-
-    # create filtered data (outside of the form)
-    df_filtered = dataframe[
-        (dataframe["Date Opened"] >= selected_date[0])
-        & (dataframe["Date Opened"] <= selected_date[1])
-        & dataframe["Strategy"].isin(selected_strat_list)
-    ]
-    return df_filtered
+    if selected_accounts is not None:
+        popover_filter.caption("Selected Accounts: \n" + "".join(f" * {item}\n" for item in selected_accounts))
+    return selected_strat_list, selected_date, selected_accounts
+
+
+def apply_strategy_filter(id, strategies):  # button callback: select these strategies in the filter form of id
+    st.session_state[f"filter_strategies_{id}"] = strategies
+
+
+# ==== per tab memo: each tab is a fragment and only recomputes when its own inputs or the dataset change =====
+def get_dataset_key():  # identity of the loaded data: content hash, or saved dataset name + file time
+    if "df_hash" in st.session_state:
+        return st.session_state.df_hash
+    name = st.session_state.get("library_name")
+    return f"library:{name}:{os.path.getmtime(get_library_path(name))}" if name else None
+
+
+def get_filter_key(selected_strat_list, selected_date, selected_accounts=None):  # hashable filter selections
+    accounts = None if selected_accounts is None else tuple(selected_accounts)
+    return tuple(selected_strat_list), tuple(selected_date), accounts
+
+
+def get_memoized(name, key, compute):  # one result per name kept in session state, computed again when key changes
+    memo = st.session_state.get(f"memo_{name}")
+    if memo is None or memo[0] != key:
+        memo = (key, compute())
+        st.session_state[f"memo_{name}"] = memo
+    return memo[1]
+
+
+# get_memoized for heavy analytics: compute(progress) runs as a background job (jobs.py) outside the script run.
+# Returns the result, or None while the job runs: a progress bar is shown and the page reruns once it finishes, so
+# widgets stay usable meanwhile. Jobs are shared by sessions asking for the same name + key; a job nobody waits for
+# any more (inputs changed) is cancelled. Errors of the job are raised here, as if compute ran in the script.
+def get_job_result(name, key, compute, label):
+    if st.session_state.get(f"job_cancelled_{name}", key) != key:  # inputs changed: the cancel was for the old ones
+        del st.session_state[f"job_cancelled_{name}"]
+    memo = st.session_state.get(f"memo_{name}")
+    if memo is not None and memo[0] == key:
+        return memo[1]
+    if st.session_state.get(f"job_cancelled_{name}") == key:  # stopped by the user: not started again
+        st.caption(f"_{label}: cancelled. Change the inputs to run it again._")
+        return None
+    session_id = get_session_id()
+    job = watch_job(session_id, name, (name, key), compute, is_active_session)
+    if not job.wait(JOB_WAIT_SECONDS):
+        show_job_progress(job, name, key, label)
+        return None
+    unwatch_job(session_id, name)
+    memo = (key, job.result())
+    st.session_state[f"memo_{name}"] = memo
+    return memo[1]
+
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def show_job_progress(job, name, key, label):  # refreshed until the job finishes, then the page reruns to show it
+    if job.done():
+        st.rerun()
+    elapsed = f" ({time.time() - job.started:,.0f} s)" if job.started is not None else ""
+    st.progress(job.progress or 0.0, text=f"{label}: {job.message}{elapsed}")
+    if st.button("Cancel", key=f"job_cancel_{name}"):
+        unwatch_job(get_session_id(), name)
+        release_job(job.key, is_active_session)  # stopped only if no other open session waits for the same job
+        st.session_state[f"job_cancelled_{name}"] = key
+        st.rerun()
+
+
+def get_session_id():  # id of the browser session running this script (None outside streamlit)
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else None
+
+
+def is_active_session(session_id):  # False once the browser session closed. Always True without a server runtime
+    return not Runtime.exists() or Runtime.instance().is_active_session(session_id)
 
 
 # convert to PL type dataframe + input: starting fund. Return df_PL, starting_fund
 def convert_to_PL(dataframe, starting_fund=50000, id="input_fund"):
+    starting_fund = starting_fund_input(id)
+    df_PL = compute_PL_metrics(dataframe, starting_fund)
+    return df_PL, starting_fund
+
+
+def starting_fund_input(id="input_fund"):  # starting fund widget. Return starting_fund
     starting_fund = st.number_input("Starting Fund: ", min_value=10, value=50000, key=f"starting_fund_input_{id}")
     st.caption("_* required to calculate drawdown and CAGR_")
-    # ==== P/L curve vs Date Closed, and DD =====
-    df_PL = dataframe.groupby("Date Closed")["P/L"].agg(["sum", "count"]).reset_index()
-    df_PL["cum_PL"] = df_PL["sum"].cumsum()  # cumulative PL. 'sum' column is daily PL.
-    df_PL["Fund"] = df_PL["cum_PL"] + starting_fund
-    df_PL["DD"] = df_PL["cum_PL"].cummax() - df_PL["cum_PL"]  # DD in amount
-    # DD based on starting fund to remove sequence return risk
-    df_PL["DD_pct_startingfund"] = df_PL["DD"] / starting_fund * 100
-    # ==== DD duration (in trading days) =====
-    df_PL["DD_duration"] = None  # create a new column
-    for t in range(len(df_PL)):
-        if df_PL["DD"].iloc[t] == 0:
-            df_PL["DD_duration"].iat[t] = 0
-        else:
-            df_PL["DD_duration"].iat[t] = df_PL["DD_duration"].iat[t - 1] + (
-                df_PL["Date Closed"][t] - df_PL["Date Closed"][t - 1]
-            ) // np.timedelta64(1, "D")
-            # calculate calenda days
-    df_PL.rename(columns={"sum": "Daily_PL", "count": "Daily_count"}, inplace=True)
-    return df_PL, starting_fund
+    return starting_fund
 
 
-# convert to PL type dataframe + input: starting fund. Return df_PL, starting_fund
-def convert_to_PL_no_starting_fund(dataframe):
-    # ==== P/L curve vs Date Closed, and DD =====
-    df_PL = dataframe.groupby("Date Closed")["P/L"].agg(["sum", "count"]).reset_index()
-    df_PL["cum_PL"] = df_PL["sum"].cumsum()  # cumulative PL. 'sum' column is daily PL.
-    # ---- no starting fund, no Fund column -----
-    # df_PL["Fund"] = df_PL["cum_PL"] + starting_fund
-    df_PL["DD"] = df_PL["cum_PL"].cummax() - df_PL["cum_PL"]  # DD in amount
-    # # ---- no starting fund, no DD pct -----
-    # df_PL["DD_pct_startingfund"] = df_PL["DD"] / starting_fund * 100
-    # ==== DD duration (in trading days) =====
-    df_PL["DD_duration"] = None  # create a new column
-    for t in range(len(df_PL)):
-        if df_PL["DD"].iloc[t] == 0:
-            df_PL["DD_duration"].iat[t] = 0
-        else:
-            df_PL["DD_duration"].iat[t] = df_PL["DD_duration"].iat[t - 1] + (
-                df_PL["Date Closed"][t] - df_PL["Date Closed"][t - 1]
-            ) // np.timedelta64(1, "D")
-            # calculate calenda days
-    df_PL.rename(columns={"sum": "Daily_PL", "count": "Daily_count"}, inplace=True)
-    return df_PL
-
-
-def show_daily_PL_cum_PL_curve(dataframe):  # need to use PL type dataframe
-    fig = make_subplots(
-        rows=2,
-        cols=1,
-        row_heights=[0.3, 0.25],
-        shared_xaxes=True,
-        vertical_spacing=0.05,
-    )
-    ######  PL curve  ######
-    fig.add_trace(
-        go.Scatter(
-            x=dataframe["Date Closed"],
-            y=dataframe["cum_PL"],
-            name="Cumulative P/L",
-            line_color="#e1aa00",
-            mode="lines+markers",
-            marker=dict(
-                symbol="circle",
-                size=4,
-                color="#e1aa00",  # opacity=1,
-                line=dict(
-                    # color="#1A1A1A",  # Set the outline color
-                    width=0.2,
-                ),
-            ),
-        ),
-        row=1,
-        col=1,
-    )
+def get_render_mode():  # chart render mode picked on the Import tab (see chart_render.RENDER_MODES)
+    return st.session_state.get("chart_render_mode", "auto")
 
-    ######  Daily PL bar chart ######
-    bar_colors = ["#f99898" if v < 0 else "#5eb6af" for v in dataframe["Daily_PL"]]  # Create a color list
-
-    fig.add_trace(
-        go.Bar(
-            x=dataframe["Date Closed"],
-            y=dataframe["Daily_PL"],
-            name="Daily P/L",
-            opacity=0.8,
-            marker_color=bar_colors,
-        ),
-        row=2,
-        col=1,
-    )
 
-    fig.update_yaxes(
-        title_text="Cumulative P/L",
-        row=1,
-        col=1,
-    )
-    fig.update_yaxes(
-        title_text="Daily P/L",
-        row=2,
-        col=1,
-    )
+# figures are cached for all sessions (figure_cache) when the caller passes a key identifying the data behind them:
+# dataset, filter selections, starting fund. The render mode is added here. key None: the figure is built every time
+# The show_* functions import their figure builders when called: plotly express / subplots load with the first chart,
+# not at start up (startup.py preloads them once the first page is drawn).
+def get_figure(name, key, build):
+    return get_cached_figure(name, None if key is None else (key, get_render_mode()), build)
 
-    fig.update_layout(
-        height=500,
-        width=800,
-        title_text="Daily and Cumulative P/L",
-        # xaxis_title="Date",
-        template="plotly_dark",
-        legend=dict(
-            orientation="h",
-            yanchor="middle",
-            y=1.05,
-            xanchor="center",
-            x=0.5,
-        ),
-    )
+
+def show_plotly_chart(fig, container=st, n_total=None):  # plotly_chart + optional payload report
+    container.plotly_chart(fig, width="content")
+    if st.session_state.get("show_chart_payload", False):
+        n_points = get_trace_point_count(fig)
+        points_text = f"{n_points:,} of {n_total:,} points" if n_total is not None else f"{n_points:,} points"
+        container.caption(f"_Chart payload: {get_figure_payload_bytes(fig) / 1024:,.1f} KB, {points_text}_")
+
+
+def show_daily_PL_cum_PL_curve(dataframe, key=None):  # need to use PL type dataframe. key: see get_figure
+    from figures import get_daily_PL_cum_PL_figure
+
+    fig = get_figure("daily_PL_cum_PL", key, lambda: get_daily_PL_cum_PL_figure(dataframe, get_render_mode()))
     with st.container(border=True):
-        st.plotly_chart(fig, width="content")
+        show_plotly_chart(fig, n_total=2 * len(dataframe.index))
 
 
-def show_PL_DD_plot(dataframe, starting_fund):  # need to use PL type dataframe. Starting fund used for PL %
-    fig = make_subplots(
-        rows=3,
-        cols=1,
-        row_heights=[0.15, 0.15, 0.15],
-        shared_xaxes=True,
-        vertical_spacing=0.06,
-    )
-    ######  Live PL % ######
-    fig.add_trace(
-        go.Scatter(
-            x=dataframe["Date Closed"],
-            y=dataframe["cum_PL"] / starting_fund * 100,
-            name="PL %",
-            line_color="#e1aa00",
-            mode="lines+markers",
-            marker=dict(
-                symbol="circle",
-                size=4,
-                color="#e1aa00",  # opacity=1,
-                line=dict(
-                    # color="#1A1A1A",  # Set the outline color
-                    width=0.2,
-                ),
-            ),
-        ),
-        row=1,
-        col=1,
-    )
-    ######  DD % based on starting fund ######
-    fig.add_trace(
-        go.Scatter(
-            x=dataframe["Date Closed"],
-            y=dataframe["DD_pct_startingfund"],
-            name="DD / starting fund",
-            fill="tozeroy",
-            fillcolor="rgba(255, 0, 0, 0.15)",  # Red fill. last value is opacity
-            line_color="red",
-        ),
-        row=2,
-        col=1,
-    )
-    ######  DD duration ######
-    fig.add_trace(
-        go.Scatter(
-            x=dataframe["Date Closed"],
-            y=dataframe["DD_duration"],
-            name="DD Duration (days)",
-            fill="tozeroy",
-            fillcolor="rgba(0, 176, 160, 0.15)",  # last value is opacity
-            line_color="#00b0a0",  # same green used on OO website
-        ),
-        row=3,
-        col=1,
-    )
-    # ######  DD amount ######
-    # fig.add_trace(
-    #     go.Scatter(
-    #         x=dataframe["Date Closed"],
-    #         y=dataframe["DD"],
-    #         name="DD amount",
-    #     ),
-    #     row=4,
-    #     col=1,
-    # )
-
-    fig.update_yaxes(title_text="P/L %", row=1, col=1)
-    fig.update_yaxes(title_text="DD %", row=2, col=1)
-    fig.update_yaxes(title_text="DD days", row=3, col=1)
-    # fig.update_yaxes(title_text="DD $", row=4, col=1)
-
-    # fig.update_xaxes(showline=True, linecolor="#525252", linewidth=0.5, mirror=True)
-    # fig.update_yaxes(showline=True, linecolor="#525252", linewidth=0.5, mirror=True)
-
-    fig.update_layout(
-        height=500,
-        width=500,
-        title_text="P/L & Draw Down Graphs",
-        # xaxis_title="Date",
-        template="plotly_dark",
-        legend=dict(
-            orientation="h",
-            yanchor="middle",
-            y=1.08,
-            xanchor="center",
-            x=0.5,
-        ),
-    )
+def show_PL_DD_plot(dataframe, starting_fund, key=None):  # need to use PL type dataframe. Starting fund used for PL %
+    from figures import get_PL_DD_figure
+
+    fig = get_figure("PL_DD", key, lambda: get_PL_DD_figure(dataframe, starting_fund, get_render_mode()))
     with st.container(border=True):
-        st.plotly_chart(fig, width="content")
+        show_plotly_chart(fig, n_total=3 * len(dataframe.index))
         # some notes (inside the container)
         st.caption(
             "_Note: The Drawdown is calculated based starting fund instead of recent PL max._", text_alignment="center"
         )
 
 
-def show_PL_per_strategy_bar_chart(dataframe):
-    pivot_table = (
-        pd.pivot_table(dataframe, values="P/L", index="Strategy", aggfunc="sum").reset_index().sort_values(by="P/L")
-    )
-    fig = go.Figure()
-    ## bar chart: PL per strategy ##
-    fig.add_trace(
-        go.Bar(
-            y=pivot_table["Strategy"],
-            x=pivot_table["P/L"],
-            # x=pivot_table["P/L"] / starting_fund * 100, # convert to percentage of starting fund
-            orientation="h",
-            # name='xxx',
-            # opacity=1,
-        )
+# need run_monte_carlo result + realized PL dataframe. key: see get_figure
+def show_monte_carlo_bands(simulation, df_PL, starting_fund, key=None):
+    from figures import get_monte_carlo_figure
+
+    fig = get_figure("monte_carlo", key, lambda: get_monte_carlo_figure(simulation, df_PL, starting_fund))
+    # percentiles of per path statistics
+    df_stats = simulation["stats"].copy()
+    df_stats["ending_PL"] = df_stats["ending_PL"] / starting_fund * 100
+    df_stats["max_DD"] = df_stats["max_DD"] / starting_fund * 100
+    df_stats.index = [f"{p}th" for p in df_stats.index]
+    df_stats.index.name = "Percentile"
+    df_stats = df_stats.rename(
+        columns={"ending_PL": "Ending P/L %", "max_DD": "Max DD %", "max_DD_duration": "Max DD days"}
     )
-    fig.update_layout(
-        title="PL per Strategy",
-        # yaxis_title='Strategy',
-        # xaxis_title="PL per Strategy",
-        width=800,
-        height=170 + 25 * len(pivot_table),  # adjust height based on # of strategies
-        template="plotly_dark",
-        # legend=dict(orientation="h", yanchor="bottom", y=1.05, xanchor="center", x=0.5),
+    with st.container(border=True):
+        show_plotly_chart(fig, n_total=(2 * len(simulation["percentiles"]) + 2) * len(simulation["dates"]))
+        st.dataframe(df_stats.round(1))
+        st.caption("_Note: P/L and DD are % of starting fund, as in the graphs above._", text_alignment="center")
+
+
+def show_rolling_metrics(rolling, df_latest, id, per_strategy=False, key=None):  # need get_rolling_metrics result
+    from figures import get_rolling_metric_figure
+
+    # latest window of the portfolio as metric cards, one metric over time as a chart, latest window per series table
+    labels = rolling["labels"]
+    st.subheader(f"Rolling Risk Metrics (last {rolling['window']} trading days)", anchor=False)
+    portfolio = df_latest.iloc[0] if len(df_latest.index) else None
+    for row in range(0, len(labels), 4):
+        for col, label in zip(st.columns(4, border=True), list(labels.values())[row : row + 4]):
+            value = portfolio[label] if portfolio is not None else np.nan
+            col.metric(label=label, value="-" if np.isnan(value) else f"{value:,.2f}")
+    metric = st.selectbox("Metric over time", list(labels), format_func=labels.__getitem__, key=f"rolling_metric_{id}")
+    fig = get_figure(
+        f"rolling_{metric}_{per_strategy}",
+        key,
+        lambda: get_rolling_metric_figure(rolling, metric, per_strategy, get_render_mode()),
     )
     with st.container(border=True):
-        st.plotly_chart(fig, width="content")
-
-
-def show_open_date_per_strategy(dataframe):
-    fig = go.Figure()
-
-    fig.add_trace(
-        go.Scatter(
-            x=dataframe["Date Opened"],
-            y=dataframe["Strategy"],
-            mode="markers",
-            # name="",
-            marker=dict(
-                color="#776538",
-                size=8,
-                symbol="circle",
-                line=dict(
-                    width=1.5,
-                    color="#e1aa00",
-                ),
-            ),
+        show_plotly_chart(fig, n_total=(len(rolling["series"]) - 1 if per_strategy else 1) * len(rolling["dates"]))
+        st.dataframe(df_latest.round(2))
+        st.caption(
+            "_Note: Sharpe and Sortino are annualized from daily P/L (252 days). "
+            "CAGR is based on starting fund + P/L before the window._",
+            text_alignment="center",
         )
-    )
 
-    fig.update_layout(
-        title="Trade open date per strategy",
-        xaxis_title="Date Opened",
-        # yaxis_title="",
-        width=800,
-        height=170 + 25 * len(dataframe["Strategy"].unique()),  # adjusted by strategy number
-        template="plotly_dark",
-        # legend=dict(orientation="h", yanchor="bottom", y=1.05, xanchor="center", x=0.5),
+
+def show_PL_per_strategy_bar_chart(dataframe, key=None):  # need P/L per strategy (get_cube_strategy_PL or so)
+    from figures import get_PL_per_strategy_figure
+
+    fig = get_figure("PL_per_strategy", key, lambda: get_PL_per_strategy_figure(dataframe))
+    with st.container(border=True):
+        show_plotly_chart(fig)
+
+
+def show_open_date_per_strategy(dataframe, key=None):
+    from figures import get_open_date_figure
+
+    fig = get_figure("open_date", key, lambda: get_open_date_figure(dataframe, get_render_mode()))
+    with st.container(border=True):
+        show_plotly_chart(fig, n_total=len(dataframe.index))
+
+
+def show_daily_PL_distribution_daily_trades(dataframe, starting_fund, key=None):  # need to use PL type dataframe
+    from figures import get_PL_distribution_figures
+
+    fig_dailyPL, fig_dailytrades = get_figure(
+        "PL_distribution", key, lambda: get_PL_distribution_figures(dataframe, starting_fund)
     )
     with st.container(border=True):
-        st.plotly_chart(fig, width="content")
-
-
-def show_daily_PL_distribution_daily_trades(dataframe, starting_fund):  # need to use PL type dataframe
-    bar_color = "#636efa"
-    # --- daily PL distribution ---
-    fig_dailyPL = px.histogram(
-        dataframe,
-        x=dataframe["Daily_PL"] / starting_fund * 100,  # PL as a percentage of starting fund
-        nbins=80,
-        title="Daily PL Distribution",
-        color_discrete_sequence=[bar_color] * len(dataframe),  # use single color for all bars
-        opacity=0.8,
+        col1, col2 = st.columns(2)
+        show_plotly_chart(fig_dailyPL, col1)
+        show_plotly_chart(fig_dailytrades, col2)
+
+
+def show_exposure(exposure, key=None):  # need exposure.build_exposure result. None: no open / close times in the data
+    from figures import get_exposure_figure
+
+    st.subheader("Open Positions and Capital at Risk", anchor=False)
+    if exposure is None:
+        st.caption("_Needs trade level data with open / close dates and times (not available in large file mode)._")
+        return
+    df_peaks = exposure["peaks"]
+    col1, col2 = st.columns(2, border=True)
+    for col, label in ((col1, "Peak positions"), (col2, "Peak capital")):
+        value = df_peaks[label].iat[0]
+        col.metric(label=label, value="-" if pd.isna(value) else f"{value:,.0f}")
+    series = st.selectbox("Series", list(df_peaks.index), key="exposure_series")
+    df_series = get_exposure_series(exposure, series)
+    fig = get_figure(
+        f"exposure_{series}",
+        key,
+        lambda: get_exposure_figure(df_series, f"{series}: open positions and capital at risk", get_render_mode()),
     )
-    fig_dailyPL.update_layout(
-        width=500,
-        height=360,
-        xaxis_title_text="Daily PL (% of starting fund)",
-        yaxis_title_text="Count",
-        bargap=0.1,  # gap between bars of adjacent location coordinates
-        template="plotly_dark",
-        # xaxis=dict(
-        #     tickmode="linear",
-        #     tick0=0,
-        #     # dtick = 200
-        # ),
+    with st.container(border=True):
+        show_plotly_chart(fig, n_total=2 * len(df_series.index))
+        st.dataframe(df_peaks)
+        st.caption(
+            "_Note: Capital at risk is |initial premium| x contracts of the open trades (margin is not in the log)._",
+            text_alignment="center",
+        )
+
+
+def show_leg_breakdown(df_structure):  # need trade structure (legs.get_trade_structure). P/L & trades per group
+    from figures import get_leg_breakdown_figure
+
+    with st.container(border=True):
+        by = st.selectbox(
+            "Break down trades by leg structure",
+            list(BREAKDOWN_COLUMNS),
+            format_func=BREAKDOWN_COLUMNS.__getitem__,
+            key="leg_breakdown_by",
+        )
+        show_plotly_chart(get_leg_breakdown_figure(get_leg_breakdown(df_structure, by), by))
+
+
+def show_strategy_drawdowns(df_long, key=None):  # need analytics.add_strategy_PL_metrics result (with starting fund)
+    from figures import MAX_DD_PANELS, get_strategy_DD_figure
+
+    st.subheader("Draw Down per Strategy", anchor=False)
+    if not len(df_long.index):
+        st.caption("_No trades in the selection._")
+        return
+    metrics = {"DD_pct_startingfund": "% of starting fund", "DD": "$"}
+    metric = st.radio(
+        "Draw down in", list(metrics), format_func=metrics.__getitem__, horizontal=True, key="strategy_DD_metric"
     )
-    # --- daily trade number distribution ---
-    fig_dailytrades = px.histogram(
-        dataframe,
-        x="Daily_count",
-        nbins=20,
-        title="Daily Trade # Distribution",
-        color_discrete_sequence=[bar_color] * len(dataframe),  # use single color for all bars
-        opacity=0.8,
+    fig = get_figure(
+        f"strategy_DD_{metric}", key, lambda: get_strategy_DD_figure(df_long, metric, render_mode=get_render_mode())
     )
+    with st.container(border=True):
+        show_plotly_chart(fig, n_total=len(df_long.index))
+        st.dataframe(get_strategy_DD_summary(df_long).sort_values("Max DD", ascending=False).round(2))
+        st.caption(
+            "_Note: Each strategy on its own (cum. P/L, running max and DD duration of its trades only). "
+            f"The {MAX_DD_PANELS} deepest draw downs are plotted._",
+            text_alignment="center",
+        )
 
-    fig_dailytrades.update_layout(
-        width=500,
-        height=360,
-        xaxis_title_text="Daily (Closed) Trade Number",
-        yaxis_title_text="Count",
-        bargap=0.1,  # gap between bars of adjacent location coordinates
-        template="plotly_dark",
-        # xaxis = dict(
-        #     tickmode = 'linear',
-        #     tick0 = 0,
-        #     dtick = 100
-        # )
-    )
+
+def show_allocation(allocation, id, key=None):  # need allocation.optimize_allocation result. id: filter form to set
+    from figures import get_allocation_figure
+
+    st.subheader("Strategy Allocation", anchor=False)
+    if allocation is None:
+        st.caption("_No trades in the selection._")
+        return
+    df_frontier = allocation["frontier"]
+    fig = get_figure("allocation", key, lambda: get_allocation_figure(allocation, get_render_mode()))
     with st.container(border=True):
-        col1, col2 = st.columns(2)
-        col1.plotly_chart(fig_dailyPL, width="content")
-        col2.plotly_chart(fig_dailytrades, width="content")
+        show_plotly_chart(fig, n_total=len(allocation["scores"].index))
+        st.dataframe(df_frontier.round(2), hide_index=True)
+        frontier_items = enumerate(df_frontier["Strategies"].items(), 1)
+        labels = {candidate: f"#{rank}: {strategies}" for rank, (candidate, strategies) in frontier_items}
+        col1, col2 = st.columns((3, 1), vertical_alignment="bottom")
+        # one widget per allocation: a candidate picked in an earlier run may not be on the new frontier
+        candidate = col1.selectbox(
+            "Frontier candidate",
+            list(labels),
+            format_func=lambda candidate: labels.get(candidate, str(candidate)),
+            key=f"allocation_candidate_{id}_{key}",
+        )
+        col2.button(
+            "Apply as filter",
+            on_click=apply_strategy_filter,
+            args=(id, get_allocation_strategies(allocation, candidate)),
+            key=f"allocation_apply_{id}",
+        )
+        st.caption(
+            f"_Note: Ranked by {ALLOCATION_RANKS[allocation['rank_by']]} among the candidates no other beats on both "
+            "P/L and max DD. Days a strategy did not trade count as 0 P/L. Applying a weighted candidate selects its "
+            "strategies; the weights are contract multipliers to size them with._",
+            text_alignment="center",
+        )
+
+
+def show_strategy_correlation(correlation, key=None):  # need correlation.get_strategy_correlation result
+    from figures import get_correlation_heatmap_figure
+
+    with st.container(border=True):
+        if len(correlation["strategies"]) < 2:
+            st.caption("_Select at least two strategies to compare them._")
+            return
+        matrices = {
+            "correlation": ("Daily P/L correlation", -1, 1),
+            "co_DD": ("Co-drawdown overlap (% of DD days shared)", 0, 100),
+        }
+        name = st.selectbox(
+            "Strategy comparison",
+            list(matrices),
+            format_func=lambda name: matrices[name][0],
+            key="strategy_correlation_matrix",
+        )
+        title, zmin, zmax = matrices[name]
+        fig = get_figure(
+            f"correlation_{name}",
+            key,
+            lambda: get_correlation_heatmap_figure(correlation[name], correlation["strategies"], title, zmin, zmax),
+        )
+        show_plotly_chart(fig)
+        st.dataframe(correlation["pairs"].round(2), hide_index=True)
+        st.caption("_Note: Most correlated pairs first. Days without trades count as 0 P/L._", text_alignment="center")
+
+
+def record_session_memory():  # bytes held by this session (shared datasets apart), for the memory report
+    session_id = get_session_id()
+    if session_id is not None:
+        record_session(session_id, {key: st.session_state[key] for key in st.session_state})
+
+
+def show_memory_report():  # datasets held once per server process, and what each session holds on top of them
+    df_datasets, df_sessions = get_memory_report()
+    col1, col2 = st.columns(2, border=True)
+    col1.metric(label="Shared datasets", value=f"{df_datasets['MB'].sum():,.1f} MB")
+    col2.metric(label="Session private data", value=f"{df_sessions['Private MB'].sum():,.1f} MB")
+    st.dataframe(df_datasets.round(2), hide_index=True)
+    st.dataframe(df_sessions.round(2), hide_index=True)
+    job_stats = get_job_stats()
+    st.caption(
+        f"_Background jobs: {job_stats['running']} running, {job_stats['queued']} queued, "
+        f"{job_stats['finished']} finished results kept._"
+    )
+    st.caption(
+        f"_Note: Sessions idle for {SESSION_TTL_SECONDS // 60} minutes are left out. Figures and other objects are "
+        "counted shallow._"
+    )
+
+
+instrument_functions(globals())  # wall time / calls / memory per function when profiling is on
+